@@ -4,7 +4,10 @@ from fastapi.responses import RedirectResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
 import os
+import json
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
@@ -16,6 +19,7 @@ from passlib.context import CryptContext
 import a2s
 import asyncio
 import httpx
+import time
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -37,6 +41,42 @@ CS_SERVER_IP = "82.22.174.126"
 CS_SERVER_PORT = 27016
 CS_SERVER_NAME = "ShadowZM : Zombie Reverse"
 
+# Game servers shown on the website. The first one is the main server behind
+# /api/server-status. Set CS_SERVERS in .env to list more, as JSON:
+# [{"id": "zr", "name": "ShadowZM : Zombie Reverse", "ip": "82.22.174.126", "port": 27016}, ...]
+# An entry can set its own "timeout" (seconds), otherwise SERVER_QUERY_TIMEOUT is used.
+def load_cs_servers(value):
+    """Parse and check the CS_SERVERS setting, raising ValueError on a bad entry"""
+    try:
+        servers = json.loads(value or 'null')
+    except ValueError as e:
+        raise ValueError(f"CS_SERVERS is not valid JSON: {e}")
+    if not servers:
+        return [{"id": "zr", "name": CS_SERVER_NAME, "ip": CS_SERVER_IP, "port": CS_SERVER_PORT}]
+    if not isinstance(servers, list):
+        raise ValueError("CS_SERVERS must be a JSON list of servers")
+
+    ids = set()
+    for i, server in enumerate(servers):
+        if not isinstance(server, dict):
+            raise ValueError(f"CS_SERVERS entry {i} must be an object")
+        missing = [key for key in ("id", "name", "ip", "port") if key not in server]
+        if missing:
+            raise ValueError(f"CS_SERVERS entry {i} is missing {', '.join(missing)}")
+        if not isinstance(server["port"], int):
+            raise ValueError(f"CS_SERVERS entry {i} ({server['id']}): port must be a number")
+        # The id keys the status cache and the circuit breakers
+        if server["id"] in ids:
+            raise ValueError(f"CS_SERVERS has more than one server with id {server['id']!r}")
+        ids.add(server["id"])
+    return servers
+
+CS_SERVERS = load_cs_servers(os.environ.get('CS_SERVERS'))
+SERVER_STATUS_INTERVAL = 15  # Seconds between status queries, the API serves the last result
+SERVER_QUERY_TIMEOUT = 5     # Deadline (seconds) for one server's info + players queries together
+SERVER_FAILURE_THRESHOLD = 3 # Failed queries in a row before the server is treated as down
+SERVER_PROBE_INTERVAL = 60   # Seconds between probe queries while it is down
+
 # Webhook secret for ban sync
 BAN_WEBHOOK_SECRET = os.environ.get('BAN_WEBHOOK_SECRET', 'shadowzm-ban-secret-2024')
 
@@ -161,6 +201,7 @@ class PlayerResponse(BaseModel):
     last_seen: str
 
 class ServerStatusResponse(BaseModel):
+    id: Optional[str] = None
     online: bool
     server_name: str
     server_ip: str
@@ -169,6 +210,7 @@ class ServerStatusResponse(BaseModel):
     max_players: int
     ping: int
     players: List[dict]
+    updated_at: Optional[str] = None
 
 class DashboardStats(BaseModel):
     total_users: int
@@ -436,40 +478,212 @@ async def init_default_team():
         await db.team_roles.insert_many(default_roles)
         logging.info("Default team roles created")
 
+# ==================== DATABASE INDEXES ====================
+
+# Indexes for the queries the routes below run, as (keys, options) per collection.
+# Applied on startup: missing ones are built, ones that are in the database but
+# not listed here are only reported (never dropped).
+# players / bans are rebuilt by the sync scripts (sync_data.py swaps in players,
+# realtime_sync.py bans); shadowzm_sync/staging.py copies these indexes onto the
+# new collection, so they survive the swap.
+DB_INDEXES = {
+    "users": [
+        ([("id", 1)], {}),
+        ([("email", 1)], {}),
+        ([("nickname", 1)], {}),
+        ([("discord_id", 1)], {}),
+    ],
+    "players": [
+        ([("steamid", 1)], {}),
+        ([("kills", -1)], {}),
+    ],
+    "bans": [
+        ([("id", 1)], {}),
+        ([("steamid", 1)], {}),
+        ([("ban_date", -1)], {}),
+        ([("is_expired", 1), ("expires_at", 1)], {}),
+    ],
+    "forum_categories": [
+        ([("id", 1)], {}),
+        ([("section_id", 1), ("order", 1)], {}),
+    ],
+    "forum_topics": [
+        ([("id", 1)], {}),
+        ([("category_id", 1), ("last_reply_at", -1)], {}),
+        ([("category_id", 1), ("is_pinned", -1), ("last_reply_at", -1), ("created_at", -1)], {}),
+        ([("is_pinned", -1), ("last_reply_at", -1), ("created_at", -1)], {}),
+        ([("author_id", 1), ("created_at", -1)], {}),
+        ([("created_at", -1)], {}),
+    ],
+    "forum_replies": [
+        ([("id", 1)], {}),
+        ([("topic_id", 1), ("created_at", 1)], {}),
+        ([("category_id", 1)], {}),
+        ([("author_id", 1), ("created_at", -1)], {}),
+    ],
+    "notifications": [
+        ([("id", 1), ("user_id", 1)], {}),
+        ([("user_id", 1), ("read", 1)], {}),
+        ([("user_id", 1), ("created_at", -1)], {}),
+    ],
+    "user_follows": [
+        ([("follower_id", 1), ("following_id", 1)], {}),
+        ([("following_id", 1)], {}),
+    ],
+    "profile_visits": [
+        ([("visited_id", 1), ("visited_at", -1)], {}),
+        ([("visitor_id", 1), ("visited_id", 1)], {}),
+    ],
+    "admin_applications": [
+        ([("id", 1)], {}),
+        ([("user_id", 1), ("submitted_at", -1)], {}),
+        ([("steamid", 1), ("submitted_at", -1)], {}),
+        ([("submitted_at", -1)], {}),
+        ([("status", 1)], {}),
+    ],
+    "chat_messages": [
+        ([("id", 1)], {}),
+        ([("created_at", -1)], {}),
+    ],
+}
+
+def index_name(keys):
+    # MongoDB's default name, e.g. [("user_id", 1), ("read", 1)] -> "user_id_1_read_1"
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+async def ensure_indexes():
+    """Build the DB_INDEXES missing from the database and log any drift"""
+    built = 0
+    for name, indexes in DB_INDEXES.items():
+        collection = db[name]
+        try:
+            existing = await collection.index_information()
+            wanted = {index_name(keys): (keys, options) for keys, options in indexes}
+            missing = [n for n in wanted if n not in existing]
+            extra = [n for n in existing if n != "_id_" and n not in wanted]
+            if extra:
+                logging.warning(f"Indexes on {name} not in DB_INDEXES: {', '.join(extra)}")
+            if not missing:
+                continue
+
+            logging.info(f"Building indexes on {name}: {', '.join(missing)}")
+            # background is ignored by MongoDB 4.2+, whose builds only lock at the start and end
+            await collection.create_indexes([
+                IndexModel(wanted[n][0], name=n, background=True, **wanted[n][1]) for n in missing
+            ])
+            built += len(missing)
+        except PyMongoError as e:
+            logging.warning(f"Failed to build indexes on {name}: {e}")
+    logging.info(f"Index check done, {built} indexes built")
+
 # ==================== SERVER STATUS ====================
 
-async def query_cs_server():
+class CircuitBreaker:
+    """Stops calling something that keeps failing.
+    closed: calls go through. After failure_threshold failures in a row it opens.
+    open: calls are refused until probe_interval seconds have passed.
+    half-open: one probe call goes through; success closes it, failure opens it again."""
+
+    def __init__(self, name, failure_threshold, probe_interval):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+
+    def allow(self):
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.probe_interval:
+            self.state = "half-open"
+            return True
+        # While half-open only the probe that was let through runs
+        return self.state == "closed"
+
+    def record_success(self):
+        if self.state != "closed":
+            logging.info(f"{self.name} is back, circuit closed")
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            if self.state == "closed":
+                logging.warning(f"{self.name} failed {self.failures} times in a row, circuit open")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+# One breaker per server, so a dead server never slows down the others
+server_breakers = {
+    server["id"]: CircuitBreaker(f"CS server {server['name']}", SERVER_FAILURE_THRESHOLD, SERVER_PROBE_INTERVAL)
+    for server in CS_SERVERS
+}
+
+async def query_cs_server(server):
+    breaker = server_breakers[server["id"]]
+    # Down server: answer offline right away instead of waiting out the timeout
+    if not breaker.allow():
+        return offline_status(server)
+    timeout = server.get("timeout", SERVER_QUERY_TIMEOUT)
     try:
-        loop = asyncio.get_event_loop()
-        address = (CS_SERVER_IP, CS_SERVER_PORT)
+        address = (server["ip"], server["port"])
         
-        info = await loop.run_in_executor(None, lambda: a2s.info(address, timeout=5))
-        players = await loop.run_in_executor(None, lambda: a2s.players(address, timeout=5))
+        # Both queries run at once on the event loop, under one shared deadline
+        info, players = await asyncio.wait_for(
+            asyncio.gather(
+                a2s.ainfo(address, timeout=timeout),
+                a2s.aplayers(address, timeout=timeout)
+            ),
+            timeout
+        )
         
         player_list = [{"name": p.name, "score": p.score, "duration": int(p.duration)} for p in players if p.name]
         
+        breaker.record_success()
         return {
+            "id": server["id"],
             "online": True,
-            "server_name": info.server_name or CS_SERVER_NAME,
-            "server_ip": f"{CS_SERVER_IP}:{CS_SERVER_PORT}",
+            "server_name": info.server_name or server["name"],
+            "server_ip": f"{server['ip']}:{server['port']}",
             "current_map": info.map_name or "de_dust2",
             "players_online": info.player_count,
             "max_players": info.max_players,
             "ping": int(info.ping * 1000) if hasattr(info, 'ping') else 0,
             "players": player_list
         }
+    except asyncio.TimeoutError:
+        logging.warning(f"CS server {server['name']} query timed out after {timeout}s")
     except Exception as e:
-        logging.warning(f"Failed to query CS server: {e}")
-        return {
-            "online": False,
-            "server_name": CS_SERVER_NAME,
-            "server_ip": f"{CS_SERVER_IP}:{CS_SERVER_PORT}",
-            "current_map": "N/A",
-            "players_online": 0,
-            "max_players": 32,
-            "ping": 0,
-            "players": []
-        }
+        logging.warning(f"Failed to query CS server {server['name']}: {e}")
+    breaker.record_failure()
+    return offline_status(server)
+
+def offline_status(server):
+    return {
+        "id": server["id"],
+        "online": False,
+        "server_name": server["name"],
+        "server_ip": f"{server['ip']}:{server['port']}",
+        "current_map": "N/A",
+        "players_online": 0,
+        "max_players": 32,
+        "ping": 0,
+        "players": []
+    }
+
+# Last status of every server seen by poll_cs_servers(), by server id, served by
+# the status routes. updated_at stays None until the first query has finished.
+server_status_cache = {server["id"]: {**offline_status(server), "updated_at": None} for server in CS_SERVERS}
+
+async def poll_cs_servers():
+    """Query every game server every SERVER_STATUS_INTERVAL seconds, however many visitors ask for it"""
+    while True:
+        # All servers at once, each bounded by its own timeout
+        statuses = await asyncio.gather(*(query_cs_server(server) for server in CS_SERVERS))
+        updated_at = datetime.now(timezone.utc).isoformat()
+        for server_status in statuses:
+            server_status_cache[server_status["id"]] = {**server_status, "updated_at": updated_at}
+        await asyncio.sleep(SERVER_STATUS_INTERVAL)
 
 # ==================== DISCORD OAUTH ROUTES ====================
 
@@ -730,13 +944,16 @@ async def update_profile(data: ProfileUpdate, user = Depends(require_auth)):
 
 @api_router.get("/server-status", response_model=ServerStatusResponse)
 async def get_server_status():
-    return await query_cs_server()
+    return server_status_cache[CS_SERVERS[0]["id"]]
+
+@api_router.get("/servers", response_model=List[ServerStatusResponse])
+async def get_servers():
+    return [server_status_cache[server["id"]] for server in CS_SERVERS]
 
 # ==================== DASHBOARD ROUTES ====================
 
 @api_router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_dashboard_stats():
-    server_status = await query_cs_server()
     total_users = await db.users.count_documents({})
     total_players = await db.players.count_documents({})
     total_bans = await db.bans.count_documents({})
@@ -746,7 +963,7 @@ async def get_dashboard_stats():
         "total_users": total_users,
         "total_players": total_players,
         "total_bans": total_bans,
-        "online_players": server_status["players_online"],
+        "online_players": sum(server_status["players_online"] for server_status in server_status_cache.values()),
         "pending_applications": pending_apps
     }
 
@@ -1539,7 +1756,11 @@ async def startup():
     await init_default_admin()
     await init_default_forum_categories()
     await init_default_team()
+    # Index builds can take a while on big collections, don't hold up startup
+    app.state.index_build = asyncio.create_task(ensure_indexes())
+    app.state.status_poller = asyncio.create_task(poll_cs_servers())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.status_poller.cancel()
     client.close()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Ban/unban reconciliation benchmark
+Builds a synthetic BAN_HISTORY log (500k events by default, with a few
+repeat offenders that have thousands of bans each) and times
+tokenize_ban_lines + sync_data.parse_ban_events + reconcile_bans against
+the previous nested-loop implementation, then checks both give the same
+result.
+
+Usage:
+    python3 benchmarks/ban_reconcile.py [events] [--no-legacy]
+
+Needs the sync_data.py requirements (pymongo) installed.
+"""
+
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sync_data
+from shadowzm_sync.ban_log import tokenize_ban_lines
+from synthetic_log import make_log
+
+
+def legacy_parse(lines):
+    """The nested-loop parse + reconcile that sync_data used before"""
+    all_bans, unban_events = {}, {}
+    for line in lines:
+        line = line.strip()
+        if 'unbanned' in line or 'Ban time is up' in line:
+            time_match = re.search(r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2})', line)
+            timestamp = time_match.group(1) if time_match else None
+            unban_match = re.search(r'unbanned .+? <([^>]+)>', line)
+            if unban_match:
+                unban_events.setdefault(unban_match.group(1), []).append(timestamp)
+            expire_match = re.search(r'Ban time is up for: .+ \[([^\]]+)\]', line)
+            if expire_match:
+                unban_events.setdefault(expire_match.group(1), []).append(timestamp)
+        elif 'banned' in line and '||' in line:
+            pattern = r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2}): (.+?) <([^>]*)> banned (.+?) <([^>]+)> \|\| Reason: "([^"]*)" \|\| Ban Length: (.+)'
+            match = re.match(pattern, line)
+            if match:
+                timestamp, admin, _, player, steamid, reason, duration = match.groups()
+                dt = datetime.strptime(timestamp, '%m/%d/%Y - %H:%M:%S').replace(tzinfo=timezone.utc)
+                ban_data = {'steamid': steamid.strip(), 'ban_date': dt.isoformat(),
+                            'is_expired': False, 'expires_at': None}
+                minutes = sync_data.parse_duration_to_minutes(duration.strip())
+                if minutes is not None:
+                    expiry_dt = dt + timedelta(minutes=minutes)
+                    ban_data['expires_at'] = expiry_dt.isoformat()
+                    ban_data['is_expired'] = expiry_dt < datetime.now(timezone.utc)
+                all_bans.setdefault(steamid.strip(), []).append(ban_data)
+
+    final_bans = []
+    for steamid, bans in all_bans.items():
+        for ban in bans:
+            for unban_time in unban_events.get(steamid, []):
+                if unban_time and ban.get('ban_date'):
+                    unban_dt = datetime.strptime(unban_time, '%m/%d/%Y - %H:%M:%S')
+                    ban_dt = datetime.fromisoformat(ban['ban_date'].replace('Z', '+00:00')).replace(tzinfo=None)
+                    if unban_dt > ban_dt:
+                        ban['is_expired'] = True
+                        break
+            final_bans.append(ban)
+    return final_bans
+
+
+def current_parse(lines):
+    all_bans, unban_events = {}, {}
+    sync_data.parse_ban_events(tokenize_ban_lines(lines), all_bans, unban_events)
+    return sync_data.reconcile_bans(all_bans, unban_events)
+
+
+def timed(label, func, lines):
+    start = time.perf_counter()
+    result = func(lines)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<8} {elapsed:8.2f} s  ({len(result)} bans)")
+    return result, elapsed
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    events = int(args[0]) if args else 500_000
+
+    print(f"Generating {events} events...")
+    lines = make_log(events)
+
+    current, current_time = timed("current", current_parse, lines)
+    if '--no-legacy' in sys.argv:
+        return
+
+    legacy, legacy_time = timed("legacy", legacy_parse, lines)
+    print(f"  speedup  {legacy_time / current_time:8.1f}x")
+
+    fields = ('steamid', 'ban_date', 'expires_at', 'is_expired')
+    mismatches = sum(
+        1 for old, new in zip(legacy, current)
+        if any(old[field] != new[field] for field in fields)
+    )
+    print(f"  mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Ban log tokenizer microbenchmark
+Times shadowzm_sync.ban_log.tokenize_ban_line against the per-line
+`in` checks + re.search/re.match calls the sync scripts used before,
+and checks both extract the same events.
+
+Usage:
+    python3 benchmarks/ban_tokenizer.py [lines]
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadowzm_sync.ban_log import BAN, EXPIRE, UNBAN, tokenize_ban_line
+from synthetic_log import make_log
+
+
+def legacy_tokenize(line):
+    """The classification every sync script did inline before"""
+    line = line.strip()
+    if 'unbanned' in line or 'Ban time is up' in line:
+        time_match = re.search(r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2})', line)
+        timestamp = time_match.group(1) if time_match else None
+        unban_match = re.search(r'unbanned .+? <([^>]+)>', line)
+        if unban_match:
+            return (UNBAN, timestamp, unban_match.group(1))
+        expire_match = re.search(r'Ban time is up for: .+ \[([^\]]+)\]', line)
+        if expire_match:
+            return (EXPIRE, timestamp, expire_match.group(1))
+    elif 'banned' in line and '||' in line:
+        pattern = r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2}): (.+?) <([^>]*)> banned (.+?) <([^>]+)> \|\| Reason: "([^"]*)" \|\| Ban Length: (.+)'
+        match = re.match(pattern, line)
+        if match:
+            timestamp, admin, _, player, steamid, reason, duration = match.groups()
+            return (BAN, timestamp, steamid.strip(), player.strip(), admin.strip(),
+                    reason.strip(), duration.strip())
+    return None
+
+
+def current_tokenize(line):
+    event = tokenize_ban_line(line)
+    if event is None or event[0] == BAN:
+        return event
+    return event[:3]
+
+
+def timed(label, func, lines, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = [func(line) for line in lines]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<8} {best * 1e9 / len(lines):8.0f} ns/line")
+    return result, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lines = make_log(count)
+    # Other AMXX log lines that end up in the same folder
+    lines += ['L 01/01/2023 - 00:00:00: "Player<1><STEAM_0:0:1><>" connected, address "1.2.3.4:27005"\n'] * (count // 20)
+
+    print(f"{len(lines)} lines")
+    legacy, legacy_time = timed("legacy", legacy_tokenize, lines)
+    current, current_time = timed("current", current_tokenize, lines)
+    print(f"  speedup  {legacy_time / current_time:8.1f}x")
+    print(f"  mismatches {sum(1 for old, new in zip(legacy, current) if old != new)}")
+
+
+if __name__ == "__main__":
+    main()
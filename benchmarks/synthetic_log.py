@@ -0,0 +1,33 @@
+"""
+Synthetic BAN_HISTORY log for the benchmarks
+"""
+
+import random
+from datetime import datetime, timedelta
+
+DURATIONS = ['Permanent', '30 minutes', '2 hours', '1 day', '1 week', '60']
+
+
+def make_log(events, seed=1):
+    """Synthetic BAN_HISTORY lines in chronological order"""
+    rng = random.Random(seed)
+    # 50 repeat offenders take 20% of the events, the rest is spread thin
+    offenders = [f"STEAM_0:1:{9000000 + i}" for i in range(50)]
+    players = max(1, events // 5)
+    start = datetime(2023, 1, 1)
+    lines = []
+    for i in range(events):
+        if rng.random() < 0.2:
+            steamid = rng.choice(offenders)
+        else:
+            steamid = f"STEAM_0:0:{rng.randrange(players)}"
+        stamp = (start + timedelta(seconds=i * 30)).strftime('%m/%d/%Y - %H:%M:%S')
+        roll = rng.random()
+        if roll < 0.6:
+            lines.append(f'L {stamp}: Admin <STEAM_0:0:1> banned Player{i} <{steamid}> '
+                         f'|| Reason: "cheating" || Ban Length: {rng.choice(DURATIONS)}\n')
+        elif roll < 0.8:
+            lines.append(f'L {stamp}: Admin <STEAM_0:0:1> unbanned Player{i} <{steamid}>\n')
+        else:
+            lines.append(f'L {stamp}: Ban time is up for: Player{i} [{steamid}]\n')
+    return lines
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Batch webhook payload size
+Compares the body stats_sync.py sends for a batch of players as JSON rows,
+JSON columns, and both gzip/zstd compressed, plus the time to encode each.
+
+Usage:
+    python3 benchmarks/webhook_payload.py [players]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadowzm_sync.payload import encode_body, to_columns
+
+
+def make_players(count):
+    rng = random.Random(1)
+    players = []
+    for i in range(count):
+        kills = rng.randint(0, 50_000)
+        players.append({
+            "nickname": f"Player{i}_{rng.choice(['pro', 'noob', 'zm', 'x'])}",
+            "steamid": f"STEAM_0:{i % 2}:{rng.randint(1, 400_000_000)}",
+            "kills": kills,
+            "deaths": rng.randint(0, 50_000),
+            "headshots": rng.randint(0, kills)
+        })
+    return players
+
+
+def measure(label, payload, compression):
+    start = time.perf_counter()
+    body, _ = encode_body(payload, compression)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<16} {len(body):>9} bytes  {elapsed * 1000:6.1f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    players = make_players(count)
+    rows = {"secret": "x", "players": players}
+    columns = {"secret": "x", "players": to_columns(players)}
+
+    compressions = [None, "gzip"]
+    try:
+        import zstandard  # noqa: F401
+        compressions.append("zstd")
+    except ImportError:
+        print("(zstandard not installed, skipping zstd)")
+
+    print(f"{count} players")
+    for layout, payload in (("rows", rows), ("columns", columns)):
+        for compression in compressions:
+            measure(f"{layout}+{compression or 'plain'}", payload, compression)
+
+
+if __name__ == "__main__":
+    main()
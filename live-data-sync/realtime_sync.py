@@ -3,22 +3,34 @@
 ShadowZM REAL-TIME Data Sync Script
 ====================================
 - Watches ban logs for changes and syncs INSTANTLY
-- Syncs player stats every 60 seconds
+  (inotify / watchdog file events, falls back to polling every 5 seconds)
+- Syncs player stats as soon as csstats.dat changed (checked at least every 60 seconds)
 - Server status is already live on your website (queries server directly)
 
+The real-time mode is the asyncio daemon in sync_daemon.py, run with the
+settings below.
+
 Usage:
     python3 realtime_sync.py
+
+Needs the shadowzm_sync/ folder, sync_daemon.py and sync_data.py from the
+repo next to this script when it is copied somewhere on its own
+(e.g. /root/shadowzm_sync/, /root/sync_daemon.py, /root/sync_data.py for
+/root/realtime_sync.py).
 """
 
-import struct
-import glob
-import re
 import os
 import sys
-import time
-import hashlib
 from datetime import datetime, timezone
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+
+# Shared sync helpers (shadowzm_sync/): the repo root, or a copy next to this script
+# (the script's own folder is already on sys.path)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadowzm_sync.bulk import bulk_write_chunks
+from shadowzm_sync.csstats import read_csstats
+from shadowzm_sync.player_diff import PlayerDiff
+from shadowzm_sync.staging import swap_in_collection
 
 # ============================================================
 # CONFIGURATION
@@ -32,8 +44,35 @@ CSSTATS_FILE = "/var/lib/pterodactyl/volumes/7cc6beed-d649-427e-b172-3ae51a81a1b
 BAN_LOGS_DIR = "/var/lib/pterodactyl/volumes/7cc6beed-d649-427e-b172-3ae51a81a1b9/cstrike/addons/amxmodx/logs"
 
 # Sync intervals
-PLAYER_SYNC_INTERVAL = 60  # Sync players every 60 seconds
-BAN_CHECK_INTERVAL = 5     # Check for new bans every 5 seconds
+PLAYER_SYNC_INTERVAL = 60  # Longest wait between csstats.dat checks
+BAN_CHECK_INTERVAL = 5     # Check for new bans every 5 seconds (poll mode / retries)
+PLAYER_BATCH_SIZE = 1000   # Player writes per bulk_write round trip
+
+# MongoDB connections the real-time daemon keeps open
+MONGO_POOL_SIZE = 10
+
+# How file changes are noticed: "auto" (inotify, then watchdog, then polling),
+# "inotify", "watchdog" or "poll"
+WATCH_MODE = "auto"
+WATCH_DEBOUNCE = 0.2       # Quiet time (seconds) that ends a burst of file events
+
+# Map csstats.dat instead of reading a full copy of it.
+# Leave off unless csstats.dat is replaced by rename: AMXX rewriting it in
+# place while it is mapped kills this process with SIGBUS (see csstats.py).
+CSSTATS_USE_MMAP = False
+
+# Remembers how far each ban log was synced, so a ban change only parses the new lines
+BAN_CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ban_log_checkpoint.json")
+
+# Processes used to parse old (no longer written) ban logs on a cold start
+# or full resync. 0 parses every file in this process, os.cpu_count() uses every core.
+BAN_PARSE_WORKERS = 0
+
+# Parsed events of old ban logs are cached here, so they are only parsed once (None disables)
+BAN_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ban_log_cache")
+
+# Players written by the last player sync, so each cycle only upserts changes
+player_diff = PlayerDiff()
 
 # ============================================================
 # HELPER FUNCTIONS
@@ -50,93 +89,34 @@ def get_db():
         return None, None
 
 
-def get_ban_files_hash():
-    """Get hash of all ban log files to detect changes"""
-    log_files = sorted(glob.glob(f"{BAN_LOGS_DIR}/BAN_HISTORY_*.log"))
-    if not log_files:
-        return ""
-    
-    hash_content = ""
-    for f in log_files:
-        try:
-            stat = os.stat(f)
-            hash_content += f"{f}:{stat.st_size}:{stat.st_mtime};"
-        except:
-            pass
-    
-    return hashlib.md5(hash_content.encode()).hexdigest()
-
-
 def parse_csstats(filepath):
     """Parse csstats.dat file"""
-    if not os.path.exists(filepath):
-        return []
-    
     try:
-        with open(filepath, 'rb') as f:
-            data = f.read()
+        stats = read_csstats(filepath, use_mmap=CSSTATS_USE_MMAP)
     except:
         return []
     
-    if len(data) < 10:
+    if stats is None:
         return []
     
     players = []
-    offset = 2
-    
-    while offset < len(data) - 10:
-        try:
-            if offset + 2 > len(data):
-                break
-            name_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if name_len == 0 or name_len > 64:
-                break
-            
-            if offset + name_len > len(data):
-                break
-            name = data[offset:offset+name_len].rstrip(b'\x00').decode('utf-8', errors='ignore')
-            offset += name_len
-            
-            if offset + 2 > len(data):
-                break
-            steamid_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if steamid_len == 0 or steamid_len > 64:
-                break
-            
-            if offset + steamid_len > len(data):
-                break
-            steamid = data[offset:offset+steamid_len].rstrip(b'\x00').decode('utf-8', errors='ignore')
-            offset += steamid_len
-            
-            if offset + 28 > len(data):
-                break
-            
-            stats = list(struct.unpack('<7i', data[offset:offset+28]))
-            offset += 28
-            
-            tks, damage, deaths, kills, shots, hits, headshots = stats
-            
-            if kills < 0 or deaths < 0 or not steamid:
-                continue
-            
-            kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
-            
-            players.append({
-                'nickname': name,
-                'steamid': steamid,
-                'kills': max(0, kills),
-                'deaths': max(0, deaths),
-                'headshots': max(0, headshots),
-                'kd_ratio': kd_ratio,
-                'level': min(50, kills // 500),
-                'rank': 0
-            })
-        except:
-            break
+    for name, steamid, deaths, kills, headshots in zip(
+            stats.nickname, stats.steamid, stats.deaths, stats.kills, stats.headshots):
+        if kills < 0 or deaths < 0 or not steamid:
+            continue
+        
+        kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
+        
+        players.append({
+            'nickname': name,
+            'steamid': steamid,
+            'kills': max(0, kills),
+            'deaths': max(0, deaths),
+            'headshots': max(0, headshots),
+            'kd_ratio': kd_ratio,
+            'level': min(50, kills // 500),
+            'rank': 0
+        })
     
     players.sort(key=lambda x: x['kills'], reverse=True)
     for i, p in enumerate(players):
@@ -145,187 +125,90 @@ def parse_csstats(filepath):
     return players
 
 
-def parse_ban_logs(log_dir):
-    """Parse ban history logs - tracks order of events to get CURRENT ban status"""
-    if not os.path.exists(log_dir):
-        return []
+def sync_players(db, players):
+    """Sync players to database - only players that changed since the last sync.
+    Returns (written, failed)."""
+    if not players:
+        return 0, 0
     
-    log_files = glob.glob(f"{log_dir}/BAN_HISTORY_*.log")
-    if not log_files:
-        return []
+    changes = player_diff.diff(players)
     
-    # Track the LATEST action for each player (ban or unban)
-    # Key: steamid, Value: {'action': 'ban'/'unban', 'data': ban_data or None}
-    player_status = {}
+    # Players that vanished from csstats.dat are left in the database
+    last_seen = datetime.now(timezone.utc).isoformat()
+    operations = []
+    for player in changes.inserted + changes.changed:
+        player_data = {
+            'nickname': player['nickname'],
+            'steamid': player['steamid'],
+            'kills': player['kills'],
+            'deaths': player['deaths'],
+            'headshots': player['headshots'],
+            'kd_ratio': player['kd_ratio'],
+            'level': player['level'],
+            'rank': player['rank'],
+            'last_seen': last_seen
+        }
+        operations.append(UpdateOne(
+            {'steamid': player['steamid']},
+            {'$set': player_data, '$setOnInsert': {'id': player['steamid']}},
+            upsert=True
+        ))
+    # Players that only moved in the table just get their new rank
+    operations += [UpdateOne({'steamid': steamid}, {'$set': {'rank': rank}})
+                   for steamid, rank in changes.reranked]
     
-    for log_file in sorted(log_files):
-        try:
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    # Check for unban (ban expired or manually unbanned)
-                    if 'unbanned' in line or 'Ban time is up' in line:
-                        unban_match = re.search(r'unbanned .+? <([^>]+)>', line)
-                        if unban_match:
-                            steamid = unban_match.group(1)
-                            player_status[steamid] = {'action': 'unban', 'data': None}
-                        
-                        expire_match = re.search(r'Ban time is up for: .+ \[([^\]]+)\]', line)
-                        if expire_match:
-                            steamid = expire_match.group(1)
-                            player_status[steamid] = {'action': 'unban', 'data': None}
-                    
-                    # Check for ban
-                    elif 'banned' in line and '||' in line:
-                        pattern = r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2}): (.+?) <([^>]*)> banned (.+?) <([^>]+)> \|\| Reason: "([^"]*)" \|\| Ban Length: (.+)'
-                        match = re.match(pattern, line)
-                        if match:
-                            timestamp_str, admin_name, admin_steam, player_name, player_steam, reason, duration = match.groups()
-                            ban_data = {
-                                'timestamp': timestamp_str,
-                                'admin_name': admin_name.strip(),
-                                'player_nickname': player_name.strip(),
-                                'steamid': player_steam.strip(),
-                                'reason': reason.strip() if reason.strip() else "Banned",
-                                'duration': duration.strip()
-                            }
-                            player_status[player_steam.strip()] = {'action': 'ban', 'data': ban_data}
-        except:
-            continue
+    result = bulk_write_chunks(db.players, operations, PLAYER_BATCH_SIZE, "players")
     
-    # Get all players whose LATEST action was a ban
-    active_bans = [v['data'] for v in player_status.values() if v['action'] == 'ban' and v['data'] is not None]
-    return active_bans
-
-
-def sync_players(db, players):
-    """Sync players to database"""
-    if not players:
-        return 0
+    # Keep the old snapshot on errors so the next sync retries those players
+    if not result.failed:
+        player_diff.commit(changes)
     
-    synced = 0
-    for player in players:
-        try:
-            player_data = {
-                'nickname': player['nickname'],
-                'steamid': player['steamid'],
-                'kills': player['kills'],
-                'deaths': player['deaths'],
-                'headshots': player['headshots'],
-                'kd_ratio': player['kd_ratio'],
-                'level': player['level'],
-                'rank': player['rank'],
-                'last_seen': datetime.now(timezone.utc).isoformat()
-            }
-            
-            db.players.update_one(
-                {'steamid': player['steamid']},
-                {'$set': player_data, '$setOnInsert': {'id': player['steamid']}},
-                upsert=True
-            )
-            synced += 1
-        except:
-            pass
+    return result.written, result.failed
     
-    return synced
+    return result.written
 
 
 def sync_bans(db, bans):
-    """Sync bans to database"""
+    """Replace the banlist - built in a staging collection and swapped in at once"""
     try:
-        db.bans.delete_many({})
-    except:
-        return 0
-    
-    if not bans:
+        result = swap_in_collection(db, 'bans', bans)
+    except Exception as e:
+        print(f"[ERROR] Failed to sync bans: {e}")
         return 0
     
-    synced = 0
-    for ban in bans:
-        try:
-            ban_data = {
-                'id': ban['steamid'] + '_' + str(hash(ban['timestamp']))[-6:],
-                'player_nickname': ban['player_nickname'],
-                'steamid': ban['steamid'],
-                'ip': 'Hidden',
-                'reason': ban['reason'],
-                'admin_name': ban['admin_name'],
-                'duration': ban['duration'],
-                'ban_date': datetime.now(timezone.utc).isoformat()
-            }
-            db.bans.insert_one(ban_data)
-            synced += 1
-        except:
-            pass
-    
-    return synced
+    return 0 if result.failed else result.written
 
 
 # ============================================================
 # MAIN REAL-TIME SYNC
 # ============================================================
 
+def sync_data_settings():
+    """The settings above under their sync_data.py names"""
+    return dict(
+        MONGO_URL=MONGO_URL,
+        DB_NAME=DB_NAME,
+        CSSTATS_FILE=CSSTATS_FILE,
+        BAN_LOGS_DIR=BAN_LOGS_DIR,
+        SYNC_INTERVAL=PLAYER_SYNC_INTERVAL,
+        CSSTATS_USE_MMAP=CSSTATS_USE_MMAP,
+        PLAYER_BATCH_SIZE=PLAYER_BATCH_SIZE,
+        BAN_CHECKPOINT_FILE=BAN_CHECKPOINT_FILE,
+        BAN_PARSE_WORKERS=BAN_PARSE_WORKERS,
+        BAN_CACHE_DIR=BAN_CACHE_DIR,
+    )
+
+
 def run_realtime():
-    """Run real-time sync with file watching"""
-    print("\n" + "="*60)
-    print("  ShadowZM REAL-TIME Data Sync")
-    print("="*60)
-    print(f"\n[CONFIG]")
-    print(f"  MongoDB:     {MONGO_URL}")
-    print(f"  Database:    {DB_NAME}")
-    print(f"  Stats File:  {CSSTATS_FILE}")
-    print(f"  Ban Logs:    {BAN_LOGS_DIR}")
-    print(f"\n  Player sync: Every {PLAYER_SYNC_INTERVAL} seconds")
-    print(f"  Ban check:   Every {BAN_CHECK_INTERVAL} seconds (instant sync on change)")
-    print("="*60)
-    print("\nPress Ctrl+C to stop\n")
-    
-    # Test connection
-    client, db = get_db()
-    if db is None:
-        print("[FAILED] Cannot connect to MongoDB")
-        return
-    client.close()
-    
-    last_ban_hash = ""
-    last_player_sync = 0
-    
-    while True:
-        try:
-            now = time.time()
-            
-            # Check for ban changes (every 5 seconds)
-            current_ban_hash = get_ban_files_hash()
-            
-            if current_ban_hash != last_ban_hash:
-                # Ban files changed - sync immediately!
-                client, db = get_db()
-                if db is not None:
-                    bans = parse_ban_logs(BAN_LOGS_DIR)
-                    count = sync_bans(db, bans)
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 🚨 BAN CHANGE DETECTED - Synced {count} bans instantly!")
-                    client.close()
-                last_ban_hash = current_ban_hash
-            
-            # Sync players (every 60 seconds)
-            if now - last_player_sync >= PLAYER_SYNC_INTERVAL:
-                client, db = get_db()
-                if db is not None:
-                    players = parse_csstats(CSSTATS_FILE)
-                    count = sync_players(db, players)
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 👥 Synced {count} players")
-                    client.close()
-                last_player_sync = now
-            
-            time.sleep(BAN_CHECK_INTERVAL)
-            
-        except KeyboardInterrupt:
-            print("\n\nStopping...")
-            break
-        except Exception as e:
-            print(f"[ERROR] {e}")
-            time.sleep(BAN_CHECK_INTERVAL)
+    """Run real-time sync - the asyncio daemon in sync_daemon.py with the settings above"""
+    import sync_daemon
+    sync_daemon.main(
+        **sync_data_settings(),
+        BAN_CHECK_INTERVAL=BAN_CHECK_INTERVAL,
+        MONGO_POOL_SIZE=MONGO_POOL_SIZE,
+        WATCH_MODE=WATCH_MODE,
+        WATCH_DEBOUNCE=WATCH_DEBOUNCE,
+    )
 
 
 def clear_all_data():
@@ -338,6 +221,13 @@ def clear_all_data():
     
     db.players.delete_many({})
     db.bans.delete_many({})
+    
+    # Otherwise the next sync thinks everything is written already and skips
+    # the unchanged stats file and ban logs
+    import sync_data
+    sync_data.configure(**sync_data_settings())
+    sync_data.reset_state()
+    player_diff.reset()
     print("✓ All players and bans cleared!")
     client.close()
 
@@ -355,11 +245,17 @@ def sync_once():
     
     print("\n[1] Syncing players...")
     players = parse_csstats(CSSTATS_FILE)
-    p_count = sync_players(db, players)
-    print(f"    ✓ Synced {p_count} players")
+    p_count, p_failed = sync_players(db, players)
+    if p_failed:
+        print(f"    ✗ Synced {p_count} players, {p_failed} writes failed")
+    else:
+        print(f"    ✓ Synced {p_count} players")
     
     print("\n[2] Syncing bans...")
-    bans = parse_ban_logs(BAN_LOGS_DIR)
+    # Same documents as the real-time daemon writes (expired bans included)
+    import sync_data
+    sync_data.configure(**sync_data_settings())
+    bans = sync_data.parse_ban_logs(BAN_LOGS_DIR)
     b_count = sync_bans(db, bans)
     print(f"    ✓ Synced {b_count} bans")
     
@@ -7,18 +7,26 @@ This script syncs player stats and ban data from your game server to MongoDB.
 Run manually to test:
     python3 simple_sync.py
 
-Run continuously:
+Run continuously (the asyncio daemon in sync_daemon.py, with the settings below):
     python3 simple_sync.py --continuous
+
+Needs the shadowzm_sync/ folder from the repo next to this script when it
+is copied somewhere on its own (e.g. /root/shadowzm_sync/ for /root/simple_sync.py).
+--continuous also needs sync_daemon.py and sync_data.py next to it.
 """
 
-import struct
 import glob
-import re
 import os
 import sys
 from datetime import datetime, timezone
 from pymongo import MongoClient
 
+# Shared sync helpers (shadowzm_sync/): the repo root, or a copy next to this script
+# (the script's own folder is already on sys.path)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadowzm_sync.ban_log import BAN, ban_id, tokenize_ban_lines
+from shadowzm_sync.csstats import read_csstats
+
 # ============================================================
 # CONFIGURATION - YOUR SPECIFIC PATHS (ALREADY SET)
 # ============================================================
@@ -35,7 +43,8 @@ DB_NAME = "shadowzm_database"
 CSSTATS_FILE = "/var/lib/pterodactyl/volumes/7cc6beed-d649-427e-b172-3ae51a81a1b9/cstrike/addons/amxmodx/data/csstats.dat"
 BAN_LOGS_DIR = "/var/lib/pterodactyl/volumes/7cc6beed-d649-427e-b172-3ae51a81a1b9/cstrike/addons/amxmodx/logs"
 
-# How often to sync (in seconds) when running continuously
+# Longest wait (in seconds) between csstats.dat checks when running continuously
+# (file changes are picked up right away)
 SYNC_INTERVAL = 60
 
 # ============================================================
@@ -111,9 +120,8 @@ def parse_csstats(filepath):
         return []
     
     try:
-        with open(filepath, 'rb') as f:
-            data = f.read()
-        print(f"  ✓ Read {len(data)} bytes from stats file")
+        stats = read_csstats(filepath)
+        print(f"  ✓ Read {os.path.getsize(filepath)} bytes from stats file")
     except PermissionError:
         print(f"  ✗ Permission denied reading: {filepath}")
         print("  Try: sudo chmod 644 {filepath}")
@@ -122,74 +130,31 @@ def parse_csstats(filepath):
         print(f"  ✗ Error reading file: {e}")
         return []
     
-    if len(data) < 10:
+    if stats is None or stats.version is None:
         print("  ✗ Stats file is too small or empty")
         return []
     
     players = []
-    offset = 2  # Skip header
     
-    while offset < len(data) - 10:
-        try:
-            # Read name length
-            if offset + 2 > len(data):
-                break
-            name_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if name_len == 0 or name_len > 64:
-                break
-            
-            # Read name
-            if offset + name_len > len(data):
-                break
-            name = data[offset:offset+name_len].rstrip(b'\x00').decode('utf-8', errors='ignore')
-            offset += name_len
-            
-            # Read steamid length
-            if offset + 2 > len(data):
-                break
-            steamid_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if steamid_len == 0 or steamid_len > 64:
-                break
-            
-            # Read steamid
-            if offset + steamid_len > len(data):
-                break
-            steamid = data[offset:offset+steamid_len].rstrip(b'\x00').decode('utf-8', errors='ignore')
-            offset += steamid_len
-            
-            # Read stats (7 integers = 28 bytes)
-            if offset + 28 > len(data):
-                break
-            
-            stats = list(struct.unpack('<7i', data[offset:offset+28]))
-            offset += 28
-            
-            tks, damage, deaths, kills, shots, hits, headshots = stats
-            
-            # Skip invalid entries
-            if kills < 0 or deaths < 0 or not steamid:
-                continue
-            
-            # Calculate KD ratio
-            kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
-            
-            players.append({
-                'nickname': name,
-                'steamid': steamid,
-                'kills': max(0, kills),
-                'deaths': max(0, deaths),
-                'headshots': max(0, headshots),
-                'kd_ratio': kd_ratio,
-                'level': min(50, kills // 500),
-                'rank': 0
-            })
-            
-        except Exception as e:
-            break
+    for name, steamid, deaths, kills, headshots in zip(
+            stats.nickname, stats.steamid, stats.deaths, stats.kills, stats.headshots):
+        # Skip invalid entries
+        if kills < 0 or deaths < 0 or not steamid:
+            continue
+        
+        # Calculate KD ratio
+        kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
+        
+        players.append({
+            'nickname': name,
+            'steamid': steamid,
+            'kills': max(0, kills),
+            'deaths': max(0, deaths),
+            'headshots': max(0, headshots),
+            'kd_ratio': kd_ratio,
+            'level': min(50, kills // 500),
+            'rank': 0
+        })
     
     # Sort by kills (highest first)
     players.sort(key=lambda x: x['kills'], reverse=True)
@@ -225,32 +190,21 @@ def parse_ban_logs(log_dir):
     for log_file in sorted(log_files):
         try:
             with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    # Check for unban entries
-                    if 'unbanned' in line or 'Ban time is up' in line:
-                        unban_match = re.search(r'unbanned .+? <([^>]+)>', line)
-                        if unban_match:
-                            unbanned_steamids.add(unban_match.group(1))
-                        expire_match = re.search(r'Ban time is up for: .+ \[([^\]]+)\]', line)
-                        if expire_match:
-                            unbanned_steamids.add(expire_match.group(1))
+                for kind, timestamp, steamid, player, admin, reason, duration in tokenize_ban_lines(f):
+                    # Check for unban
+                    if kind != BAN:
+                        unbanned_steamids.add(steamid)
                     
-                    # Check for ban entries
-                    elif 'banned' in line and '||' in line:
-                        pattern = r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2}): (.+?) <([^>]*)> banned (.+?) <([^>]+)> \|\| Reason: "([^"]*)" \|\| Ban Length: (.+)'
-                        match = re.match(pattern, line)
-                        if match:
-                            timestamp_str, admin_name, admin_steam, player_name, player_steam, reason, duration = match.groups()
-                            all_bans.append({
-                                'timestamp': timestamp_str,
-                                'admin_name': admin_name.strip(),
-                                'player_nickname': player_name.strip(),
-                                'steamid': player_steam.strip(),
-                                'reason': reason.strip() if reason.strip() else "Banned",
-                                'duration': duration.strip()
-                            })
+                    # Check for ban
+                    else:
+                        all_bans.append({
+                            'timestamp': timestamp,
+                            'admin_name': admin,
+                            'player_nickname': player,
+                            'steamid': steamid,
+                            'reason': reason if reason else "Banned",
+                            'duration': duration
+                        })
         except Exception as e:
             print(f"  ! Error reading {log_file}: {e}")
             continue
@@ -330,7 +284,7 @@ def sync_bans_to_db(db, bans):
     for ban in bans:
         try:
             ban_data = {
-                'id': ban['steamid'] + '_' + str(hash(ban['timestamp']))[-6:],
+                'id': ban_id(ban['steamid'], ban['timestamp'], ban['admin_name']),
                 'player_nickname': ban['player_nickname'],
                 'steamid': ban['steamid'],
                 'ip': 'Hidden',
@@ -387,12 +341,8 @@ def run_sync_once():
 
 
 def run_continuous():
-    """Run sync continuously"""
-    import time
-    
+    """Run sync continuously - the asyncio daemon in sync_daemon.py with the settings above"""
     print_header()
-    print(f"Running in CONTINUOUS mode (every {SYNC_INTERVAL} seconds)")
-    print("Press Ctrl+C to stop\n")
     
     # Initial connection test
     client, db = test_mongodb_connection()
@@ -401,35 +351,14 @@ def run_continuous():
         return
     client.close()
     
-    while True:
-        try:
-            # Reconnect each time (more reliable)
-            client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=5000)
-            db = client[DB_NAME]
-            
-            print(f"\n--- Sync at {datetime.now().strftime('%H:%M:%S')} ---")
-            
-            # Parse and sync
-            players = parse_csstats(CSSTATS_FILE)
-            bans = parse_ban_logs(BAN_LOGS_DIR)
-            
-            if players:
-                sync_players_to_db(db, players)
-            if bans:
-                sync_bans_to_db(db, bans)
-            
-            print(f"Done. Next sync in {SYNC_INTERVAL} seconds...")
-            
-            client.close()
-            time.sleep(SYNC_INTERVAL)
-            
-        except KeyboardInterrupt:
-            print("\n\nStopping...")
-            break
-        except Exception as e:
-            print(f"\nError during sync: {e}")
-            print(f"Will retry in {SYNC_INTERVAL} seconds...")
-            time.sleep(SYNC_INTERVAL)
+    import sync_daemon
+    sync_daemon.main(
+        MONGO_URL=MONGO_URL,
+        DB_NAME=DB_NAME,
+        CSSTATS_FILE=CSSTATS_FILE,
+        BAN_LOGS_DIR=BAN_LOGS_DIR,
+        SYNC_INTERVAL=SYNC_INTERVAL,
+    )
 
 
 def show_help():
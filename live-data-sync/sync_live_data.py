@@ -3,18 +3,26 @@
 Live CS 1.6 Data Sync to Website Database
 Reads directly from server files and updates MongoDB
 Run this on your VPS or Pterodactyl server
+
+Needs the shadowzm_sync/ folder from the repo next to this script when it
+is copied somewhere on its own (e.g. /root/shadowzm_sync/).
 """
 
-import struct
 import glob
-import re
 import a2s
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import asyncio
 import os
+import sys
 from typing import List, Dict
 
+# Shared sync helpers (shadowzm_sync/): the repo root, or a copy next to this script
+# (the script's own folder is already on sys.path)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadowzm_sync.ban_log import BAN, tokenize_ban_lines
+from shadowzm_sync.csstats import read_csstats
+
 # ============ CONFIGURATION ============
 # MongoDB Connection (Your website's database)
 MONGO_URL = "mongodb://localhost:27017"  # Change if MongoDB is on different server
@@ -101,80 +109,36 @@ class CS16DataSync:
             return []
         
         try:
-            with open(filepath, 'rb') as f:
-                data = f.read()
+            stats = read_csstats(filepath)
         except Exception as e:
             print(f"❌ Error reading stats file: {e}")
             return []
         
-        if len(data) < 10:
+        if stats is None or stats.version is None:
             print("⚠️  Stats file too small or empty")
             return []
         
-        offset = 2  # Skip header
         player_count = 0
         
-        while offset < len(data) - 10:
-            try:
-                # Read name length
-                if offset + 2 > len(data):
-                    break
-                name_len = struct.unpack('<H', data[offset:offset+2])[0]
-                offset += 2
-                
-                if name_len == 0 or name_len > 64:
-                    break
-                
-                # Read name
-                if offset + name_len > len(data):
-                    break
-                name = data[offset:offset+name_len].rstrip(b'\\0').decode('utf-8', errors='ignore')
-                offset += name_len
-                
-                # Read steamid length
-                if offset + 2 > len(data):
-                    break
-                steamid_len = struct.unpack('<H', data[offset:offset+2])[0]
-                offset += 2
-                
-                if steamid_len == 0 or steamid_len > 64:
-                    break
-                
-                # Read steamid
-                if offset + steamid_len > len(data):
-                    break
-                steamid = data[offset:offset+steamid_len].rstrip(b'\\0').decode('utf-8', errors='ignore')
-                offset += steamid_len
-                
-                # Read stats (7 integers = 28 bytes)
-                if offset + 28 > len(data):
-                    break
-                
-                stats = list(struct.unpack('<7i', data[offset:offset+28]))
-                offset += 28
-                
-                tks, damage, deaths, kills, shots, hits, headshots = stats
-                
-                # Skip invalid entries
-                if kills < 0 or deaths < 0 or not steamid:
-                    continue
-                
-                # Calculate stats
-                kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
-                
-                player_count += 1
-                
-                players.append({
-                    'nickname': name,
-                    'steamid': steamid,
-                    'kills': max(0, kills),
-                    'deaths': max(0, deaths),
-                    'headshots': max(0, headshots),
-                    'kd_ratio': kd_ratio
-                })
-                
-            except Exception as e:
-                break
+        for name, steamid, deaths, kills, headshots in zip(
+                stats.nickname, stats.steamid, stats.deaths, stats.kills, stats.headshots):
+            # Skip invalid entries
+            if kills < 0 or deaths < 0 or not steamid:
+                continue
+            
+            # Calculate stats
+            kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
+            
+            player_count += 1
+            
+            players.append({
+                'nickname': name,
+                'steamid': steamid,
+                'kills': max(0, kills),
+                'deaths': max(0, deaths),
+                'headshots': max(0, headshots),
+                'kd_ratio': kd_ratio
+            })
         
         print(f"📊 Found {player_count} players in stats file")
         
@@ -200,32 +164,21 @@ class CS16DataSync:
         for log_file in sorted(log_files):
             try:
                 with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line in f:
-                        line = line.strip()
-                        
+                    for kind, timestamp, steamid, player, admin, reason, duration in tokenize_ban_lines(f):
                         # Check for unban
-                        if 'unbanned' in line or 'Ban time is up' in line:
-                            unban_match = re.search(r'unbanned .+? <([^>]+)>', line)
-                            if unban_match:
-                                unbanned_steamids.add(unban_match.group(1))
-                            expire_match = re.search(r'Ban time is up for: .+ \\[([^\\]]+)\\]', line)
-                            if expire_match:
-                                unbanned_steamids.add(expire_match.group(1))
+                        if kind != BAN:
+                            unbanned_steamids.add(steamid)
                         
                         # Check for ban
-                        elif 'banned' in line and '||' in line:
-                            pattern = r'L (\\d{2}/\\d{2}/\\d{4} - \\d{2}:\\d{2}:\\d{2}): (.+?) <([^>]*)> banned (.+?) <([^>]+)> \\|\\| Reason: "([^"]*)" \\|\\| Ban Length: (.+)'
-                            match = re.match(pattern, line)
-                            if match:
-                                timestamp_str, admin_name, admin_steam, player_name, player_steam, reason, duration = match.groups()
-                                all_bans.append({
-                                    'timestamp': timestamp_str,
-                                    'admin_name': admin_name.strip(),
-                                    'player_nickname': player_name.strip(),
-                                    'steamid': player_steam.strip(),
-                                    'reason': reason.strip() if reason.strip() else "Banned",
-                                    'duration': duration.strip()
-                                })
+                        else:
+                            all_bans.append({
+                                'timestamp': timestamp,
+                                'admin_name': admin,
+                                'player_nickname': player,
+                                'steamid': steamid,
+                                'reason': reason if reason else "Banned",
+                                'duration': duration
+                            })
             except Exception as e:
                 print(f"⚠️  Error reading {log_file}: {e}")
                 continue
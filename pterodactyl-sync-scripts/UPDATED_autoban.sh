@@ -11,6 +11,15 @@ SECRET="shadowzm-ban-secret-2024"
 
 # YOUR Pterodactyl volume path
 LOG_DIR="/var/lib/pterodactyl/volumes/d8109667-ac86-4f43-aeb3-5e84ed58df07/cstrike/addons/amxmodx/logs"
+
+# Bans are sent in one batch once no new log line arrived for BATCH_WAIT
+# seconds, or when BATCH_MAX bans are queued
+BATCH_WAIT=2
+BATCH_MAX=100
+
+# Bans and unbans the website did not take stay queued and are sent again
+# after RETRY_WAIT seconds
+RETRY_WAIT=30
 # =======================================
 
 # Colors
@@ -25,8 +34,16 @@ echo "Website: $WEBSITE_URL"
 echo "Log dir: $LOG_DIR"
 echo ""
 
-# Function to send ban to website
-send_ban() {
+# Bans are queued and sent together to the batch webhook, so a burst of
+# bans (or a restart replaying the logs) costs one request.
+# Websites without the batch webhook get one request per ban instead.
+pending_bans=()
+# Unbans/expiries waiting to be sent, as "STEAMID PlayerName"
+pending_unbans=()
+batch_endpoint=1
+retry_at=0
+
+queue_ban() {
     local player="$1"
     local steamid="$2"
     local reason="$3"
@@ -39,43 +56,140 @@ send_ban() {
     echo "  Reason: $reason"
     echo "  Admin: $admin"
     echo "  Duration: $duration"
+    echo ""
     
-    response=$(curl -s -X POST "$WEBSITE_URL/api/bans/webhook" \
-        -H "Content-Type: application/json" \
-        -d "{
-            \"secret\": \"$SECRET\",
+    # Only the fields, the senders wrap them in {} (with the secret for single bans)
+    pending_bans+=("
             \"player_nickname\": \"$player\",
             \"steamid\": \"$steamid\",
             \"reason\": \"$reason\",
             \"admin_name\": \"$admin\",
             \"duration\": \"$duration\"
-        }")
+        ")
     
-    if echo "$response" | grep -q "message"; then
-        echo -e "${GREEN}  ✓ Synced to website${NC}"
-    else
-        echo -e "${RED}  ✗ Failed: $response${NC}"
+    if [ ${#pending_bans[@]} -ge $BATCH_MAX ]; then
+        flush_queue
     fi
-    echo ""
 }
 
-# Function to remove ban from website (when unbanned)
-remove_ban() {
+queue_unban() {
     local steamid="$1"
     local player="$2"
     
     echo -e "${CYAN}[UNBAN DETECTED]${NC}"
     echo "  Player: $player"
     echo "  SteamID: $steamid"
+    echo ""
+    
+    # A ban of this player that is still queued must not be sent any more
+    local kept=() fields
+    for fields in "${pending_bans[@]}"; do
+        [[ "$fields" == *"\"steamid\": \"$steamid\""* ]] || kept+=("$fields")
+    done
+    pending_bans=("${kept[@]}")
+    
+    pending_unbans+=("$steamid $player")
+}
+
+# Send the queued unbans, then the queued bans (an unban drops the queued
+# bans it lifts, so a later re-ban is never removed by an older unban).
+# What the website did not take stays queued for the next try.
+flush_queue() {
+    [ ${#pending_unbans[@]} -eq 0 ] && [ ${#pending_bans[@]} -eq 0 ] && return
+    # The website failed a moment ago - wait before trying again
+    [ $SECONDS -lt $retry_at ] && return
+    
+    flush_unbans && flush_bans && return
+    
+    retry_at=$((SECONDS + RETRY_WAIT))
+    echo -e "${YELLOW}  $((${#pending_unbans[@]} + ${#pending_bans[@]})) change(s) kept queued, retrying in ${RETRY_WAIT}s${NC}"
+    echo ""
+}
+
+flush_unbans() {
+    local entry
+    while [ ${#pending_unbans[@]} -gt 0 ]; do
+        entry="${pending_unbans[0]}"
+        remove_ban "${entry%% *}" "${entry#* }" || return 1
+        pending_unbans=("${pending_unbans[@]:1}")
+    done
+}
+
+# Send one ban to the single ban webhook (websites without the batch one)
+send_ban() {
+    local fields="$1"
+    
+    response=$(curl -s -X POST "$WEBSITE_URL/api/bans/webhook" \
+        -H "Content-Type: application/json" \
+        -d "{
+            \"secret\": \"$SECRET\",$fields}")
+    
+    echo "$response" | grep -q "message"
+}
+
+# Function to send the queued bans to website. Returns 1 if some are still queued.
+flush_bans() {
+    [ ${#pending_bans[@]} -eq 0 ] && return 0
+    
+    local count=${#pending_bans[@]}
+    
+    if [ $batch_endpoint -eq 1 ]; then
+        local batch
+        batch=$(printf '{%s},' "${pending_bans[@]}")
+        response=$(curl -s -w "\n%{http_code}" -X POST "$WEBSITE_URL/api/bans/webhook/batch" \
+            -H "Content-Type: application/json" \
+            -d "{
+                \"secret\": \"$SECRET\",
+                \"bans\": [${batch%,}]
+            }")
+        local code="${response##*$'\n'}"
+        response="${response%$'\n'*}"
+        
+        if [ "$code" = "404" ] || [ "$code" = "405" ]; then
+            # Older website without the batch webhook
+            echo -e "${YELLOW}  Batch webhook not available, sending bans one by one${NC}"
+            batch_endpoint=0
+        elif [ "$code" = "200" ] && echo "$response" | grep -q '"failed": *0[,}]'; then
+            echo -e "${GREEN}  ✓ Synced $count ban(s) to website${NC}"
+            echo ""
+            pending_bans=()
+            return 0
+        else
+            # The response does not say which rows failed; sending the whole
+            # batch again is safe, bans the website has are counted as existing
+            echo -e "${RED}  ✗ Failed to sync $count ban(s): $response${NC}"
+            return 1
+        fi
+    fi
+    
+    local kept=() fields
+    for fields in "${pending_bans[@]}"; do
+        send_ban "$fields" || kept+=("$fields")
+    done
+    pending_bans=("${kept[@]}")
+    if [ ${#kept[@]} -eq 0 ]; then
+        echo -e "${GREEN}  ✓ Synced $count ban(s) to website${NC}"
+        echo ""
+        return 0
+    fi
+    echo -e "${RED}  ✗ Failed to sync ${#kept[@]} of $count ban(s): $response${NC}"
+    return 1
+}
+
+# Function to remove ban from website (when unbanned). Returns 1 if it failed.
+remove_ban() {
+    local steamid="$1"
+    local player="$2"
     
     response=$(curl -s -X DELETE "$WEBSITE_URL/api/bans/webhook/$steamid?secret=$SECRET")
     
     if echo "$response" | grep -q "message"; then
-        echo -e "${GREEN}  ✓ Removed from website${NC}"
-    else
-        echo -e "${YELLOW}  Note: $response${NC}"
+        echo -e "${GREEN}  ✓ Removed $player ($steamid) from website${NC}"
+        echo ""
+        return 0
     fi
-    echo ""
+    echo -e "${RED}  ✗ Failed to remove $player ($steamid): $response${NC}"
+    return 1
 }
 
 # Check if log directory exists
@@ -89,7 +203,22 @@ echo "(Press Ctrl+C to stop)"
 echo ""
 
 # Watch BAN_HISTORY log files
-tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while read line; do
+tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while true; do
+    read -t "$BATCH_WAIT" line
+    status=$?
+    
+    # No new line for BATCH_WAIT seconds - send what is queued
+    if [ $status -gt 128 ]; then
+        flush_queue
+        continue
+    fi
+    
+    # tail stopped - one last try, even inside the retry wait
+    if [ $status -ne 0 ]; then
+        retry_at=0
+        flush_queue
+        break
+    fi
     
     # Check for new ban
     if echo "$line" | grep -q "banned.*||.*Reason:.*||.*Ban Length:"; then
@@ -116,7 +245,7 @@ tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while read line; do
             [ -z "$admin" ] && admin="Server"
             [ -z "$duration" ] && duration="Permanent"
             
-            send_ban "$player" "$steamid" "$reason" "$admin" "$duration"
+            queue_ban "$player" "$steamid" "$reason" "$admin" "$duration"
         fi
     fi
     
@@ -126,7 +255,8 @@ tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while read line; do
         steamid=$(echo "$line" | sed -n 's/.*unbanned [^<]* <\([^>]*\)>.*/\1/p')
         
         if [ -n "$steamid" ]; then
-            remove_ban "$steamid" "$player"
+            queue_unban "$steamid" "$player"
+            flush_queue
         fi
     fi
     
@@ -136,7 +266,8 @@ tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while read line; do
         steamid=$(echo "$line" | sed -n 's/.*\[\([^\]]*\)\].*/\1/p')
         
         if [ -n "$steamid" ]; then
-            remove_ban "$steamid" "$player"
+            queue_unban "$steamid" "$player"
+            flush_queue
         fi
     fi
     
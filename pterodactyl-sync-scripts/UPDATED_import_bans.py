@@ -2,12 +2,23 @@
 """
 Import existing bans from Advanced Bans log to website
 Run: python3 /home/import_bans.py
+
+Needs the shadowzm_sync/ folder from the repo next to this script when it
+is copied somewhere on its own (e.g. /home/shadowzm-scripts/shadowzm_sync/).
 """
-import re
-import requests
 import glob
+import os
+import sys
 from datetime import datetime
 
+# Shared sync helpers (shadowzm_sync/): the repo root, or a copy next to this script
+# (the script's own folder is already on sys.path)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadowzm_sync.ban_log import BAN, tokenize_ban_lines
+from shadowzm_sync.payload import to_columns
+from shadowzm_sync.spool import WebhookSpool
+from shadowzm_sync.webhook import WebhookClient
+
 # ============ CONFIGURATION ============
 # CHANGE THIS to your website URL or domain
 WEBSITE_URL = "http://YOUR_VPS_IP"  # or http://yourdomain.com
@@ -15,54 +26,105 @@ SECRET = "shadowzm-ban-secret-2024"
 
 # YOUR Pterodactyl volume path
 LOG_DIR = "/var/lib/pterodactyl/volumes/d8109667-ac86-4f43-aeb3-5e84ed58df07/cstrike/addons/amxmodx/logs"
+
+# Bans per request to /api/bans/webhook/batch (the website accepts up to 1000)
+BATCH_SIZE = 500
+
+# Requests sent at the same time over kept-alive connections, and retries
+# (with jittered backoff) for connection errors and 429/5xx answers
+MAX_IN_FLIGHT = 8
+RETRIES = 3
+
+# Batch requests are compressed ("gzip", "zstd" with the zstandard package, or None)
+# and send their rows as columns, so repeated keys are not sent for every row
+PAYLOAD_COMPRESSION = "gzip"
+COLUMN_PAYLOADS = True
+
+# Bans are queued here first and only removed once the website took
+# them, so an outage does not lose them (sent again on the next run)
+SPOOL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "webhook_spool.db")
 # =======================================
 
-def parse_ban_line(line):
-    """Parse a ban line from Advanced Bans log"""
-    pattern = r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2}): (.+?) <([^>]*)> banned (.+?) <([^>]+)> \|\| Reason: "([^"]*)" \|\| Ban Length: (.+)'
-    
-    match = re.match(pattern, line)
-    if match:
-        timestamp_str, admin_name, admin_steam, player_name, player_steam, reason, duration = match.groups()
-        return {
-            'timestamp': timestamp_str,
-            'admin_name': admin_name.strip(),
-            'player_nickname': player_name.strip(),
-            'steamid': player_steam.strip(),
-            'reason': reason.strip() if reason.strip() else "Banned",
-            'duration': duration.strip()
-        }
-    return None
-
-def parse_unban_line(line):
-    """Parse an unban line to track unbanned players"""
-    pattern = r'unbanned (.+?) <([^>]+)>'
-    match = re.search(pattern, line)
-    if match:
-        return match.group(2).strip()  # Return steamid
-    return None
-
-def sync_ban(ban):
-    """Send ban to website"""
-    try:
-        response = requests.post(
-            f"{WEBSITE_URL}/api/bans/webhook",
-            json={
-                "secret": SECRET,
-                "player_nickname": ban['player_nickname'],
-                "steamid": ban['steamid'],
-                "reason": ban['reason'],
-                "admin_name": ban['admin_name'],
-                "duration": ban['duration']
-            },
-            timeout=10
-        )
-        if response.status_code == 200:
-            return True, response.json().get('message', 'Success')
+# One pooled HTTP client for the whole run
+client = WebhookClient(WEBSITE_URL, MAX_IN_FLIGHT, RETRIES)
+spool = WebhookSpool(SPOOL_FILE)
+
+# Cleared when the website answers 404 on the batch endpoint
+batch_endpoint = True
+
+def ban_key(ban):
+    """Spool key of a ban, the webhooks treat one steamid + reason as one ban"""
+    return f"{ban['steamid']}|{ban['reason']}"
+
+def ban_row(ban):
+    return {
+        "player_nickname": ban['player_nickname'],
+        "steamid": ban['steamid'],
+        "reason": ban['reason'],
+        "admin_name": ban['admin_name'],
+        "duration": ban['duration']
+    }
+
+def ban_result(response):
+    """(success, message) of one /api/bans/webhook answer"""
+    if isinstance(response, Exception):
+        return False, str(response)
+    if response.status_code == 200:
+        return True, response.json().get('message', 'Success')
+    return False, f"HTTP {response.status_code}"
+
+def delivered(response):
+    """True once the website took the row (anything else, a 422 too, stays queued)"""
+    return not isinstance(response, Exception) and response.status_code == 200
+
+def batch_delivered(response):
+    """True once the website took every row of a batch. The answer does not say
+    which rows failed, so a batch with failed rows stays queued as a whole
+    (sending the others again only rewrites them)."""
+    return delivered(response) and not response.json().get('failed', 0)
+
+def send_bans_batch(rows):
+    """Send ban rows to website, BATCH_SIZE bans per request.
+    Returns one bool per row, or None if the website has no batch endpoint."""
+    batches = [rows[start:start + BATCH_SIZE] for start in range(0, len(rows), BATCH_SIZE)]
+    payloads = [{"secret": SECRET, "bans": to_columns(batch) if COLUMN_PAYLOADS else batch} for batch in batches]
+    responses = client.post_many("/api/bans/webhook/batch", payloads, timeout=30, compression=PAYLOAD_COMPRESSION)
+    
+    results = []
+    for batch, response in zip(batches, responses):
+        if isinstance(response, Exception):
+            print(f"✗ Batch of {len(batch)}: {response}")
+        elif response.status_code in (404, 405):
+            return None
+        elif response.status_code == 200:
+            result = response.json()
+            mark = "✗" if result.get('failed', 0) else "✓"
+            print(f"{mark} Batch of {len(batch)}: {result.get('added', 0)} added, "
+                  f"{result.get('existing', 0)} already on the website, {result.get('failed', 0)} failed")
         else:
-            return False, f"HTTP {response.status_code}"
-    except Exception as e:
-        return False, str(e)
+            print(f"✗ Batch of {len(batch)}: HTTP {response.status_code}")
+        results += [batch_delivered(response)] * len(batch)
+    
+    return results
+
+def send_bans(rows):
+    """Send ban rows to website. Returns one bool per row, True when delivered."""
+    global batch_endpoint
+    if batch_endpoint:
+        results = send_bans_batch(rows)
+        if results is not None:
+            return results
+        print("Website has no batch endpoint, sending one ban at a time")
+        batch_endpoint = False
+    
+    responses = client.post_many("/api/bans/webhook", [{"secret": SECRET, **row} for row in rows])
+    
+    for row, response in zip(rows, responses):
+        success, msg = ban_result(response)
+        mark = "✓" if success else "✗"
+        print(f"{mark} {row['player_nickname']} ({row['steamid']}): {msg}")
+    
+    return [delivered(response) for response in responses]
 
 def main():
     print("=== Advanced Bans Import Tool ===")
@@ -85,24 +147,21 @@ def main():
         print(f"\nParsing: {log_file}")
         try:
             with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    # Check for unban first
-                    if 'unbanned' in line or 'Ban time is up' in line:
-                        steamid = parse_unban_line(line)
-                        if steamid:
-                            unbanned_steamids.add(steamid)
-                        # Also check for "Ban time is up"
-                        expire_match = re.search(r'Ban time is up for: .+ \[([^\]]+)\]', line)
-                        if expire_match:
-                            unbanned_steamids.add(expire_match.group(1))
+                for kind, timestamp, steamid, player, admin, reason, duration in tokenize_ban_lines(f):
+                    # Unban or ban time is up
+                    if kind != BAN:
+                        unbanned_steamids.add(steamid)
                     
-                    # Check for ban
-                    elif 'banned' in line and '||' in line:
-                        ban = parse_ban_line(line)
-                        if ban:
-                            all_bans.append(ban)
+                    # Ban
+                    else:
+                        all_bans.append({
+                            'timestamp': timestamp,
+                            'admin_name': admin,
+                            'player_nickname': player,
+                            'steamid': steamid,
+                            'reason': reason if reason else "Banned",
+                            'duration': duration
+                        })
         except Exception as e:
             print(f"Error reading {log_file}: {e}")
     
@@ -120,28 +179,33 @@ def main():
     
     print(f"Active bans to sync: {len(active_bans)}")
     
+    # Bans queued by an earlier run that are no longer active (unbanned since,
+    # or replaced by a newer ban) must not be sent, that would ban them again
+    active_keys = {ban_key(ban) for ban in active_bans.values()}
+    stale = spool.keys('bans') - active_keys
+    if stale:
+        spool.discard('bans', stale)
+        print(f"Dropped {len(stale)} queued bans that are no longer active")
+    
     if not active_bans:
         print("\nNo active bans to import.")
         print("All bans have been unbanned or expired.")
         return
     
-    # Sync active bans
+    # Queue the active bans, then send everything queued (this run and earlier ones)
     print("\n=== Syncing to website ===")
-    synced = 0
-    failed = 0
-    
-    for steamid, ban in active_bans.items():
-        success, msg = sync_ban(ban)
-        if success:
-            print(f"✓ {ban['player_nickname']} ({steamid}): {msg}")
-            synced += 1
-        else:
-            print(f"✗ {ban['player_nickname']} ({steamid}): {msg}")
-            failed += 1
+    spool.put_many('bans', [(ban_key(ban), ban_row(ban)) for ban in active_bans.values()])
+    synced, queued = spool.drain('bans', send_bans, BATCH_SIZE * MAX_IN_FLIGHT)
     
     print(f"\n=== Complete ===")
     print(f"Synced: {synced}")
-    print(f"Failed: {failed}")
+    print(f"Queued: {queued}")
+    if queued:
+        print(f"The queued bans are kept in {SPOOL_FILE} and sent on the next run")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        client.close()
+        spool.close()
@@ -4,120 +4,87 @@ CSStats Parser & Sync for shadowzm
 Parses csstats.dat and syncs player stats to website
 
 Usage: python3 /home/stats_sync.py
+
+Needs the shadowzm_sync/ folder from the repo next to this script when it
+is copied somewhere on its own (e.g. /home/shadowzm-scripts/shadowzm_sync/).
 """
-import struct
-import requests
 import os
+import sys
+
+# Shared sync helpers (shadowzm_sync/): the repo root, or a copy next to this script
+# (the script's own folder is already on sys.path)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadowzm_sync.csstats import read_csstats
+from shadowzm_sync.payload import to_columns
+from shadowzm_sync.spool import WebhookSpool
+from shadowzm_sync.webhook import WebhookClient
 
 # ============ CONFIGURATION ============
 WEBSITE_URL = "http://shadowzm.xyz"
 SECRET = "shadowzm-ban-secret-2024"
 CSSTATS_FILE = "/var/lib/pterodactyl/volumes/d968fb39-3234-47f5-9341-d3149d0c8739/cstrike/addons/amxmodx/data/csstats.dat"
+
+# Send players in batches to /api/players/webhook/batch (False = one request per player)
+BATCH_MODE = True
+BATCH_SIZE = 500  # the website accepts up to 1000 per request
+
+# Requests sent at the same time over kept-alive connections, and retries
+# (with jittered backoff) for connection errors and 429/5xx answers
+MAX_IN_FLIGHT = 8
+RETRIES = 3
+
+# Batch requests are compressed ("gzip", "zstd" with the zstandard package, or None)
+# and send their rows as columns, so repeated keys are not sent for every row
+PAYLOAD_COMPRESSION = "gzip"
+COLUMN_PAYLOADS = True
+
+# Players are queued here first and only removed once the website took
+# them, so an outage does not lose them (sent again on the next run)
+SPOOL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "webhook_spool.db")
 # =======================================
 
+# One pooled HTTP client for the whole run
+client = WebhookClient(WEBSITE_URL, MAX_IN_FLIGHT, RETRIES)
+spool = WebhookSpool(SPOOL_FILE)
+
+# Cleared when the website answers 404 on the batch endpoint
+batch_endpoint = BATCH_MODE
+
 def parse_csstats(filepath):
     """Parse csstats.dat binary file (AMX Mod X format)"""
     players = []
     
-    try:
-        with open(filepath, 'rb') as f:
-            data = f.read()
-    except FileNotFoundError:
+    # A truncated last record is kept with its missing stats read as 0
+    stats = read_csstats(filepath, allow_partial=True)
+    if stats is None:
         print(f"Error: File not found: {filepath}")
         return []
     
-    if len(data) < 10:
-        print(f"Error: File too small ({len(data)} bytes)")
+    if stats.version is None:
+        print(f"Error: File too small ({os.path.getsize(filepath)} bytes)")
         return []
     
-    print(f"File size: {len(data)} bytes")
+    print(f"File size: {os.path.getsize(filepath)} bytes")
+    print(f"Header/Version: {stats.version}")
     
-    offset = 0
     player_count = 0
     
-    # CSStats format:
-    # - 2 bytes: version/header
-    # - For each player:
-    #   - 2 bytes: name length
-    #   - name (null-terminated string)
-    #   - 2 bytes: steamid length  
-    #   - steamid (null-terminated string)
-    #   - Stats: 7 integers (28 bytes) or 8 integers (32 bytes)
-    #     tks, damage, deaths, kills, shots, hits, hs [, rounds]
-    
-    # Read header
-    if len(data) >= 2:
-        header = struct.unpack('<H', data[0:2])[0]
-        print(f"Header/Version: {header}")
-        offset = 2
-    
-    while offset < len(data) - 10:
-        try:
-            # Read name length
-            if offset + 2 > len(data):
-                break
-            name_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if name_len == 0 or name_len > 64:
-                break
-            
-            # Read name
-            if offset + name_len > len(data):
-                break
-            name = data[offset:offset+name_len].rstrip(b'\x00').decode('utf-8', errors='ignore')
-            offset += name_len
-            
-            # Read steamid length
-            if offset + 2 > len(data):
-                break
-            steamid_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if steamid_len == 0 or steamid_len > 64:
-                break
-                
-            # Read steamid
-            if offset + steamid_len > len(data):
-                break
-            steamid = data[offset:offset+steamid_len].rstrip(b'\x00').decode('utf-8', errors='ignore')
-            offset += steamid_len
-            
-            # Read stats (7 integers = 28 bytes)
-            # tks, damage, deaths, kills, shots, hits, headshots
-            if offset + 28 > len(data):
-                # Try reading what we can
-                remaining = len(data) - offset
-                stats = [0] * 7
-                if remaining >= 4:
-                    num_ints = remaining // 4
-                    for i in range(min(num_ints, 7)):
-                        stats[i] = struct.unpack('<i', data[offset+i*4:offset+i*4+4])[0]
-                offset = len(data)
-            else:
-                stats = list(struct.unpack('<7i', data[offset:offset+28]))
-                offset += 28
-            
-            tks, damage, deaths, kills, shots, hits, headshots = stats
-            
-            # Skip invalid entries
-            if kills < 0 or deaths < 0:
-                continue
-            
-            player_count += 1
-            print(f"  Found: {name} ({steamid}) - K:{kills} D:{deaths} HS:{headshots}")
-            
-            players.append({
-                'nickname': name,
-                'steamid': steamid,
-                'kills': max(0, kills),
-                'deaths': max(0, deaths),
-                'headshots': max(0, headshots)
-            })
-            
-        except Exception as e:
-            print(f"  Parse error at offset {offset}: {e}")
-            break
+    for name, steamid, deaths, kills, headshots in zip(
+            stats.nickname, stats.steamid, stats.deaths, stats.kills, stats.headshots):
+        # Skip invalid entries
+        if kills < 0 or deaths < 0:
+            continue
+        
+        player_count += 1
+        print(f"  Found: {name} ({steamid}) - K:{kills} D:{deaths} HS:{headshots}")
+        
+        players.append({
+            'nickname': name,
+            'steamid': steamid,
+            'kills': max(0, kills),
+            'deaths': max(0, deaths),
+            'headshots': max(0, headshots)
+        })
     
     print(f"\nTotal players found: {player_count}")
     
@@ -125,36 +92,78 @@ def parse_csstats(filepath):
     players.sort(key=lambda x: x['kills'], reverse=True)
     return players[:100]  # Top 100
 
+def player_row(player):
+    return {
+        "nickname": player['nickname'],
+        "steamid": player['steamid'],
+        "kills": player['kills'],
+        "deaths": player['deaths'],
+        "headshots": player['headshots']
+    }
+
+def delivered(response):
+    """True once the website took the row (anything else, a 422 too, stays queued)"""
+    return not isinstance(response, Exception) and response.status_code == 200
+
+def batch_delivered(response):
+    """True once the website took every row of a batch. The answer does not say
+    which rows failed, so a batch with failed rows stays queued as a whole
+    (sending the others again only rewrites them)."""
+    return delivered(response) and not response.json().get('failed', 0)
+
+def send_players_batch(rows):
+    """Send player rows to website API, BATCH_SIZE players per request.
+    Returns one bool per row, or None if the website has no batch endpoint."""
+    batches = [rows[start:start + BATCH_SIZE] for start in range(0, len(rows), BATCH_SIZE)]
+    payloads = [{"secret": SECRET, "players": to_columns(batch) if COLUMN_PAYLOADS else batch} for batch in batches]
+    responses = client.post_many("/api/players/webhook/batch", payloads, timeout=30, compression=PAYLOAD_COMPRESSION)
+    
+    results = []
+    for batch, response in zip(batches, responses):
+        if isinstance(response, Exception):
+            print(f"✗ Error: batch of {len(batch)} players - {response}")
+        elif response.status_code in (404, 405):
+            return None
+        elif response.status_code == 200 and response.json().get('failed', 0):
+            print(f"✗ Failed: {response.json()['failed']} of a batch of {len(batch)} players")
+        elif response.status_code == 200:
+            print(f"✓ Synced batch of {len(batch)} players")
+        else:
+            print(f"✗ Failed: batch of {len(batch)} players - HTTP {response.status_code}")
+        results += [batch_delivered(response)] * len(batch)
+    
+    return results
+
+def send_players(rows):
+    """Send player rows to website API. Returns one bool per row, True when delivered."""
+    global batch_endpoint
+    if batch_endpoint:
+        results = send_players_batch(rows)
+        if results is not None:
+            return results
+        print("Website has no batch endpoint, syncing one player at a time")
+        batch_endpoint = False
+    
+    responses = client.post_many("/api/players/webhook", [{"secret": SECRET, **row} for row in rows])
+    
+    for row, response in zip(rows, responses):
+        if isinstance(response, Exception):
+            print(f"✗ Error: {row['nickname']} - {response}")
+        elif response.status_code == 200:
+            print(f"✓ Synced: {row['nickname']}")
+        else:
+            print(f"✗ Failed: {row['nickname']} - HTTP {response.status_code}")
+    
+    return [delivered(response) for response in responses]
+
 def sync_to_website(players):
-    """Sync players to website API"""
-    synced = 0
-    failed = 0
-    
-    for player in players:
-        try:
-            response = requests.post(
-                f"{WEBSITE_URL}/api/players/webhook",
-                json={
-                    "secret": SECRET,
-                    "nickname": player['nickname'],
-                    "steamid": player['steamid'],
-                    "kills": player['kills'],
-                    "deaths": player['deaths'],
-                    "headshots": player['headshots']
-                },
-                timeout=10
-            )
-            if response.status_code == 200:
-                print(f"✓ Synced: {player['nickname']}")
-                synced += 1
-            else:
-                print(f"✗ Failed: {player['nickname']} - HTTP {response.status_code}")
-                failed += 1
-        except Exception as e:
-            print(f"✗ Error: {player['nickname']} - {e}")
-            failed += 1
-    
-    return synced, failed
+    """Queue players in the spool, then send everything queued (this run and earlier ones).
+    Returns (synced, still queued)."""
+    spool.put_many('players', [(player['steamid'], player_row(player)) for player in players])
+    synced, queued = spool.drain('players', send_players, BATCH_SIZE * MAX_IN_FLIGHT)
+    if queued:
+        print(f"{queued} players kept in {SPOOL_FILE}, they are sent on the next run")
+    return synced, queued
 
 def main():
     print("=" * 50)
@@ -188,17 +197,21 @@ curl -X POST "{WEBSITE_URL}/api/players/webhook" \\
         
         # Still sync them so they appear
         print("\nSyncing players anyway...")
-        synced, failed = sync_to_website(players)
+        synced, queued = sync_to_website(players)
     else:
         print(f"\n{len(active_players)} players with stats to sync")
         print("\nSyncing to website...")
-        synced, failed = sync_to_website(active_players)
+        synced, queued = sync_to_website(active_players)
     
     print(f"\n{'=' * 50}")
     print(f"Sync Complete!")
     print(f"  Synced: {synced}")
-    print(f"  Failed: {failed}")
+    print(f"  Queued: {queued}")
     print(f"{'=' * 50}")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        client.close()
+        spool.close()
@@ -0,0 +1,46 @@
+"""
+ShadowZM shared sync helpers
+Code shared by the sync scripts that read the CS 1.6 server files
+(csstats.dat, BAN_HISTORY logs) and push them to the website.
+
+Scripts that live in a sub folder put the repo root on sys.path before
+importing this package. When deploying a script on its own, copy the
+shadowzm_sync/ folder next to it.
+
+Importing the package only needs the standard library. bulk, staging,
+mongo and ban_dedupe need pymongo, webhook needs requests: they are not
+imported here, so only import them from scripts that already use those.
+"""
+
+from .ban_log import (BAN, EXPIRE, UNBAN, ban_id, format_log_time, format_time, parse_log_time,
+                      tokenize_ban_line, tokenize_ban_lines)
+from .ban_tail import BanLogTailer, read_ban_events
+from .csstats import CsstatsColumns, decode_csstats, read_csstats, scan_records
+from .file_gate import FileGate
+from .payload import encode_body, to_columns
+from .player_diff import PlayerChanges, PlayerDiff
+from .watcher import FileWatcher
+
+__all__ = [
+    "BAN",
+    "EXPIRE",
+    "UNBAN",
+    "BanLogTailer",
+    "CsstatsColumns",
+    "FileGate",
+    "FileWatcher",
+    "PlayerChanges",
+    "PlayerDiff",
+    "ban_id",
+    "decode_csstats",
+    "encode_body",
+    "format_log_time",
+    "format_time",
+    "parse_log_time",
+    "read_ban_events",
+    "read_csstats",
+    "scan_records",
+    "to_columns",
+    "tokenize_ban_line",
+    "tokenize_ban_lines",
+]
@@ -0,0 +1,101 @@
+"""
+One-off cleanup of duplicate bans documents
+Older syncs built ban ids with hash() on a str, which is randomized per
+process, so every restart upserted a new copy of every historical ban.
+The copies share steamid, ban_date and admin_name; each group is
+collapsed into one document that gets the stable ban_id() (is_expired
+is kept if any copy had it).
+
+Only documents the log sync wrote are touched: ids "<steamid>_<hash()>"
+(old) or "<steamid>_<ban_id digest>" (current). Bans from the admin panel
+or the webhooks have uuid ids and are left alone, links to them keep working.
+A document that already has a digest id is never renamed, the log sync
+upserts it by that id. 16 decimal digits fit both shapes (hash() can give
+one), so such an id only counts as a digest when it is the ban_id() of
+its own steamid, ban_date and admin.
+
+The old realtime/simple syncs used "<steamid>_<last 6 digits of hash()>"
+ids with the time of the sync as ban_date, so the log time (and ban_id())
+of those bans cannot be recovered. They are not renamed; with drop_legacy
+(a full resync, whose log replay writes them again) they are deleted.
+"""
+
+import re
+from datetime import datetime
+
+from pymongo import DeleteMany, UpdateOne
+
+from .ban_log import ban_id, format_log_time
+from .bulk import bulk_write_chunks
+
+# Ids written by the log sync: old hash() ones (signed int, or its last 6
+# digits) and the current ban_id() ones (16 hex digits)
+SYNC_ID_FILTER = {'id': {'$regex': r'_(-?\d+|[0-9a-f]{16})$'}}
+
+_LEGACY_SHORT_ID = re.compile(r'_\d{6}$')
+_DIGEST_ID = re.compile(r'_([0-9a-f]{16})$')
+
+
+def _log_time(ban_date):
+    """ISO ban_date as stored by the sync -> raw log time, or None"""
+    try:
+        return format_log_time(datetime.fromisoformat(ban_date).timestamp())
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def _is_digest_id(doc_id, stable_id):
+    """True if doc_id was written by ban_id() (see the module docstring)"""
+    match = _DIGEST_ID.search(doc_id)
+    if match is None:
+        return False
+    return doc_id == stable_id or not match.group(1).isdigit()
+
+
+def dedupe_bans(db, chunk_size=1000, drop_legacy=False):
+    """Collapse duplicate bans and give the survivors stable ids. Returns (removed, renamed).
+
+    drop_legacy also removes the bans with 6 digit ids (only on a full resync).
+    """
+    groups = {}
+    duplicates = []
+    fields = {'_id': 1, 'id': 1, 'steamid': 1, 'ban_date': 1, 'admin_name': 1, 'is_expired': 1}
+    for doc in db.bans.find(SYNC_ID_FILTER, fields):
+        if _LEGACY_SHORT_ID.search(doc['id']):
+            if drop_legacy:
+                duplicates.append(doc['_id'])
+            continue
+        key = (doc.get('steamid'), doc.get('ban_date'), doc.get('admin_name'))
+        groups.setdefault(key, []).append(doc)
+
+    updates = []
+    renamed = 0
+    for (steamid, ban_date, admin), docs in groups.items():
+        timestamp = _log_time(ban_date)
+        stable_id = ban_id(steamid, timestamp, admin) if steamid and timestamp else None
+
+        # Prefer a copy that already has the stable id, then any digest id
+        digests = [doc for doc in docs if _is_digest_id(doc['id'], stable_id)]
+        keep = next((doc for doc in docs if doc.get('id') == stable_id), digests[0] if digests else docs[0])
+        # Other digest ids are other bans (or dates written by the old realtime/simple --once)
+        duplicates.extend(doc['_id'] for doc in docs if doc is not keep
+                          and (doc['id'] == keep['id'] or doc not in digests))
+
+        update = {}
+        if stable_id and keep.get('id') != stable_id and keep not in digests:
+            update['id'] = stable_id
+            renamed += 1
+        if len(docs) > 1 and any(doc.get('is_expired') for doc in docs) and not keep.get('is_expired'):
+            update['is_expired'] = True
+        if update:
+            updates.append(UpdateOne({'_id': keep['_id']}, {'$set': update}))
+
+    # The copies are removed in the first chunks, before any id is rewritten
+    operations = [DeleteMany({'_id': {'$in': duplicates[start:start + chunk_size]}})
+                  for start in range(0, len(duplicates), chunk_size)]
+    operations += updates
+
+    result = bulk_write_chunks(db.bans, operations, chunk_size, "bans dedupe")
+    if result.failed:
+        print(f"[WARN] {result.failed} bans dedupe writes failed, run it again")
+    return len(duplicates), renamed
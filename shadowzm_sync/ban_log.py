@@ -0,0 +1,112 @@
+"""
+BAN_HISTORY log helpers
+AMXX log lines start with "L MM/DD/YYYY - HH:MM:SS: ". The timestamps are
+converted once to unix seconds (UTC) so bans and unbans can be compared
+as plain ints.
+
+Line formats (Advanced Bans):
+  L <time>: Admin <ADMIN_STEAM> banned Player <STEAM> || Reason: "reason" || Ban Length: duration
+  L <time>: Admin <ADMIN_STEAM> unbanned Player <STEAM>
+  L <time>: Ban time is up for: Player [STEAM]
+
+tokenize_ban_line() classifies a line with one precompiled regex and
+returns a plain event tuple, or None for any other line:
+  (kind, time, steamid, player, admin, reason, duration)
+kind is BAN, UNBAN or EXPIRE, time is the raw "MM/DD/YYYY - HH:MM:SS"
+string and admin/reason/duration are None for unbans and expiries.
+
+ban_id() gives every ban a stable id from its content, so the same log
+line maps to the same bans document in every process and on every run.
+"""
+
+import re
+from hashlib import blake2b
+from datetime import datetime, timezone
+from functools import lru_cache
+
+BAN = 'ban'
+UNBAN = 'unban'
+EXPIRE = 'expire'
+
+# A substring check picks the pattern, so every line runs through at most
+# one precompiled regex (and other log lines through none)
+_TIME = r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2}): '
+_BAN_LINE = re.compile(
+    _TIME + r'(.+?) <[^>]*> banned (.+?) <([^>]+)> \|\| Reason: "([^"]*)" \|\| Ban Length: (.+)')
+_UNBAN_LINE = re.compile(_TIME + r'.*?unbanned (.+?) <([^>]+)>')
+_EXPIRE_LINE = re.compile(_TIME + r'.*?Ban time is up for: (.+) \[([^\]]+)\]')
+
+
+@lru_cache(maxsize=4096)
+def _day_start(date):
+    month, day, year = date.split('/')
+    return int(datetime(int(year), int(month), int(day), tzinfo=timezone.utc).timestamp())
+
+
+def parse_log_time(timestamp):
+    """'MM/DD/YYYY - HH:MM:SS' -> unix seconds (UTC), or None if it is not a valid time"""
+    try:
+        date, clock = timestamp.split(' - ')
+        hours, minutes, seconds = clock.split(':')
+        hours, minutes, seconds = int(hours), int(minutes), int(seconds)
+        if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 60):
+            return None
+        return _day_start(date) + hours * 3600 + minutes * 60 + seconds
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_time(unix_time):
+    """unix seconds -> ISO 8601 string in UTC, as stored in the bans collection"""
+    return datetime.fromtimestamp(unix_time, timezone.utc).isoformat()
+
+
+def format_log_time(unix_time):
+    """unix seconds -> 'MM/DD/YYYY - HH:MM:SS' (UTC), the inverse of parse_log_time()"""
+    return datetime.fromtimestamp(unix_time, timezone.utc).strftime('%m/%d/%Y - %H:%M:%S')
+
+
+def ban_id(steamid, timestamp, admin):
+    """Stable bans document id: '<steamid>_<BLAKE2b of steamid, log time and admin>'
+
+    Unlike hash() on a str this does not change between processes, so a
+    restart upserts the same documents instead of adding copies.
+    """
+    key = '\x1f'.join((steamid, timestamp, admin or ''))
+    digest = blake2b(key.encode('utf-8', 'surrogateescape'), digest_size=8).hexdigest()
+    return f"{steamid}_{digest}"
+
+
+def tokenize_ban_line(line):
+    """Classify one log line. Returns an event tuple (see above) or None."""
+    if 'unbanned ' in line:
+        match = _UNBAN_LINE.match(line)
+        if match is None:
+            return None
+        time, player, steamid = match.groups()
+        return (UNBAN, time, steamid.strip(), player, None, None, None)
+
+    if ' || ' in line:
+        match = _BAN_LINE.match(line)
+        if match is None:
+            return None
+        time, admin, player, steamid, reason, duration = match.groups()
+        return (BAN, time, steamid.strip(), player.strip(), admin.strip(),
+                reason.strip(), duration.strip())
+
+    if 'Ban time is up for: ' in line:
+        match = _EXPIRE_LINE.match(line)
+        if match is None:
+            return None
+        time, player, steamid = match.groups()
+        return (EXPIRE, time, steamid.strip(), player, None, None, None)
+
+    return None
+
+
+def tokenize_ban_lines(lines):
+    """Yield the event tuple of every ban/unban/expire line"""
+    for line in lines:
+        event = tokenize_ban_line(line)
+        if event is not None:
+            yield event
@@ -0,0 +1,218 @@
+"""
+Byte-offset tailing of BAN_HISTORY_*.log files
+Remembers how far each log file was consumed (inode + byte offset) in a
+small JSON checkpoint file, so a sync only parses newly appended lines.
+
+A file is read again from the start when it was rotated (new inode),
+truncated (shorter than the checkpoint) or rewritten in place (its first
+bytes no longer match the ones seen at the checkpoint).
+
+With workers > 0, sealed log files (every file but the most recently
+modified one) that still have to be read are tokenized in a process pool
+while the live file is read on the calling thread. The per-file events
+are merged back in timestamp order. The workers are started by a fork
+server (spawned where there is none), never forked from the caller: the
+sync daemon has motor, watcher and executor threads running, and a child
+forked while one of them holds a lock can deadlock on it.
+
+With a cache_dir, sealed files read from the start go through the event
+cache in log_cache.py, so they are only parsed once.
+"""
+
+import glob
+import heapq
+import json
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from . import log_cache
+from .ban_log import parse_log_time, tokenize_ban_lines
+
+# How many leading bytes are checksummed to notice a file rewritten in place
+HEAD_SIZE = 256
+
+
+def _head_checksum(f, offset):
+    f.seek(0)
+    return zlib.adler32(f.read(min(offset, HEAD_SIZE)))
+
+
+def tail_log_file(path, checkpoint=None):
+    """Tokenize the complete lines of one log file after its checkpoint.
+
+    checkpoint is [inode, offset, head_checksum] or None to read the whole
+    file. Returns (events, new checkpoint).
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+
+        offset = 0
+        if checkpoint:
+            old_inode, old_offset, old_head = checkpoint
+            # Same file, not truncated and not rewritten -> resume
+            if (old_inode == st.st_ino and old_offset <= st.st_size
+                    and _head_checksum(f, old_offset) == old_head):
+                offset = old_offset
+
+        f.seek(offset)
+        data = f.read()
+
+        # Leave a half-written last line for the next read
+        end = data.rfind(b'\n') + 1
+        events = []
+        if end:
+            events = list(tokenize_ban_lines(data[:end - 1].decode('utf-8', errors='ignore').split('\n')))
+        offset += end
+        return events, [st.st_ino, offset, _head_checksum(f, offset)]
+
+
+def read_sealed_log_file(path, cache_dir):
+    """tail_log_file(path) for a log that is no longer written, storing the result in the cache"""
+    identity = log_cache.file_identity(path)
+    events, checkpoint = tail_log_file(path)
+    log_cache.store_events(cache_dir, path, identity, events, checkpoint)
+    return events, checkpoint
+
+
+def _event_time(event):
+    return parse_log_time(event[1]) or 0
+
+
+def _needs_full_read(path, checkpoint):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return not checkpoint or checkpoint[0] != st.st_ino or checkpoint[1] != st.st_size
+
+
+def _pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def tail_log_files(paths, checkpoints, workers=0, cache_dir=None):
+    """tail_log_file() for every path. Returns ({path: (events, checkpoint)}, merged events)"""
+    results = {}
+    if not paths:
+        return results, []
+
+    live = max(paths, key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0)
+    sealed = [path for path in paths
+              if path != live and _needs_full_read(path, checkpoints.get(path))]
+
+    jobs = {}
+    for path in paths:
+        checkpoint = checkpoints.get(path)
+        if cache_dir and path in sealed and not checkpoint:
+            cached = log_cache.load_events(cache_dir, path)
+            if cached is not None:
+                results[path] = cached
+                continue
+            jobs[path] = (read_sealed_log_file, path, cache_dir)
+        else:
+            jobs[path] = (tail_log_file, path, checkpoint)
+    if cache_dir and sealed:
+        log_cache.prune(cache_dir, paths)
+
+    futures = {}
+    pool = None
+    parallel = [path for path in sealed if path in jobs]
+    if workers and len(parallel) > 1:
+        pool = ProcessPoolExecutor(workers, mp_context=_pool_context())
+        futures = {path: pool.submit(*jobs[path]) for path in parallel}
+
+    try:
+        # The live file keeps growing, it is read here while the pool works,
+        # and the pool's results are only waited for after that
+        for path, (func, *args) in jobs.items():
+            if path not in futures:
+                try:
+                    results[path] = func(*args)
+                except OSError as e:
+                    print(f"[ERROR] Failed to read {path}: {e}")
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except OSError as e:
+                print(f"[ERROR] Failed to read {path}: {e}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return results, _merge_events([results[path][0] for path in paths if path in results])
+
+
+def _merge_events(per_file):
+    """Merge per-file event lists in timestamp order"""
+    per_file = [events for events in per_file if events]
+    # One file per period: usually each file starts after the previous one ends
+    if all(_event_time(a[-1]) <= _event_time(b[0]) for a, b in zip(per_file, per_file[1:])):
+        return [event for events in per_file for event in events]
+    return list(heapq.merge(*per_file, key=_event_time))
+
+
+def read_ban_events(pattern, workers=0, cache_dir=None):
+    """Tokenize every file matching pattern from the start, in timestamp order"""
+    _, events = tail_log_files(sorted(glob.glob(pattern)), {}, workers, cache_dir)
+    return events
+
+
+class BanLogTailer:
+    """Returns the events appended to the matching log files since the last commit()"""
+
+    def __init__(self, pattern, checkpoint_file, workers=0, cache_dir=None):
+        self.pattern = pattern
+        self.checkpoint_file = checkpoint_file
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.offsets = self._load()     # {path: [inode, offset, head_checksum]}
+        self.pending = None
+
+    @property
+    def is_fresh(self):
+        """True until a first checkpoint exists (the next read covers the whole history)"""
+        return not self.offsets
+
+    def _load(self):
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        tmp = f"{self.checkpoint_file}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.offsets, f)
+        os.replace(tmp, self.checkpoint_file)
+
+    def read_new_events(self):
+        """Tokenize every complete line appended since the last commit(), in timestamp order"""
+        paths = sorted(glob.glob(self.pattern))
+        results, events = tail_log_files(paths, self.offsets, self.workers, self.cache_dir)
+
+        pending = {path: checkpoint for path, (_, checkpoint) in results.items()}
+        # Keep the old checkpoint of a file that could not be read this time
+        for path in paths:
+            if path not in pending and path in self.offsets:
+                pending[path] = self.offsets[path]
+
+        self.pending = pending
+        return events
+
+    def commit(self):
+        """Persist the offsets reached by the last read_new_events() call"""
+        if self.pending is None:
+            return
+        self.offsets = self.pending
+        self.pending = None
+        self._save()
+
+    def reset(self):
+        """Forget every checkpoint so the next read starts from the beginning"""
+        self.offsets = {}
+        self.pending = None
+        self._save()
@@ -0,0 +1,86 @@
+"""
+Batched MongoDB writes for the sync scripts
+Sends write operations (UpdateOne, ReplaceOne, ...) with
+bulk_write(ordered=False) in fixed-size chunks, so a sync costs one round
+trip per chunk instead of one per document. An unordered batch keeps
+going past a failed operation, the failures are counted per chunk.
+bulk_write_chunks_async() does the same on a motor (asyncio) collection.
+"""
+
+import time
+from collections import namedtuple
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+# written/failed count operations, latencies holds one duration (seconds) per chunk
+BulkResult = namedtuple('BulkResult', 'written failed latencies')
+
+
+def _chunk_failures(collection, chunk, error):
+    """Operations of a chunk that failed with error"""
+    if isinstance(error, BulkWriteError):
+        errors = error.details.get('writeErrors', [])
+        for write_error in errors[:3]:
+            print(f"[ERROR] {collection.name} write failed: {write_error.get('errmsg')}")
+        return len(errors)
+    print(f"[ERROR] {collection.name} batch of {len(chunk)} failed: {error}")
+    return len(chunk)
+
+
+def _result(written, failed, latencies, label):
+    result = BulkResult(written, failed, latencies)
+    if label and latencies:
+        print(f"  [BULK] {label}: {format_latencies(result)}")
+    return result
+
+
+def bulk_write_chunks(collection, operations, chunk_size=1000, label=None):
+    """Run operations in unordered bulk_write chunks. Returns a BulkResult."""
+    written = 0
+    failed = 0
+    latencies = []
+
+    for start in range(0, len(operations), chunk_size):
+        chunk = operations[start:start + chunk_size]
+        started = time.perf_counter()
+        try:
+            collection.bulk_write(chunk, ordered=False)
+            written += len(chunk)
+        except PyMongoError as e:
+            errors = _chunk_failures(collection, chunk, e)
+            written += len(chunk) - errors
+            failed += errors
+        latencies.append(time.perf_counter() - started)
+
+    return _result(written, failed, latencies, label)
+
+
+async def bulk_write_chunks_async(collection, operations, chunk_size=1000, label=None):
+    """bulk_write_chunks() for a motor collection"""
+    written = 0
+    failed = 0
+    latencies = []
+
+    for start in range(0, len(operations), chunk_size):
+        chunk = operations[start:start + chunk_size]
+        started = time.perf_counter()
+        try:
+            await collection.bulk_write(chunk, ordered=False)
+            written += len(chunk)
+        except PyMongoError as e:
+            errors = _chunk_failures(collection, chunk, e)
+            written += len(chunk) - errors
+            failed += errors
+        latencies.append(time.perf_counter() - started)
+
+    return _result(written, failed, latencies, label)
+
+
+def format_latencies(result):
+    """One line summary of a BulkResult, e.g. '2500 ops in 3 batches, 12.1/20.4 ms avg/max'"""
+    avg = sum(result.latencies) / len(result.latencies) * 1000
+    worst = max(result.latencies) * 1000
+    text = f"{result.written} ops in {len(result.latencies)} batches, {avg:.1f}/{worst:.1f} ms avg/max"
+    if result.failed:
+        text += f", {result.failed} failed"
+    return text
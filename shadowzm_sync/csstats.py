@@ -0,0 +1,154 @@
+"""
+csstats.dat decoder (AMX Mod X format)
+
+File layout:
+  - 2 bytes: version/header
+  - For each player:
+    - 2 bytes: name length, then the name (null-terminated)
+    - 2 bytes: steamid length, then the steamid (null-terminated)
+    - 7 int32: tks, damage, deaths, kills, shots, hits, headshots
+
+The records are walked once to build an offset table, then every stat
+block is gathered into one buffer and split into packed int32 columns.
+
+read_csstats(..., use_mmap=True) maps the file instead of reading it and
+decodes through memoryview slices, so each sync only allocates the decoded
+strings and ints rather than a copy of the whole file. It is off by default:
+AMXX rewrites csstats.dat in place on map change, and if that truncates the
+file while it is mapped, reading the mapping kills the process with SIGBUS
+(no exception to catch). The size is re-checked before decoding, which
+narrows that window but cannot close it. Only use it where the file is
+replaced by rename rather than rewritten.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+HEADER_SIZE = 2
+MAX_STRING_LEN = 64
+STATS_SIZE = 28
+
+STAT_FIELDS = ('tks', 'damage', 'deaths', 'kills', 'shots', 'hits', 'headshots')
+
+# One entry per player, every field except version is a column of equal length.
+# Stat columns are array('i') (or tuples on platforms without a little-endian int32).
+CsstatsColumns = namedtuple('CsstatsColumns', ('version', 'nickname', 'steamid') + STAT_FIELDS)
+
+# Offset table built by scan_records(), one list per field. The string
+# lengths follow from the offsets: a name ends 2 bytes before its steamid
+# starts and a steamid ends where its stats block starts.
+RecordTable = namedtuple('RecordTable', 'name_off steamid_off stats_off partial_len')
+
+_unpack_u16 = struct.Struct('<H').unpack_from
+
+_NATIVE_INT32_LE = array('i').itemsize == 4 and sys.byteorder == 'little'
+
+
+def scan_records(data, allow_partial=False):
+    """Walk the length-prefixed records once and return their RecordTable.
+
+    If allow_partial is set, a last record whose stats block is cut short is
+    kept and partial_len holds how many whole int32s it still has.
+    """
+    size = len(data)
+    limit = size - 10
+    name_off, steamid_off, stats_off = [], [], []
+    partial_len = None
+    offset = HEADER_SIZE
+
+    while offset < limit:
+        # Read name
+        length = _unpack_u16(data, offset)[0]
+        offset += 2
+        if length == 0 or length > MAX_STRING_LEN or offset + length > size:
+            break
+        name_start = offset
+        offset += length
+
+        # Read steamid
+        if offset + 2 > size:
+            break
+        length = _unpack_u16(data, offset)[0]
+        offset += 2
+        if length == 0 or length > MAX_STRING_LEN or offset + length > size:
+            break
+        steamid_start = offset
+        offset += length
+
+        # Stats block
+        if offset + STATS_SIZE > size:
+            if allow_partial:
+                partial_len = (size - offset) // 4
+            else:
+                break
+        name_off.append(name_start)
+        steamid_off.append(steamid_start)
+        stats_off.append(offset)
+        offset += STATS_SIZE
+
+    return RecordTable(name_off, steamid_off, stats_off, partial_len)
+
+
+def _decode_strings(data, starts, ends, trim=0):
+    if isinstance(data, mmap.mmap):
+        # str() decodes straight out of the mapping without an intermediate bytes copy
+        with memoryview(data) as view:
+            return [str(view[start:end - trim], 'utf-8', 'ignore').rstrip('\x00')
+                    for start, end in zip(starts, ends)]
+    return [data[start:end - trim].rstrip(b'\x00').decode('utf-8', errors='ignore')
+            for start, end in zip(starts, ends)]
+
+
+def decode_csstats(data, allow_partial=False):
+    """Decode a csstats.dat buffer (bytes or mmap) into columns (see CsstatsColumns)"""
+    if len(data) < 10:
+        return CsstatsColumns(None, (), (), *([()] * len(STAT_FIELDS)))
+
+    version = _unpack_u16(data, 0)[0]
+    table = scan_records(data, allow_partial)
+    count = len(table.stats_off)
+
+    nicknames = _decode_strings(data, table.name_off, table.steamid_off, 2)
+    steamids = _decode_strings(data, table.steamid_off, table.stats_off)
+
+    # Copy every stat block into one zeroed buffer (a cut-short last block
+    # keeps zeros for its missing ints) and unpack it in one go. The
+    # memoryview slices only live for one copy, no bytes object per record.
+    blob = bytearray(count * STATS_SIZE)
+    full = count if table.partial_len is None else count - 1
+    with memoryview(data) as view:
+        pos = 0
+        for o in table.stats_off[:full]:
+            blob[pos:pos + STATS_SIZE] = view[o:o + STATS_SIZE]
+            pos += STATS_SIZE
+        if full < count:
+            o = table.stats_off[-1]
+            blob[pos:pos + table.partial_len * 4] = view[o:o + table.partial_len * 4]
+    if _NATIVE_INT32_LE:
+        # Columns stay packed as 4-byte ints instead of one Python int each
+        values = array('i', blob)
+    else:
+        values = struct.unpack(f'<{count * len(STAT_FIELDS)}i', blob)
+    columns = [values[i::len(STAT_FIELDS)] for i in range(len(STAT_FIELDS))]
+
+    return CsstatsColumns(version, nicknames, steamids, *columns)
+
+
+def read_csstats(filepath, allow_partial=False, use_mmap=False):
+    """Read and decode a csstats.dat file. Returns None if the file is missing."""
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, 'rb') as f:
+        if not use_mmap or os.fstat(f.fileno()).st_size < 10:
+            return decode_csstats(f.read(), allow_partial)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Truncated since it was mapped: touching the tail would SIGBUS
+            if os.fstat(f.fileno()).st_size < len(mapped):
+                f.seek(0)
+                return decode_csstats(f.read(), allow_partial)
+            return decode_csstats(mapped, allow_partial)
@@ -0,0 +1,132 @@
+"""
+Skip-if-unchanged gate for the server files
+Lets a sync loop skip reading and parsing csstats.dat / BAN_HISTORY logs
+when nothing changed since the last accepted read.
+
+Each file is compared by (size, mtime_ns, inode), which costs one stat().
+A file written again within the same mtime tick keeps its stat, so while a
+file's mtime is still "racy" (close to when it was accepted) an adler32
+checksum over its head and tail is compared as well.
+
+With a state_file, the accepted state is saved to a small JSON file, so a
+one-shot sync run from cron skips the files the previous run already read.
+"""
+
+import glob
+import json
+import os
+import time
+import zlib
+
+# Files modified less than this long before they were accepted are re-checked by content
+RACY_WINDOW_NS = 2_000_000_000
+SAMPLE_SIZE = 64 * 1024
+
+
+def file_signature(path):
+    """(size, mtime_ns, inode) of a file, or None if it is missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def head_tail_checksum(path, sample_size=SAMPLE_SIZE):
+    """adler32 over the first and last sample_size bytes of a file"""
+    try:
+        with open(path, 'rb') as f:
+            checksum = zlib.adler32(f.read(sample_size))
+            size = os.fstat(f.fileno()).st_size
+            if size > sample_size:
+                f.seek(max(sample_size, size - sample_size))
+                checksum = zlib.adler32(f.read(sample_size), checksum)
+    except OSError:
+        return None
+    return checksum
+
+
+class FileGate:
+    """Tells whether a file (or every file matching a glob pattern) changed since accept()"""
+
+    def __init__(self, path, pattern=False, state_file=None):
+        self.path = path
+        self.pattern = pattern
+        self.state_file = state_file
+        self.accepted = None    # {path: signature} at the last accept()
+        self.checksums = {}     # {path: checksum} for files that were racy when accepted
+        self.pending = None
+        self._load()
+
+    def _load(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            # Nothing accepted yet, or a gate for another path (settings changed)
+            if state['accepted'] is None or state['path'] != self.path:
+                return
+            self.accepted = {path: tuple(signature) if signature else None
+                             for path, signature in state['accepted'].items()}
+            self.checksums = state['checksums']
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.accepted = None
+            self.checksums = {}
+
+    def _save(self):
+        if not self.state_file:
+            return
+        state = {'path': self.path, 'accepted': self.accepted, 'checksums': self.checksums}
+        tmp = f"{self.state_file}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            print(f"[WARN] Could not save {self.state_file}: {e}")
+
+    def _paths(self):
+        if self.pattern:
+            return sorted(glob.glob(self.path))
+        return [self.path]
+
+    def _scan(self):
+        return {path: file_signature(path) for path in self._paths()}
+
+    def changed(self):
+        """True if the file needs to be read again"""
+        current = self._scan()
+        self.pending = current
+        if current != self.accepted:
+            return True
+
+        # Same stat, but a write in the same mtime tick would not show up in it
+        for path, checksum in list(self.checksums.items()):
+            if head_tail_checksum(path) != checksum:
+                return True
+            if not self._is_racy(current[path]):
+                del self.checksums[path]
+        return False
+
+    def accept(self):
+        """Record the state seen by the last changed() call as processed"""
+        current = self.pending if self.pending is not None else self._scan()
+        self.accepted = current
+        self.checksums = {
+            path: head_tail_checksum(path)
+            for path, signature in current.items()
+            if self._is_racy(signature)
+        }
+        self.pending = None
+        self._save()
+
+    def reset(self):
+        """Force the next changed() call to return True"""
+        self.accepted = None
+        self.checksums = {}
+        self._save()
+
+    @staticmethod
+    def _is_racy(signature):
+        return signature is not None and time.time_ns() - signature[1] < RACY_WINDOW_NS
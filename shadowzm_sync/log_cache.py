@@ -0,0 +1,77 @@
+"""
+On-disk cache of tokenized ban log events
+A BAN_HISTORY log that is no longer written never changes, so its parsed
+events are stored once per file and loaded instead of parsing the text
+again on the next cold start, --once run or daemon restart.
+
+Each entry is keyed by the file's path, size, mtime_ns and inode, so any
+change to the file misses the cache. Entries are written with marshal
+(plain tuples/strings only, nothing is executed on load); a cache written
+by another Python version simply misses.
+"""
+
+import hashlib
+import marshal
+import os
+
+CACHE_VERSION = 1
+
+
+def file_identity(path):
+    """(path, size, mtime_ns, inode) of a file, or None if it is missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def _entry_path(cache_dir, path):
+    name = hashlib.sha1(os.path.abspath(path).encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(cache_dir, f"{name}.events")
+
+
+def load_events(cache_dir, path):
+    """Cached (events, checkpoint) of a log file, or None if missing or stale"""
+    identity = file_identity(path)
+    if identity is None:
+        return None
+    try:
+        with open(_entry_path(cache_dir, path), 'rb') as f:
+            version, key, events, checkpoint = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != CACHE_VERSION or tuple(key) != identity:
+        return None
+    return events, list(checkpoint)
+
+
+def store_events(cache_dir, path, identity, events, checkpoint):
+    """Cache the events parsed from a file whose identity was taken before reading it"""
+    # The file changed while it was read, it is not sealed yet
+    if identity is None or file_identity(path) != identity:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        entry = _entry_path(cache_dir, path)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            marshal.dump((CACHE_VERSION, identity, events, tuple(checkpoint)), f)
+        os.replace(tmp, entry)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Could not cache events of {path}: {e}")
+
+
+def prune(cache_dir, paths):
+    """Remove the entries of log files that are not in paths any more"""
+    keep = {os.path.basename(_entry_path(cache_dir, path)) for path in paths}
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if name.endswith('.events') and name not in keep:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
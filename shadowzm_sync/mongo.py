@@ -0,0 +1,71 @@
+"""
+Long-lived MongoDB connection for the sync daemons
+Keeps one MongoClient (with its connection pool and monitor threads) for
+the lifetime of the process instead of connecting, pinging and closing on
+every cycle.
+
+Health comes from the driver's own heartbeat: while the topology has a
+readable server the database is handed out without a round trip. When it
+has none, a ping is tried at most once per backoff delay (doubling up to
+max_backoff) and callers get None to skip that cycle.
+"""
+
+import time
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+
+class MongoConnection:
+    """Hands out the database of one pooled MongoClient"""
+
+    def __init__(self, url, db_name, max_pool_size=10, heartbeat_seconds=10,
+                 min_backoff=1, max_backoff=60):
+        self.url = url
+        self.db_name = db_name
+        self.max_pool_size = max_pool_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.client = None
+        self.failures = 0
+        self.retry_at = 0
+
+    def _connect(self):
+        self.client = MongoClient(
+            self.url,
+            maxPoolSize=self.max_pool_size,
+            heartbeatFrequencyMS=int(self.heartbeat_seconds * 1000),
+            serverSelectionTimeoutMS=5000,
+        )
+
+    def get_db(self):
+        """The database, or None while MongoDB is unreachable"""
+        if self.client is None:
+            self._connect()
+        elif self.client.topology_description.has_readable_server():
+            self.failures = 0
+            return self.client[self.db_name]
+
+        # No healthy server seen by the heartbeat - ping, but not on every cycle
+        now = time.monotonic()
+        if now < self.retry_at:
+            return None
+        try:
+            self.client.admin.command('ping')
+        except PyMongoError as e:
+            self.failures += 1
+            delay = min(self.max_backoff, self.min_backoff * 2 ** (self.failures - 1))
+            self.retry_at = now + delay
+            print(f"[ERROR] MongoDB connection failed: {e} (retrying in {delay}s)")
+            return None
+
+        if self.failures:
+            print("[OK] MongoDB connection restored")
+        self.failures = 0
+        return self.client[self.db_name]
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
@@ -0,0 +1,35 @@
+"""
+Compact bodies for the batch webhooks
+The website's batch endpoints take gzip or zstd compressed bodies
+(Content-Encoding) and rows sent as columns, {"steamid": [...], ...},
+instead of a list of objects that repeats every key. Both keep bulk
+pushes small on the game box's slow uplink.
+
+zstd needs the optional `zstandard` package (pip install zstandard).
+"""
+
+import gzip
+import json
+
+
+def to_columns(rows):
+    """[{'a': 1, 'b': 2}, {'a': 3, 'b': 4}] -> {'a': [1, 3], 'b': [2, 4]} (rows share their keys)"""
+    if not rows:
+        return {}
+    return {key: [row[key] for row in rows] for key in rows[0]}
+
+
+def encode_body(payload, compression=None):
+    """JSON body and headers for payload, compressed with 'gzip', 'zstd' or not at all"""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if compression == 'gzip':
+        body = gzip.compress(body, 6)
+    elif compression == 'zstd':
+        import zstandard
+        body = zstandard.ZstdCompressor(level=6).compress(body)
+    elif compression:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression:
+        headers['Content-Encoding'] = compression
+    return body, headers
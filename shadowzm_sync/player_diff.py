@@ -0,0 +1,68 @@
+"""
+Incremental player diff
+Keeps the last synced snapshot of csstats players (steamid -> fingerprint, rank)
+so a sync only writes the players that were added, changed or removed.
+The rank is kept out of the fingerprint: one player climbing the table
+shifts the rank of everyone they pass, and those players only need their
+rank field set, not the whole document rewritten.
+"""
+
+from collections import namedtuple
+
+# inserted/changed are player dicts, removed is a list of steamids,
+# reranked is a list of (steamid, rank) for otherwise unchanged players.
+# snapshot is what PlayerDiff.commit() stores once the writes went through.
+PlayerChanges = namedtuple('PlayerChanges', 'inserted changed removed reranked snapshot')
+
+
+class PlayerDiff:
+    """Tracks the players written by the last successful sync"""
+
+    def __init__(self, key='steamid', ignore=('last_seen',), rank='rank'):
+        self.key = key
+        self.rank = rank
+        # Fields that change on every parse and should not count as a change
+        # (the rank is compared on its own)
+        self.ignore = frozenset(ignore) | {rank}
+        self.snapshot = {}
+
+    def fingerprint(self, player):
+        """Content fingerprint of one player dict (only compared within this process)"""
+        return hash(tuple(value for field, value in player.items() if field not in self.ignore))
+
+    def diff(self, players):
+        """Compare players against the last committed snapshot"""
+        previous = self.snapshot
+        current = {}
+        inserted = []
+        changed = []
+        reranked = []
+
+        for player in players:
+            key = player[self.key]
+            fingerprint = self.fingerprint(player)
+            rank = player.get(self.rank)
+            current[key] = (fingerprint, rank)
+
+            old = previous.get(key)
+            if old is None:
+                inserted.append(player)
+            elif old[0] != fingerprint:
+                changed.append(player)
+            elif old[1] != rank:
+                reranked.append((key, rank))
+
+        removed = [key for key in previous if key not in current]
+        return PlayerChanges(inserted, changed, removed, reranked, current)
+
+    def commit(self, changes):
+        """Make the diffed players the new baseline (call after a successful write)"""
+        self.snapshot = changes.snapshot
+
+    def reset(self):
+        """Forget the snapshot so the next sync writes everything again"""
+        self.snapshot = {}
+
+    @property
+    def is_empty(self):
+        return not self.snapshot
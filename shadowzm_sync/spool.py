@@ -0,0 +1,84 @@
+"""
+On-disk outbox for webhook pushes
+Rows are queued in a small SQLite database (WAL journal) before they are
+sent, and only removed once the website accepted them. When the website is
+down the rows stay queued and the next run sends them, instead of losing
+them or re-sending everything.
+
+Each row has a kind ('players', 'bans') and a key (steamid, steamid+reason,
+...). Queuing a row whose key is already queued replaces it, so an outage
+leaves at most one row per key, not one per run.
+"""
+
+import json
+import sqlite3
+import time
+
+
+class WebhookSpool:
+    """Append-only queue of webhook rows, de-duplicated by (kind, key)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " kind TEXT NOT NULL, key TEXT NOT NULL, row TEXT NOT NULL, queued_at REAL NOT NULL,"
+            " PRIMARY KEY (kind, key))"
+        )
+        self.db.commit()
+
+    def put_many(self, kind, items):
+        """Queue (key, row) pairs, replacing rows already queued under the same key"""
+        now = time.time()
+        with self.db:
+            # REPLACE gives the row a new rowid, so a drain that is sending the
+            # old version does not remove the new one
+            self.db.executemany(
+                "INSERT OR REPLACE INTO outbox (kind, key, row, queued_at) VALUES (?, ?, ?, ?)",
+                ((kind, str(key), json.dumps(row), now) for key, row in items)
+            )
+
+    def keys(self, kind):
+        return {key for key, in self.db.execute("SELECT key FROM outbox WHERE kind = ?", (kind,))}
+
+    def discard(self, kind, keys):
+        """Drop queued rows that must not be sent any more (e.g. a ban lifted since it was queued)"""
+        with self.db:
+            self.db.executemany("DELETE FROM outbox WHERE kind = ? AND key = ?",
+                                ((kind, str(key)) for key in keys))
+
+    def count(self, kind):
+        return self.db.execute("SELECT COUNT(*) FROM outbox WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def drain(self, kind, send, batch_size=500):
+        """Send queued rows oldest first, batch_size at a time.
+
+        send(rows) gets a list of row dicts and returns one bool per row,
+        True when the row does not need sending any more. Those rows are
+        removed; the drain stops at the first batch that was not fully
+        delivered (the website is down). Returns (sent, still queued).
+        """
+        sent = 0
+        while True:
+            batch = self.db.execute(
+                "SELECT rowid, row FROM outbox WHERE kind = ? ORDER BY rowid LIMIT ?", (kind, batch_size)
+            ).fetchall()
+            if not batch:
+                break
+
+            delivered = send([json.loads(row) for _, row in batch])
+            done = [(rowid,) for (rowid, _), ok in zip(batch, delivered) if ok]
+            with self.db:
+                self.db.executemany("DELETE FROM outbox WHERE rowid = ?", done)
+            sent += len(done)
+            # Undelivered rows stay queued for the next run
+            if len(done) < len(batch):
+                break
+
+        return sent, self.count(kind)
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,76 @@
+"""
+Full collection refresh through a staging collection
+Loads every document into "<name>_staging", builds its indexes and then
+renames it over the live collection (renameCollection with dropTarget),
+so readers see either the old or the new table, never a half-written one.
+
+The rename replaces the live collection's indexes with the staging ones,
+so the staging copy gets every index the live collection has (including
+the ones the website backend creates) plus COLLECTION_INDEXES.
+"""
+
+from pymongo import IndexModel, InsertOne
+from pymongo.errors import PyMongoError
+
+from .bulk import bulk_write_chunks
+
+# Indexes for the queries the website runs on the synced collections,
+# built on staging even when the live collection does not have them yet.
+COLLECTION_INDEXES = {
+    'players': [
+        ([('steamid', 1)], {}),
+        ([('kills', -1)], {}),
+    ],
+    'bans': [
+        ([('id', 1)], {}),
+        ([('steamid', 1)], {}),
+        ([('ban_date', -1)], {}),
+    ],
+}
+
+
+def staging_indexes(live, name):
+    """IndexModels for the live collection's indexes plus COLLECTION_INDEXES"""
+    models = []
+    keys_seen = []
+    for index_name, info in live.index_information().items():
+        if index_name == '_id_':
+            continue
+        keys = list(info['key'])
+        options = {k: v for k, v in info.items() if k not in ('key', 'v', 'ns')}
+        models.append(IndexModel(keys, name=index_name, **options))
+        keys_seen.append(keys)
+    for keys, options in COLLECTION_INDEXES.get(name, []):
+        if keys not in keys_seen:
+            models.append(IndexModel(keys, **options))
+    return models
+
+
+def swap_in_collection(db, name, documents, chunk_size=1000):
+    """Replace the whole collection with documents. Returns the staging BulkResult."""
+    staging = db[f"{name}_staging"]
+    staging.drop()
+
+    if not documents:
+        # Nothing to swap in, an empty refresh just clears the collection
+        db[name].delete_many({})
+        return bulk_write_chunks(staging, [])
+
+    result = bulk_write_chunks(staging, [InsertOne(doc) for doc in documents],
+                               chunk_size, f"{name} (staging)")
+    if result.failed:
+        # Keep serving the old collection rather than swapping in a partial one
+        staging.drop()
+        return result
+
+    try:
+        # A unique index the new documents break fails here and keeps the old collection
+        indexes = staging_indexes(db[name], name)
+        if indexes:
+            staging.create_indexes(indexes)
+        staging.rename(name, dropTarget=True)
+    except PyMongoError as e:
+        print(f"[ERROR] Failed to swap in {name}: {e}")
+        staging.drop()
+        return result._replace(written=0, failed=len(documents))
+    return result
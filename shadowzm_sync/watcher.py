@@ -0,0 +1,210 @@
+"""
+Event-driven file watcher for the server files
+Blocks until something in the watched directories changes, so a sync loop
+can react to a new ban within milliseconds and stay idle otherwise.
+
+Backends, picked in this order by mode="auto":
+  - inotify: Linux kernel events through a ctypes binding (stdlib only)
+  - watchdog: the optional `watchdog` package (pip install watchdog)
+  - poll: sleeps for the timeout, the caller then checks the files itself
+
+wait() returns the set of changed paths, an empty set on timeout, or None
+when the changes are unknown (poll backend, inotify queue overflow) and
+every file should be checked.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import time
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')   # wd, mask, cookie, name length
+
+
+class _InotifyBackend:
+    name = "inotify"
+
+    def __init__(self, directories):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = directories
+        self.watches = {}   # wd -> directory
+        self.missing = set(directories)
+        self._add_missing()
+
+    def _add_missing(self):
+        added = False
+        for directory in list(self.missing):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = directory
+                self.missing.discard(directory)
+                added = True
+        return added
+
+    def read(self, timeout):
+        # A watched directory that was missing or got removed is added again here
+        if self.missing:
+            if self._add_missing():
+                return None
+            # Also when waiting without a timeout, or the directory is never seen again
+            timeout = 5 if timeout is None else min(timeout, 5)
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                return None
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # Directory removed or moved away, watch it again once it is back
+                del self.watches[wd]
+                self.missing.add(directory)
+                return None
+            changed.add(os.path.join(directory, os.fsdecode(name)) if name else directory)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _WatchdogBackend:
+    name = "watchdog"
+
+    def __init__(self, directories):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        events = self.events = queue.Queue()
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                events.put(event.src_path)
+                if getattr(event, 'dest_path', None):
+                    events.put(event.dest_path)
+
+        self.observer = Observer()
+        for directory in directories:
+            self.observer.schedule(Handler(), directory, recursive=False)
+        self.observer.start()
+
+    def read(self, timeout):
+        changed = set()
+        try:
+            changed.add(self.events.get(timeout=timeout))
+            while True:
+                changed.add(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        return changed
+
+    def close(self):
+        self.observer.stop()
+        self.observer.join()
+
+
+class _PollBackend:
+    name = "poll"
+
+    def __init__(self, directories):
+        pass
+
+    def read(self, timeout):
+        time.sleep(timeout)
+        return None
+
+    def close(self):
+        pass
+
+
+_BACKENDS = {
+    "inotify": _InotifyBackend,
+    "watchdog": _WatchdogBackend,
+    "poll": _PollBackend,
+}
+
+
+class FileWatcher:
+    """Waits for changes to files in one or more directories"""
+
+    def __init__(self, directories, mode="auto", debounce=0.2):
+        self.directories = sorted({os.path.abspath(d) for d in directories})
+        self.debounce = debounce
+        self.backend = self._open(mode)
+
+    def _open(self, mode):
+        names = ["inotify", "watchdog", "poll"] if mode == "auto" else [mode, "poll"]
+        for name in names:
+            try:
+                return _BACKENDS[name](self.directories)
+            except Exception as e:
+                if mode != "auto" or name != "watchdog":
+                    print(f"[WARN] {name} file watcher unavailable ({e})")
+        return _PollBackend(self.directories)
+
+    @property
+    def mode(self):
+        return self.backend.name
+
+    @property
+    def is_polling(self):
+        return self.backend.name == "poll"
+
+    def wait(self, timeout):
+        """Block until a change (or timeout). Returns changed paths, set() or None (see module doc)"""
+        changed = self.backend.read(timeout)
+        if not changed:
+            return changed
+
+        # Debounce: a log line or a csstats.dat rewrite comes as a burst of events
+        deadline = time.monotonic() + max(1.0, self.debounce * 5)
+        while time.monotonic() < deadline:
+            more = self.backend.read(self.debounce)
+            if more is None:
+                return None
+            if not more:
+                return changed
+            changed |= more
+        return changed
+
+    def close(self):
+        self.backend.close()
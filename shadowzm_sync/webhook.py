@@ -0,0 +1,78 @@
+"""
+Pooled HTTP client for the scripts that push to the website webhooks
+One requests.Session keeps its connections alive, so pushing many
+players or bans does not pay a new TCP+TLS handshake per request.
+post_many() sends up to max_in_flight requests at a time on a thread pool.
+
+Connection errors, timeouts and 429/5xx answers are retried with
+exponential backoff and full jitter. The webhooks upsert, so sending a
+request twice is harmless.
+
+post(compression=...) sends the body gzip or zstd compressed, see
+payload.py.
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .payload import encode_body
+
+# Answers worth another try: rate limited or the website is restarting
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class WebhookClient:
+    """POSTs JSON to one website over a pool of kept-alive connections"""
+
+    def __init__(self, base_url, max_in_flight=8, retries=3, backoff=0.5, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.max_in_flight = max(1, max_in_flight)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        # One connection per concurrent request, retries are done in post()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _sleep_before_retry(self, attempt):
+        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def post(self, path, payload, timeout=None, compression=None):
+        """POST payload as JSON to base_url + path. Raises the last error once retries run out."""
+        url = self.base_url + path
+        body, headers = encode_body(payload, compression)
+        for attempt in range(self.retries + 1):
+            last_try = attempt == self.retries
+            try:
+                response = self.session.post(url, data=body, headers=headers, timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_try:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS or last_try:
+                    return response
+            self._sleep_before_retry(attempt)
+
+    def post_many(self, path, payloads, timeout=None, compression=None):
+        """post() every payload, max_in_flight at a time.
+        Returns a list of responses (or the exception raised) in payload order."""
+        def send(payload):
+            try:
+                return self.post(path, payload, timeout, compression)
+            except requests.RequestException as e:
+                return e
+
+        if self.max_in_flight == 1 or len(payloads) <= 1:
+            return [send(payload) for payload in payloads]
+        with ThreadPoolExecutor(self.max_in_flight) as pool:
+            return list(pool.map(send, payloads))
+
+    def close(self):
+        self.session.close()
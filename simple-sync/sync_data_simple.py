@@ -2,15 +2,23 @@
 """
 Simple CS 1.6 Live Data Sync
 Syncs rankings and bans to website database
+
+Needs the shadowzm_sync/ folder from the repo next to this script when it
+is copied somewhere on its own (e.g. /root/shadowzm_sync/).
 """
 
-import struct
 import glob
-import re
 from pymongo import MongoClient
 from datetime import datetime
 import time
 import os
+import sys
+
+# Shared sync helpers (shadowzm_sync/): the repo root, or a copy next to this script
+# (the script's own folder is already on sys.path)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadowzm_sync.ban_log import BAN, tokenize_ban_lines
+from shadowzm_sync.csstats import read_csstats
 
 # ============ YOUR CONFIGURATION ============
 MONGO_URL = "mongodb://localhost:27017"
@@ -33,77 +41,32 @@ def parse_csstats(filepath):
         return []
     
     try:
-        with open(filepath, 'rb') as f:
-            data = f.read()
+        stats = read_csstats(filepath)
     except Exception as e:
         print(f"❌ Error reading stats file: {e}")
         return []
     
-    if len(data) < 10:
+    if stats is None or stats.version is None:
         print("⚠️  Stats file too small")
         return []
     
-    offset = 2  # Skip header
-    
-    while offset < len(data) - 10:
-        try:
-            # Read name length
-            if offset + 2 > len(data):
-                break
-            name_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if name_len == 0 or name_len > 64:
-                break
-            
-            # Read name
-            if offset + name_len > len(data):
-                break
-            name = data[offset:offset+name_len].rstrip(b'\0').decode('utf-8', errors='ignore')
-            offset += name_len
-            
-            # Read steamid length
-            if offset + 2 > len(data):
-                break
-            steamid_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if steamid_len == 0 or steamid_len > 64:
-                break
-            
-            # Read steamid
-            if offset + steamid_len > len(data):
-                break
-            steamid = data[offset:offset+steamid_len].rstrip(b'\0').decode('utf-8', errors='ignore')
-            offset += steamid_len
-            
-            # Read stats (7 integers)
-            if offset + 28 > len(data):
-                break
-            
-            stats = list(struct.unpack('<7i', data[offset:offset+28]))
-            offset += 28
-            
-            tks, damage, deaths, kills, shots, hits, headshots = stats
-            
-            # Skip invalid
-            if kills < 0 or deaths < 0 or not steamid:
-                continue
-            
-            kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
-            
-            players.append({
-                'nickname': name,
-                'steamid': steamid,
-                'kills': max(0, kills),
-                'deaths': max(0, deaths),
-                'headshots': max(0, headshots),
-                'kd_ratio': kd_ratio,
-                'last_seen': datetime.utcnow()
-            })
-            
-        except:
-            break
+    for name, steamid, deaths, kills, headshots in zip(
+            stats.nickname, stats.steamid, stats.deaths, stats.kills, stats.headshots):
+        # Skip invalid
+        if kills < 0 or deaths < 0 or not steamid:
+            continue
+        
+        kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
+        
+        players.append({
+            'nickname': name,
+            'steamid': steamid,
+            'kills': max(0, kills),
+            'deaths': max(0, deaths),
+            'headshots': max(0, headshots),
+            'kd_ratio': kd_ratio,
+            'last_seen': datetime.utcnow()
+        })
     
     players.sort(key=lambda x: x['kills'], reverse=True)
     return players
@@ -125,32 +88,21 @@ def parse_ban_logs(log_dir):
     for log_file in sorted(log_files):
         try:
             with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    
+                for kind, timestamp, steamid, player, admin, reason, duration in tokenize_ban_lines(f):
                     # Check for unban
-                    if 'unbanned' in line or 'Ban time is up' in line:
-                        unban_match = re.search(r'unbanned .+? <([^>]+)>', line)
-                        if unban_match:
-                            unbanned_steamids.add(unban_match.group(1))
-                        expire_match = re.search(r'Ban time is up for: .+ \[([^\]]+)\]', line)
-                        if expire_match:
-                            unbanned_steamids.add(expire_match.group(1))
+                    if kind != BAN:
+                        unbanned_steamids.add(steamid)
                     
                     # Check for ban
-                    elif 'banned' in line and '||' in line:
-                        pattern = r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2}): (.+?) <([^>]*)> banned (.+?) <([^>]+)> \|\| Reason: "([^"]*)" \|\| Ban Length: (.+)'
-                        match = re.match(pattern, line)
-                        if match:
-                            timestamp_str, admin_name, admin_steam, player_name, player_steam, reason, duration = match.groups()
-                            all_bans.append({
-                                'player_nickname': player_name.strip(),
-                                'steamid': player_steam.strip(),
-                                'reason': reason.strip() if reason.strip() else "Banned",
-                                'admin_name': admin_name.strip(),
-                                'duration': duration.strip(),
-                                'ban_date': datetime.utcnow()
-                            })
+                    else:
+                        all_bans.append({
+                            'player_nickname': player,
+                            'steamid': steamid,
+                            'reason': reason if reason else "Banned",
+                            'admin_name': admin,
+                            'duration': duration,
+                            'ban_date': datetime.utcnow()
+                        })
         except:
             continue
     
@@ -3,17 +3,25 @@
 Standalone CS 1.6 Stats API Server
 Reads directly from server files and provides REST API
 No database dependency - reads files in real-time
+
+Needs the shadowzm_sync/ folder from the repo next to this script when it
+is copied somewhere on its own.
 """
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import a2s
-import struct
-import glob
-import re
 from datetime import datetime
 from typing import List, Dict, Optional
 import os
+import sys
+
+# Shared sync helpers (shadowzm_sync/): the repo root, or a copy next to this script
+# (the script's own folder is already on sys.path)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadowzm_sync.ban_log import BAN
+from shadowzm_sync.ban_tail import read_ban_events
+from shadowzm_sync.csstats import read_csstats
 
 app = FastAPI(title="CS 1.6 Stats API", version="1.0.0")
 
@@ -33,6 +41,9 @@ CS_SERVER_PORT = 27016
 # YOUR Pterodactyl volume path
 CSSTATS_FILE = "/var/lib/pterodactyl/volumes/d8109667-ac86-4f43-aeb3-5e84ed58df07/cstrike/addons/amxmodx/data/csstats.dat"
 BAN_LOGS_DIR = "/var/lib/pterodactyl/volumes/d8109667-ac86-4f43-aeb3-5e84ed58df07/cstrike/addons/amxmodx/logs"
+
+# Parsed events of old ban logs (None disables the cache)
+BAN_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ban_log_cache")
 # =======================================
 
 def query_cs_server():
@@ -77,84 +88,36 @@ def parse_csstats(filepath):
     """Parse csstats.dat file"""
     players = []
     
-    try:
-        with open(filepath, 'rb') as f:
-            data = f.read()
-    except FileNotFoundError:
-        return []
-    
-    if len(data) < 10:
+    stats = read_csstats(filepath)
+    if stats is None:
         return []
     
-    offset = 2  # Skip header
-    
-    while offset < len(data) - 10:
-        try:
-            # Read name length
-            if offset + 2 > len(data):
-                break
-            name_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if name_len == 0 or name_len > 64:
-                break
-            
-            # Read name
-            if offset + name_len > len(data):
-                break
-            name = data[offset:offset+name_len].rstrip(b'\\0').decode('utf-8', errors='ignore')
-            offset += name_len
-            
-            # Read steamid length
-            if offset + 2 > len(data):
-                break
-            steamid_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            
-            if steamid_len == 0 or steamid_len > 64:
-                break
-            
-            # Read steamid
-            if offset + steamid_len > len(data):
-                break
-            steamid = data[offset:offset+steamid_len].rstrip(b'\\0').decode('utf-8', errors='ignore')
-            offset += steamid_len
-            
-            # Read stats (7 integers = 28 bytes)
-            if offset + 28 > len(data):
-                break
-            
-            stats = list(struct.unpack('<7i', data[offset:offset+28]))
-            offset += 28
-            
-            tks, damage, deaths, kills, shots, hits, headshots = stats
-            
-            # Skip invalid entries
-            if kills < 0 or deaths < 0:
-                continue
-            
-            # Calculate K/D ratio
-            kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
-            
-            # Calculate accuracy
-            accuracy = round((hits / shots * 100), 2) if shots > 0 else 0
-            
-            players.append({
-                'rank': 0,  # Will be set after sorting
-                'nickname': name,
-                'steamid': steamid,
-                'kills': max(0, kills),
-                'deaths': max(0, deaths),
-                'headshots': max(0, headshots),
-                'kd_ratio': kd_ratio,
-                'accuracy': accuracy,
-                'damage': max(0, damage),
-                'hits': max(0, hits),
-                'shots': max(0, shots)
-            })
-            
-        except Exception as e:
-            break
+    for name, steamid, damage, deaths, kills, shots, hits, headshots in zip(
+            stats.nickname, stats.steamid, stats.damage, stats.deaths,
+            stats.kills, stats.shots, stats.hits, stats.headshots):
+        # Skip invalid entries
+        if kills < 0 or deaths < 0:
+            continue
+        
+        # Calculate K/D ratio
+        kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
+        
+        # Calculate accuracy
+        accuracy = round((hits / shots * 100), 2) if shots > 0 else 0
+        
+        players.append({
+            'rank': 0,  # Will be set after sorting
+            'nickname': name,
+            'steamid': steamid,
+            'kills': max(0, kills),
+            'deaths': max(0, deaths),
+            'headshots': max(0, headshots),
+            'kd_ratio': kd_ratio,
+            'accuracy': accuracy,
+            'damage': max(0, damage),
+            'hits': max(0, hits),
+            'shots': max(0, shots)
+        })
     
     # Sort by kills and assign ranks
     players.sort(key=lambda x: x['kills'], reverse=True)
@@ -165,45 +128,26 @@ def parse_csstats(filepath):
 
 def parse_ban_logs(log_dir):
     """Parse ban history logs"""
-    log_files = glob.glob(f"{log_dir}/BAN_HISTORY_*.log")
-    
-    if not log_files:
-        return []
-    
     all_bans = []
     unbanned_steamids = set()
     
-    for log_file in sorted(log_files):
-        try:
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    # Check for unban
-                    if 'unbanned' in line or 'Ban time is up' in line:
-                        unban_match = re.search(r'unbanned .+? <([^>]+)>', line)
-                        if unban_match:
-                            unbanned_steamids.add(unban_match.group(1))
-                        expire_match = re.search(r'Ban time is up for: .+ \\[([^\\]]+)\\]', line)
-                        if expire_match:
-                            unbanned_steamids.add(expire_match.group(1))
-                    
-                    # Check for ban
-                    elif 'banned' in line and '||' in line:
-                        pattern = r'L (\\d{2}/\\d{2}/\\d{4} - \\d{2}:\\d{2}:\\d{2}): (.+?) <([^>]*)> banned (.+?) <([^>]+)> \\|\\| Reason: "([^"]*)" \\|\\| Ban Length: (.+)'
-                        match = re.match(pattern, line)
-                        if match:
-                            timestamp_str, admin_name, admin_steam, player_name, player_steam, reason, duration = match.groups()
-                            all_bans.append({
-                                'timestamp': timestamp_str,
-                                'admin_name': admin_name.strip(),
-                                'player_nickname': player_name.strip(),
-                                'steamid': player_steam.strip(),
-                                'reason': reason.strip() if reason.strip() else "Banned",
-                                'duration': duration.strip()
-                            })
-        except Exception as e:
-            continue
+    # Old log files come from the event cache, only the live one is parsed again
+    events = read_ban_events(f"{log_dir}/BAN_HISTORY_*.log", cache_dir=BAN_CACHE_DIR)
+    for kind, timestamp, steamid, player, admin, reason, duration in events:
+        # Check for unban
+        if kind != BAN:
+            unbanned_steamids.add(steamid)
+        
+        # Check for ban
+        else:
+            all_bans.append({
+                'timestamp': timestamp,
+                'admin_name': admin,
+                'player_nickname': player,
+                'steamid': steamid,
+                'reason': reason if reason else "Banned",
+                'duration': duration
+            })
     
     # Filter out unbanned players
     latest_bans = {}
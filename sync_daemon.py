@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+ShadowZM Sync Daemon
+One asyncio process that keeps MongoDB in sync with the CS 1.6 server files.
+Instead of a parse -> write -> sleep loop, independent tasks run side by side:
+  - stats:  writes the players that changed in csstats.dat
+  - bans:   syncs the lines appended to the BAN_HISTORY logs
+  - expiry: marks bans whose expires_at has passed as expired
+File events (inotify / watchdog) wake the stats and bans tasks right away.
+Parsing runs in a thread pool (old ban logs in BAN_PARSE_WORKERS processes),
+so a slow ban log rescan never holds up a stats push. Writes go through motor.
+
+Paths, database and parse settings are the ones in sync_data.py. The
+other sync scripts run this daemon with their own settings through
+main(**settings) (realtime_sync.py, simple_sync.py --continuous), so a
+copy of one of them needs sync_daemon.py and sync_data.py next to it.
+
+Usage: python3 sync_daemon.py  (same as: python3 sync_data.py --continuous)
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteMany, ReplaceOne, UpdateMany, UpdateOne
+
+import sync_data as sync
+from shadowzm_sync.ban_log import format_time
+from shadowzm_sync.bulk import bulk_write_chunks_async
+from shadowzm_sync.watcher import FileWatcher
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+# csstats.dat is checked at least every SYNC_INTERVAL seconds (sync_data.py)
+BAN_CHECK_INTERVAL = 5      # Longest wait between ban log checks (poll mode / retries)
+EXPIRY_SWEEP_INTERVAL = 60  # How often bans past their expires_at are marked expired
+
+MONGO_POOL_SIZE = 10
+
+# How file changes are noticed: "auto" (inotify, then watchdog, then polling),
+# "inotify", "watchdog" or "poll"
+WATCH_MODE = "auto"
+WATCH_DEBOUNCE = 0.2        # Quiet time (seconds) that ends a burst of file events
+
+# ============================================================
+
+# Settings of this file main() may override, the others go to sync_data.configure()
+SETTINGS = ('BAN_CHECK_INTERVAL', 'EXPIRY_SWEEP_INTERVAL', 'MONGO_POOL_SIZE', 'WATCH_MODE', 'WATCH_DEBOUNCE')
+
+# One parse thread per task, so the stats and bans tasks never queue behind each other
+parse_pool = ThreadPoolExecutor(2, thread_name_prefix="parse")
+
+
+def log(message):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+
+
+async def in_parse_pool(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(parse_pool, func, *args)
+
+
+async def wait_for_wakeup(wakeup, timeout):
+    """Sleep until wakeup is set or timeout passes"""
+    try:
+        await asyncio.wait_for(wakeup.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    wakeup.clear()
+
+
+# ============================================================
+# STATS
+# ============================================================
+
+async def write_players(db, players):
+    """Write the players that changed since the last sync. Returns True if every write went through."""
+    first_sync = sync.player_diff.is_empty
+    changes = await in_parse_pool(sync.player_diff.diff, players)
+
+    upserts = changes.inserted + changes.changed
+    operations = [ReplaceOne({'steamid': p['steamid']}, p, upsert=True) for p in upserts]
+    # Players that only moved in the table just get their new rank
+    operations += [UpdateOne({'steamid': steamid}, {'$set': {'rank': rank}})
+                   for steamid, rank in changes.reranked]
+    if first_sync:
+        # Clean data on startup: drop players that are no longer in csstats.dat
+        steamids = [p['steamid'] for p in players]
+        operations.append(DeleteMany({'steamid': {'$nin': steamids}}))
+    elif changes.removed:
+        operations.append(DeleteMany({'steamid': {'$in': changes.removed}}))
+
+    result = await bulk_write_chunks_async(db.players, operations, sync.PLAYER_BATCH_SIZE, "players")
+    if result.failed:
+        return False
+
+    # Keep the old snapshot on errors so the next sync retries those players
+    sync.player_diff.commit(changes)
+    log(f"👥 Synced {len(upserts)} changed players, {len(changes.reranked)} new ranks"
+        f" ({len(players)} in stats file)")
+    return True
+
+
+async def stats_task(db, wakeup):
+    while True:
+        try:
+            if sync.csstats_gate.changed():
+                players = await in_parse_pool(sync.parse_csstats, sync.CSSTATS_FILE)
+                if players and await write_players(db, players):
+                    sync.csstats_gate.accept()
+        except Exception as e:
+            log(f"[ERROR] Player sync failed: {e}")
+        await wait_for_wakeup(wakeup, sync.SYNC_INTERVAL)
+
+
+# ============================================================
+# BANS
+# ============================================================
+
+def ban_operations(events):
+    """Bulk write operations for a list of ban log events"""
+    all_bans = {}
+    unban_events = {}
+    sync.parse_ban_events(events, all_bans, unban_events)
+    bans = sync.reconcile_bans(all_bans, unban_events)
+
+    operations = [UpdateOne({'id': ban['id']}, {'$set': ban}, upsert=True) for ban in bans]
+    # Unbans in the new lines also close bans synced earlier
+    # ($ne: bans written by older realtime/simple syncs have no is_expired field)
+    for steamid, last_unban in unban_events.items():
+        operations.append(UpdateMany(
+            {'steamid': steamid, 'is_expired': {'$ne': True}, 'ban_date': {'$lt': format_time(last_unban)}},
+            {'$set': {'is_expired': True}}
+        ))
+    return operations, len(bans)
+
+
+def dedupe_old_bans():
+    """sync_data's duplicate bans cleanup (blocking pymongo, run off the event loop)"""
+    db = sync.mongo.get_db()
+    if db is not None:
+        sync.run_dedupe_bans(db)
+        sync.mongo.close()
+
+
+async def bans_task(db, wakeup):
+    while True:
+        try:
+            if sync.ban_logs_changed():
+                # A full resync also cleans up the copies left by the old hash() based ids
+                if sync.ban_tailer.is_fresh:
+                    await in_parse_pool(dedupe_old_bans)
+                events = await in_parse_pool(sync.ban_tailer.read_new_events)
+                operations, count = await in_parse_pool(ban_operations, events)
+                result = await bulk_write_chunks_async(db.bans, operations, sync.PLAYER_BATCH_SIZE, "bans")
+                # Keep the old checkpoint on errors so the next check re-reads these lines
+                if not result.failed:
+                    sync.ban_tailer.commit()
+                    sync.ban_logs_gate.accept()
+                    if count:
+                        log(f"🚨 Synced {count} new bans")
+        except Exception as e:
+            log(f"[ERROR] Ban sync failed: {e}")
+        await wait_for_wakeup(wakeup, BAN_CHECK_INTERVAL)
+
+
+async def expiry_task(db):
+    while True:
+        try:
+            # expires_at is an ISO string in UTC, so it compares as text
+            now = format_time(int(time.time()))
+            result = await db.bans.update_many(
+                {'is_expired': False, 'expires_at': {'$lte': now}},
+                {'$set': {'is_expired': True}}
+            )
+            if result.modified_count:
+                log(f"⏰ {result.modified_count} bans expired")
+        except Exception as e:
+            log(f"[ERROR] Ban expiry sweep failed: {e}")
+        await asyncio.sleep(EXPIRY_SWEEP_INTERVAL)
+
+
+# ============================================================
+# FILE EVENTS
+# ============================================================
+
+async def watch_task(watcher, stats_wakeup, bans_wakeup):
+    """Wake the stats / bans tasks when their files change"""
+    loop = asyncio.get_running_loop()
+    csstats_path = os.path.abspath(sync.CSSTATS_FILE)
+    while True:
+        # Short timeout so the blocking wait never outlives a shutdown by much
+        changed = await loop.run_in_executor(None, watcher.wait, 1.0)
+        if changed is None:
+            stats_wakeup.set()
+            bans_wakeup.set()
+            continue
+        for path in changed:
+            name = os.path.basename(path)
+            if name.startswith("BAN_HISTORY_") and name.endswith(".log"):
+                bans_wakeup.set()
+            elif path == csstats_path:
+                stats_wakeup.set()
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+async def run_daemon():
+    print("="*50)
+    print("  ShadowZM Sync Daemon")
+    print("="*50)
+    print(f"  Stats: {sync.CSSTATS_FILE}")
+    print(f"  Logs:  {sync.BAN_LOGS_DIR}")
+
+    client = AsyncIOMotorClient(sync.MONGO_URL, maxPoolSize=MONGO_POOL_SIZE)
+    db = client[sync.DB_NAME]
+    watcher = FileWatcher([sync.BAN_LOGS_DIR, os.path.dirname(sync.CSSTATS_FILE)], WATCH_MODE, WATCH_DEBOUNCE)
+    print(f"  Files: {watcher.mode} (checked at least every {sync.SYNC_INTERVAL}s / {BAN_CHECK_INTERVAL}s)")
+    print("="*50)
+    print("\nPress Ctrl+C to stop\n")
+
+    stats_wakeup = asyncio.Event()
+    bans_wakeup = asyncio.Event()
+    tasks = [
+        stats_task(db, stats_wakeup),
+        bans_task(db, bans_wakeup),
+        expiry_task(db),
+    ]
+    if not watcher.is_polling:
+        tasks.append(watch_task(watcher, stats_wakeup, bans_wakeup))
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        watcher.close()
+        client.close()
+        parse_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main(**settings):
+    """Run the daemon. settings replace CONFIGURATION names of this file or sync_data.py."""
+    for name in SETTINGS:
+        if name in settings:
+            globals()[name] = settings.pop(name)
+    if settings:
+        sync.configure(**settings)
+    try:
+        asyncio.run(run_daemon())
+    except KeyboardInterrupt:
+        print("\nStopping...")
+
+
+if __name__ == "__main__":
+    main()
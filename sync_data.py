@@ -5,14 +5,22 @@ Syncs player stats from csstats.dat and bans from BAN_HISTORY logs to MongoDB
 KEEPS expired bans (marks them as expired instead of deleting)
 """
 
-import struct
-import glob
 import re
 import os
 import sys
 import time
-from datetime import datetime, timezone, timedelta
-from pymongo import MongoClient
+from datetime import datetime, timezone
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+
+from shadowzm_sync.ban_dedupe import dedupe_bans
+from shadowzm_sync.ban_log import BAN, ban_id, format_time, parse_log_time
+from shadowzm_sync.ban_tail import BanLogTailer, read_ban_events
+from shadowzm_sync.bulk import bulk_write_chunks
+from shadowzm_sync.csstats import read_csstats
+from shadowzm_sync.file_gate import FileGate
+from shadowzm_sync.mongo import MongoConnection
+from shadowzm_sync.player_diff import PlayerDiff
+from shadowzm_sync.staging import swap_in_collection
 
 # ============================================================
 # CONFIGURATION - EDIT THESE PATHS FOR YOUR SERVER
@@ -25,18 +33,72 @@ DB_NAME = "shadowzm_database"
 CSSTATS_FILE = "/var/lib/pterodactyl/volumes/7cc6beed-d649-427e-b172-3ae51a81a1b9/cstrike/addons/amxmodx/data/csstats.dat"
 BAN_LOGS_DIR = "/var/lib/pterodactyl/volumes/7cc6beed-d649-427e-b172-3ae51a81a1b9/cstrike/addons/amxmodx/logs"
 
-SYNC_INTERVAL = 30  # seconds
+SYNC_INTERVAL = 30  # seconds between csstats.dat checks in continuous mode
+
+# Map csstats.dat instead of reading a full copy of it.
+# Leave off unless csstats.dat is replaced by rename: AMXX rewriting it in
+# place while it is mapped kills this process with SIGBUS (see csstats.py).
+CSSTATS_USE_MMAP = False
+
+# Player writes per bulk_write round trip
+PLAYER_BATCH_SIZE = 1000
+
+# Remembers how far each ban log was synced, so only new lines are parsed
+BAN_CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ban_log_checkpoint.json")
+
+# Processes used to parse old (no longer written) ban logs on a cold start
+# or full resync. 0 parses every file in this process, os.cpu_count() uses every core.
+BAN_PARSE_WORKERS = 0
+
+# Parsed events of old ban logs are cached here, so they are only parsed once (None disables)
+BAN_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ban_log_cache")
 
 # ============================================================
 
-def get_db():
-    try:
-        client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=5000)
-        client.admin.command('ping')
-        return client, client[DB_NAME]
-    except Exception as e:
-        print(f"[ERROR] MongoDB connection failed: {e}")
-        return None, None
+# Settings configure() may override
+SETTINGS = ('MONGO_URL', 'DB_NAME', 'CSSTATS_FILE', 'BAN_LOGS_DIR', 'SYNC_INTERVAL', 'CSSTATS_USE_MMAP',
+            'PLAYER_BATCH_SIZE', 'BAN_CHECKPOINT_FILE', 'BAN_PARSE_WORKERS', 'BAN_CACHE_DIR')
+
+
+def init_state():
+    """(Re)build the sync state from the configuration"""
+    global player_diff, csstats_gate, ban_logs_gate, ban_tailer, mongo
+    
+    # Players written by the last sync, so continuous mode only writes changes
+    player_diff = PlayerDiff()
+    
+    # Skip reading the stats file / ban logs when they did not change since the last sync
+    # (saved next to the ban log checkpoint, so one-shot runs skip them too)
+    state_dir = os.path.dirname(os.path.abspath(BAN_CHECKPOINT_FILE))
+    csstats_gate = FileGate(CSSTATS_FILE, state_file=os.path.join(state_dir, "csstats_gate.json"))
+    ban_logs_gate = FileGate(f"{BAN_LOGS_DIR}/BAN_HISTORY_*.log", pattern=True,
+                             state_file=os.path.join(state_dir, "ban_logs_gate.json"))
+    ban_tailer = BanLogTailer(f"{BAN_LOGS_DIR}/BAN_HISTORY_*.log", BAN_CHECKPOINT_FILE, BAN_PARSE_WORKERS, BAN_CACHE_DIR)
+    
+    # One pooled MongoDB client, kept open across syncs in continuous mode
+    mongo = MongoConnection(MONGO_URL, DB_NAME)
+
+
+def configure(**settings):
+    """Replace settings from the CONFIGURATION above, for scripts that run
+    this sync (or sync_daemon.py) with their own paths"""
+    for name, value in settings.items():
+        if name not in SETTINGS:
+            raise TypeError(f"Unknown sync_data setting: {name}")
+        globals()[name] = value
+    init_state()
+
+
+init_state()
+
+
+def reset_state():
+    """Forget everything synced so far (diff snapshot, file gates, ban log
+    checkpoint), for when the database was emptied: the next sync writes all again"""
+    player_diff.reset()
+    csstats_gate.reset()
+    ban_logs_gate.reset()
+    ban_tailer.reset()
 
 
 def parse_duration_to_minutes(duration_str):
@@ -75,19 +137,18 @@ def parse_duration_to_minutes(duration_str):
         return None
 
 
-def calculate_expiry(ban_date_str, duration_str):
-    """Calculate expiry datetime from ban date and duration"""
+def calculate_expiry(ban_time, duration_str):
+    """Calculate expiry (unix seconds) from ban time (unix seconds) and duration"""
     minutes = parse_duration_to_minutes(duration_str)
     if minutes is None:
         return None  # Permanent
     
+    expiry = ban_time + minutes * 60
     try:
-        # Parse the ban date
-        ban_date = datetime.fromisoformat(ban_date_str.replace('Z', '+00:00'))
-        expiry = ban_date + timedelta(minutes=minutes)
-        return expiry.isoformat()
-    except:
-        return None
+        format_time(expiry)
+    except (OverflowError, ValueError, OSError):
+        return None  # Beyond the datetime range, treat as permanent
+    return expiry
 
 
 def parse_csstats(filepath):
@@ -97,68 +158,31 @@ def parse_csstats(filepath):
         return []
     
     try:
-        with open(filepath, 'rb') as f:
-            data = f.read()
+        stats = read_csstats(filepath, use_mmap=CSSTATS_USE_MMAP)
     except Exception as e:
         print(f"[ERROR] Failed to read stats file: {e}")
         return []
     
-    if len(data) < 10:
+    if stats is None:
         return []
     
     players = []
-    offset = 2  # Skip header
-    
-    while offset < len(data) - 10:
-        try:
-            # Read name
-            if offset + 2 > len(data):
-                break
-            name_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            if name_len == 0 or name_len > 64:
-                break
-            if offset + name_len > len(data):
-                break
-            name = data[offset:offset+name_len].rstrip(b'\x00').decode('utf-8', errors='ignore')
-            offset += name_len
-            
-            # Read steamid
-            if offset + 2 > len(data):
-                break
-            steamid_len = struct.unpack('<H', data[offset:offset+2])[0]
-            offset += 2
-            if steamid_len == 0 or steamid_len > 64:
-                break
-            if offset + steamid_len > len(data):
-                break
-            steamid = data[offset:offset+steamid_len].rstrip(b'\x00').decode('utf-8', errors='ignore')
-            offset += steamid_len
-            
-            # Read stats (7 integers)
-            if offset + 28 > len(data):
-                break
-            stats = struct.unpack('<7i', data[offset:offset+28])
-            offset += 28
-            
-            tks, damage, deaths, kills, shots, hits, headshots = stats
-            
-            if kills < 0 or deaths < 0 or not steamid:
-                continue
-            
-            kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
-            
-            players.append({
-                'nickname': name,
-                'steamid': steamid,
-                'kills': max(0, kills),
-                'deaths': max(0, deaths),
-                'headshots': max(0, headshots),
-                'kd_ratio': kd_ratio,
-                'level': min(50, kills // 500),
-            })
-        except:
-            break
+    for name, steamid, deaths, kills, headshots in zip(
+            stats.nickname, stats.steamid, stats.deaths, stats.kills, stats.headshots):
+        if kills < 0 or deaths < 0 or not steamid:
+            continue
+        
+        kd_ratio = round(kills / deaths, 2) if deaths > 0 else float(kills)
+        
+        players.append({
+            'nickname': name,
+            'steamid': steamid,
+            'kills': max(0, kills),
+            'deaths': max(0, deaths),
+            'headshots': max(0, headshots),
+            'kd_ratio': kd_ratio,
+            'level': min(50, kills // 500),
+        })
     
     # Sort and rank
     players.sort(key=lambda x: x['kills'], reverse=True)
@@ -170,132 +194,105 @@ def parse_csstats(filepath):
     return players
 
 
+def parse_ban_events(events, all_bans, unban_events):
+    """Parse BAN_HISTORY events into all_bans (steamid -> [(ban time, ban)]) /
+    unban_events (steamid -> latest unban time). Times are unix seconds."""
+    now = time.time()
+    
+    for kind, timestamp, steamid, player, admin, reason, duration in events:
+        # Unban or ban expired
+        if kind != BAN:
+            unban_time = parse_log_time(timestamp)
+            if unban_time is not None:
+                unban_events[steamid] = max(unban_time, unban_events.get(steamid, unban_time))
+            continue
+        
+        # Parse the timestamp once, everything below compares ints
+        ban_time = parse_log_time(timestamp)
+        ban_start = ban_time if ban_time is not None else now
+        expires_at = calculate_expiry(ban_start, duration)
+        
+        ban_data = {
+            'id': ban_id(steamid, timestamp, admin),
+            'player_nickname': player,
+            'steamid': steamid,
+            'ip': 'hidden',
+            'reason': reason or 'No reason provided',
+            'admin_name': admin,
+            'duration': duration,
+            'ban_date': format_time(ban_start),
+            'source': 'server',
+            'is_expired': expires_at is not None and expires_at < now,
+            'expires_at': format_time(expires_at) if expires_at is not None else None
+        }
+        
+        if steamid not in all_bans:
+            all_bans[steamid] = []
+        all_bans[steamid].append((ban_time, ban_data))
+
+
+def reconcile_bans(all_bans, unban_events):
+    """Mark bans as expired when an unban for the same steamid follows them"""
+    final_bans = []
+    for steamid, bans in all_bans.items():
+        # Any unban after a ban lifted it, so only the latest unban matters
+        last_unban = unban_events.get(steamid)
+        for ban_time, ban in bans:
+            if last_unban is not None and ban_time is not None and ban_time < last_unban:
+                ban['is_expired'] = True
+            final_bans.append(ban)
+    
+    return final_bans
+
+
 def parse_ban_logs(log_dir):
     """Parse BAN_HISTORY log files - keeps ALL bans including expired ones"""
     if not os.path.exists(log_dir):
         print(f"[WARN] Ban logs dir not found: {log_dir}")
         return []
     
-    log_files = glob.glob(f"{log_dir}/BAN_HISTORY_*.log")
-    if not log_files:
-        return []
-    
     # Track all ban events
-    all_bans = {}  # steamid -> list of ban events
-    unban_events = {}  # steamid -> list of unban timestamps
+    all_bans = {}  # steamid -> list of (ban time, ban)
+    unban_events = {}  # steamid -> latest unban time
     
-    for log_file in sorted(log_files):
-        try:
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    # Check for unban (ban expired)
-                    if 'unbanned' in line or 'Ban time is up' in line:
-                        # Extract timestamp
-                        time_match = re.search(r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2})', line)
-                        timestamp = time_match.group(1) if time_match else None
-                        
-                        unban_match = re.search(r'unbanned .+? <([^>]+)>', line)
-                        if unban_match:
-                            steamid = unban_match.group(1)
-                            if steamid not in unban_events:
-                                unban_events[steamid] = []
-                            unban_events[steamid].append(timestamp)
-                        
-                        expire_match = re.search(r'Ban time is up for: .+ \[([^\]]+)\]', line)
-                        if expire_match:
-                            steamid = expire_match.group(1)
-                            if steamid not in unban_events:
-                                unban_events[steamid] = []
-                            unban_events[steamid].append(timestamp)
-                    
-                    # Check for ban
-                    elif 'banned' in line and '||' in line:
-                        pattern = r'L (\d{2}/\d{2}/\d{4} - \d{2}:\d{2}:\d{2}): (.+?) <([^>]*)> banned (.+?) <([^>]+)> \|\| Reason: "([^"]*)" \|\| Ban Length: (.+)'
-                        match = re.match(pattern, line)
-                        if match:
-                            timestamp, admin, _, player, steamid, reason, duration = match.groups()
-                            
-                            # Parse timestamp to ISO format
-                            try:
-                                dt = datetime.strptime(timestamp, '%m/%d/%Y - %H:%M:%S')
-                                dt = dt.replace(tzinfo=timezone.utc)
-                                ban_date_iso = dt.isoformat()
-                            except:
-                                ban_date_iso = datetime.now(timezone.utc).isoformat()
-                            
-                            ban_data = {
-                                'id': f"{steamid.strip()}_{hash(timestamp)}",
-                                'player_nickname': player.strip(),
-                                'steamid': steamid.strip(),
-                                'ip': 'hidden',
-                                'reason': reason.strip() or 'No reason provided',
-                                'admin_name': admin.strip(),
-                                'duration': duration.strip(),
-                                'ban_date': ban_date_iso,
-                                'source': 'server',
-                                'is_expired': False,
-                                'expires_at': None
-                            }
-                            
-                            # Calculate expiry
-                            expires_at = calculate_expiry(ban_date_iso, duration.strip())
-                            ban_data['expires_at'] = expires_at
-                            
-                            # Check if already expired
-                            if expires_at:
-                                try:
-                                    expiry_dt = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-                                    if expiry_dt < datetime.now(timezone.utc):
-                                        ban_data['is_expired'] = True
-                                except:
-                                    pass
-                            
-                            if steamid.strip() not in all_bans:
-                                all_bans[steamid.strip()] = []
-                            all_bans[steamid.strip()].append(ban_data)
-        except Exception as e:
-            print(f"[ERROR] Failed to read {log_file}: {e}")
-    
-    # Process bans - mark expired ones based on unban events
-    final_bans = []
-    for steamid, bans in all_bans.items():
-        for ban in bans:
-            # Check if this ban was unbanned
-            if steamid in unban_events:
-                # If there's an unban after this ban, mark as expired
-                for unban_time in unban_events[steamid]:
-                    if unban_time and ban.get('ban_date'):
-                        try:
-                            unban_dt = datetime.strptime(unban_time, '%m/%d/%Y - %H:%M:%S')
-                            ban_dt = datetime.fromisoformat(ban['ban_date'].replace('Z', '+00:00')).replace(tzinfo=None)
-                            if unban_dt > ban_dt:
-                                ban['is_expired'] = True
-                                break
-                        except:
-                            pass
-            
-            final_bans.append(ban)
+    events = read_ban_events(f"{log_dir}/BAN_HISTORY_*.log", BAN_PARSE_WORKERS, BAN_CACHE_DIR)
+    parse_ban_events(events, all_bans, unban_events)
     
-    return final_bans
+    return reconcile_bans(all_bans, unban_events)
 
 
 def sync_players(db, players):
-    """Sync players to MongoDB"""
+    """Sync players to MongoDB - only writes players that changed since the last sync.
+    Returns (written, failed)."""
     if not players:
-        return 0
+        return 0, 0
     
-    # Clear and re-insert for clean data
-    db.players.delete_many({})
+    changes = player_diff.diff(players)
     
-    for p in players:
-        try:
-            db.players.insert_one(p)
-        except Exception as e:
-            print(f"[ERROR] Failed to insert player {p['nickname']}: {e}")
+    if player_diff.is_empty:
+        # First sync: rebuild the collection for clean data, swapped in at once
+        result = swap_in_collection(db, 'players', players, PLAYER_BATCH_SIZE)
+        errors = result.failed
+        written = 0 if errors else len(players)
+    else:
+        upserts = changes.inserted + changes.changed
+        operations = [ReplaceOne({'steamid': p['steamid']}, p, upsert=True) for p in upserts]
+        # Players that only moved in the table just get their new rank
+        operations += [UpdateOne({'steamid': steamid}, {'$set': {'rank': rank}})
+                       for steamid, rank in changes.reranked]
+        # Players dropped from csstats.dat
+        if changes.removed:
+            operations.append(DeleteMany({'steamid': {'$in': changes.removed}}))
+        
+        result = bulk_write_chunks(db.players, operations, PLAYER_BATCH_SIZE, "players")
+        errors = result.failed
+        written = result.written if errors else len(upserts) + len(changes.reranked) + len(changes.removed)
     
-    return len(players)
+    # Keep the old snapshot on errors so the next sync retries those players
+    if not errors:
+        player_diff.commit(changes)
+    
+    return written, errors
 
 
 def sync_bans(db, bans):
@@ -319,53 +316,104 @@ def sync_bans(db, bans):
     return synced
 
 
+def sync_new_ban_lines(db):
+    """Sync the ban log lines appended since the last checkpoint"""
+    events = ban_tailer.read_new_events()
+    
+    all_bans = {}
+    unban_events = {}
+    parse_ban_events(events, all_bans, unban_events)
+    bans = reconcile_bans(all_bans, unban_events)
+    b_count = sync_bans(db, bans)
+    errors = len(bans) - b_count
+    
+    # Unbans in the new lines also close bans synced by earlier runs
+    # ($ne: bans written by older realtime/simple syncs have no is_expired field)
+    for steamid, last_unban in unban_events.items():
+        try:
+            db.bans.update_many(
+                {'steamid': steamid, 'is_expired': {'$ne': True}, 'ban_date': {'$lt': format_time(last_unban)}},
+                {'$set': {'is_expired': True}}
+            )
+        except Exception as e:
+            errors += 1
+            print(f"[ERROR] Failed to expire bans for {steamid}: {e}")
+    
+    # Keep the old checkpoint on errors so the next sync re-reads these lines
+    if not errors:
+        ban_tailer.commit()
+    
+    return bans, b_count
+
+
+def ban_logs_changed():
+    """True if the ban logs need to be read. A missing checkpoint (first run,
+    or deleted to force a full resync) reads them even if they did not change."""
+    changed = ban_logs_gate.changed()
+    return changed or (ban_tailer.is_fresh and bool(ban_logs_gate.pending))
+
+
 def run_sync_once():
     """Run sync once"""
     print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Starting sync...")
     
-    client, db = get_db()
+    stats_changed = csstats_gate.changed()
+    bans_changed = ban_logs_changed()
+    if not stats_changed and not bans_changed:
+        print("  - No changes in stats file or ban logs")
+        return True
+    
+    db = mongo.get_db()
     if db is None:
         return False
     
-    players = parse_csstats(CSSTATS_FILE)
-    p_count = sync_players(db, players)
-    print(f"  ✓ Synced {p_count} players")
+    if stats_changed:
+        players = parse_csstats(CSSTATS_FILE)
+        p_count, p_failed = sync_players(db, players)
+        if p_failed:
+            print(f"  ✗ Synced {p_count} players, {p_failed} writes failed (retried next run)")
+        else:
+            print(f"  ✓ Synced {p_count} players ({len(players)} in stats file)")
+        # Only skip the stats file from now on if every write went through
+        if players and not p_failed:
+            csstats_gate.accept()
     
-    bans = parse_ban_logs(BAN_LOGS_DIR)
-    b_count = sync_bans(db, bans)
-    active_bans = len([b for b in bans if not b.get('is_expired')])
-    expired_bans = len([b for b in bans if b.get('is_expired')])
-    print(f"  ✓ Synced {b_count} bans ({active_bans} active, {expired_bans} expired)")
+    if bans_changed:
+        # A full resync also cleans up the copies left by the old hash() based ids
+        if ban_tailer.is_fresh:
+            run_dedupe_bans(db)
+        bans, b_count = sync_new_ban_lines(db)
+        active_bans = len([b for b in bans if not b.get('is_expired')])
+        expired_bans = len([b for b in bans if b.get('is_expired')])
+        print(f"  ✓ Synced {b_count} new bans ({active_bans} active, {expired_bans} expired)")
+        # Only skip the logs from now on if the checkpoint was committed
+        if ban_tailer.pending is None:
+            ban_logs_gate.accept()
     
-    client.close()
     return True
 
 
+def run_dedupe_bans(db):
+    """Collapse duplicate bans left by older versions of this script (and of
+    realtime/simple sync, whose bans a full resync writes again)"""
+    removed, renamed = dedupe_bans(db, PLAYER_BATCH_SIZE, drop_legacy=ban_tailer.is_fresh)
+    print(f"  ✓ Bans cleanup: removed {removed} duplicates, gave {renamed} bans a stable id")
+
+
 def run_continuous():
-    """Run sync continuously"""
-    print("="*50)
-    print("  ShadowZM Data Sync - Continuous Mode")
-    print("="*50)
-    print(f"  Stats: {CSSTATS_FILE}")
-    print(f"  Logs:  {BAN_LOGS_DIR}")
-    print(f"  Interval: {SYNC_INTERVAL}s")
-    print("="*50)
-    print("\nPress Ctrl+C to stop\n")
-    
-    while True:
-        try:
-            run_sync_once()
-            time.sleep(SYNC_INTERVAL)
-        except KeyboardInterrupt:
-            print("\nStopping...")
-            break
-        except Exception as e:
-            print(f"[ERROR] {e}")
-            time.sleep(SYNC_INTERVAL)
+    """Run sync continuously - the asyncio daemon in sync_daemon.py"""
+    import sync_daemon
+    sync_daemon.main()
 
 
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] in ['--continuous', '-c']:
         run_continuous()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--dedupe-bans':
+        db = mongo.get_db()
+        if db is not None:
+            run_dedupe_bans(db)
+        mongo.close()
     else:
         run_sync_once()
+        mongo.close()
@@ -0,0 +1,124 @@
+"""Tests for the duplicate bans cleanup (shadowzm_sync.ban_dedupe)"""
+
+import re
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+from shadowzm_sync.ban_dedupe import SYNC_ID_FILTER, dedupe_bans  # noqa: E402
+from shadowzm_sync.ban_log import ban_id  # noqa: E402
+
+
+class FakeBans:
+    """The bits of a pymongo collection dedupe_bans() uses"""
+
+    name = 'bans'
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.operations = []
+
+    def find(self, query, fields):
+        pattern = re.compile(query['id']['$regex'])
+        return [doc for doc in self.docs if pattern.search(doc['id'])]
+
+    def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+
+class FakeDb:
+    def __init__(self, docs):
+        self.bans = FakeBans(docs)
+
+
+BAN_DATE = '2024-01-02T10:00:00+00:00'
+LOG_TIME = '01/02/2024 - 10:00:00'
+
+
+def sync_ban(_id, ban_id_value, steamid="STEAM_0:1:100", is_expired=False):
+    return {'_id': _id, 'id': ban_id_value, 'steamid': steamid, 'ban_date': BAN_DATE,
+            'admin_name': 'Admin', 'is_expired': is_expired}
+
+
+def test_filter_matches_sync_ids_only():
+    pattern = re.compile(SYNC_ID_FILTER['id']['$regex'])
+    assert pattern.search("STEAM_0:1:100_-4823749823749")
+    assert pattern.search("STEAM_0:1:100_749823")
+    assert pattern.search(ban_id("STEAM_0:1:100", LOG_TIME, 'Admin'))
+    assert not pattern.search("0b8f6c9e-3c1d-4f7a-9e2b-1f4d5c6a7b8c")
+
+
+def test_duplicates_collapse_into_stable_id():
+    stable = ban_id("STEAM_0:1:100", LOG_TIME, 'Admin')
+    db = FakeDb([
+        sync_ban(1, "STEAM_0:1:100_-123456789"),
+        sync_ban(2, "STEAM_0:1:100_987654321", is_expired=True),
+        sync_ban(3, "STEAM_0:1:100_555"),
+    ])
+
+    assert dedupe_bans(db) == (2, 1)
+    assert db.bans.operations == [
+        pymongo.DeleteMany({'_id': {'$in': [2, 3]}}),
+        pymongo.UpdateOne({'_id': 1}, {'$set': {'id': stable, 'is_expired': True}}),
+    ]
+
+
+def test_copy_with_stable_id_is_kept():
+    stable = ban_id("STEAM_0:1:100", LOG_TIME, 'Admin')
+    db = FakeDb([sync_ban(1, "STEAM_0:1:100_-123456789"), sync_ban(2, stable)])
+
+    assert dedupe_bans(db) == (1, 0)
+    assert db.bans.operations == [pymongo.DeleteMany({'_id': {'$in': [1]}})]
+
+
+def test_uuid_bans_are_left_alone():
+    stable = ban_id("STEAM_0:1:100", LOG_TIME, 'Admin')
+    panel_ban = sync_ban(2, "0b8f6c9e-3c1d-4f7a-9e2b-1f4d5c6a7b8c")
+    db = FakeDb([sync_ban(1, stable), panel_ban])
+
+    assert dedupe_bans(db) == (0, 0)
+    assert db.bans.operations == []
+
+
+def test_legacy_short_ids_are_not_renamed():
+    # ban_date is the time of the old realtime/simple sync, not the log time
+    db = FakeDb([sync_ban(1, "STEAM_0:1:100_749823"), sync_ban(2, "STEAM_0:1:100_-123456789")])
+
+    assert dedupe_bans(db) == (0, 1)
+    assert db.bans.operations == [
+        pymongo.UpdateOne({'_id': 2}, {'$set': {'id': ban_id("STEAM_0:1:100", LOG_TIME, 'Admin')}}),
+    ]
+
+
+def test_legacy_short_ids_are_dropped_on_a_full_resync():
+    db = FakeDb([sync_ban(1, "STEAM_0:1:100_749823"), sync_ban(2, "STEAM_0:1:200_123456", steamid="STEAM_0:1:200")])
+
+    assert dedupe_bans(db, drop_legacy=True) == (2, 0)
+    assert db.bans.operations == [pymongo.DeleteMany({'_id': {'$in': [1, 2]}})]
+
+
+def test_digest_ids_are_never_renamed():
+    # Written by realtime --once with the sync time as ban_date: the id is right, the date is not
+    digest = ban_id("STEAM_0:1:100", '01/01/2024 - 08:00:00', 'Admin')
+    other = ban_id("STEAM_0:1:100", '01/01/2024 - 09:00:00', 'Admin')
+    db = FakeDb([sync_ban(1, "STEAM_0:1:100_-123456789"), sync_ban(2, digest), sync_ban(3, other)])
+
+    assert dedupe_bans(db) == (1, 0)
+    assert db.bans.operations == [pymongo.DeleteMany({'_id': {'$in': [1]}})]
+
+
+def test_decimal_hash_ids_are_not_taken_for_digests():
+    # A hash() id can have exactly 16 decimal digits, the shape of a digest
+    stable = ban_id("STEAM_0:1:100", LOG_TIME, 'Admin')
+    db = FakeDb([sync_ban(1, "STEAM_0:1:100_1234567890123456"), sync_ban(2, "STEAM_0:1:100_-123456789")])
+
+    assert dedupe_bans(db) == (1, 1)
+    assert db.bans.operations == [
+        pymongo.DeleteMany({'_id': {'$in': [2]}}),
+        pymongo.UpdateOne({'_id': 1}, {'$set': {'id': stable}}),
+    ]
+
+    db = FakeDb([sync_ban(1, "STEAM_0:1:100_1234567890123456"), sync_ban(2, stable)])
+    assert dedupe_bans(db) == (1, 0)
+    assert db.bans.operations == [pymongo.DeleteMany({'_id': {'$in': [1]}})]
@@ -0,0 +1,62 @@
+"""Tests for the BAN_HISTORY line tokenizer and times (shadowzm_sync.ban_log)"""
+
+from shadowzm_sync import (BAN, EXPIRE, UNBAN, ban_id, format_log_time, parse_log_time,
+                           tokenize_ban_line, tokenize_ban_lines)
+
+BAN_LINE = ('L 01/02/2024 - 10:00:00: Admin <STEAM_0:0:1> banned Bad Player <STEAM_0:1:100>'
+            ' || Reason: "wallhack" || Ban Length: 60 minutes')
+UNBAN_LINE = 'L 01/02/2024 - 11:00:00: Admin <STEAM_0:0:1> unbanned Bad Player <STEAM_0:1:100>'
+EXPIRE_LINE = 'L 01/02/2024 - 12:00:00: Ban time is up for: Bad Player [STEAM_0:1:100]'
+
+
+def test_ban_line():
+    assert tokenize_ban_line(BAN_LINE) == (
+        BAN, '01/02/2024 - 10:00:00', 'STEAM_0:1:100', 'Bad Player', 'Admin', 'wallhack', '60 minutes')
+
+
+def test_unban_line():
+    assert tokenize_ban_line(UNBAN_LINE) == (
+        UNBAN, '01/02/2024 - 11:00:00', 'STEAM_0:1:100', 'Bad Player', None, None, None)
+
+
+def test_expire_line():
+    assert tokenize_ban_line(EXPIRE_LINE) == (
+        EXPIRE, '01/02/2024 - 12:00:00', 'STEAM_0:1:100', 'Bad Player', None, None, None)
+
+
+def test_empty_reason():
+    line = BAN_LINE.replace('"wallhack"', '""')
+    assert tokenize_ban_line(line)[5] == ''
+
+
+def test_malformed_lines():
+    assert tokenize_ban_line('') is None
+    assert tokenize_ban_line('L 01/02/2024 - 10:00:00: "Player<1><STEAM_0:1:100><>" connected') is None
+    # The keyword is there but the rest of the line is not
+    assert tokenize_ban_line('L 01/02/2024 - 10:00:00: Admin unbanned nobody') is None
+    assert tokenize_ban_line(BAN_LINE.replace(' || Ban Length: 60 minutes', '')) is None
+    assert tokenize_ban_line('01/02/2024 - 10:00:00: Ban time is up for: Bad Player [STEAM_0:1:100]') is None
+    assert tokenize_ban_line(BAN_LINE.replace('L 01/02/2024', 'L 1/2/2024')) is None
+
+
+def test_tokenize_ban_lines_skips_other_lines():
+    lines = [BAN_LINE, 'L 01/02/2024 - 10:30:00: Server cvars start', UNBAN_LINE, EXPIRE_LINE]
+    assert [event[0] for event in tokenize_ban_lines(lines)] == [BAN, UNBAN, EXPIRE]
+
+
+def test_log_time_round_trip():
+    unix_time = parse_log_time('01/02/2024 - 10:00:00')
+    assert unix_time == 1704189600
+    assert format_log_time(unix_time) == '01/02/2024 - 10:00:00'
+    assert parse_log_time('01/02/2024 - 24:00:00') is None
+    assert parse_log_time('garbage') is None
+    assert parse_log_time(None) is None
+
+
+def test_ban_id_is_stable():
+    first = ban_id('STEAM_0:1:100', '01/02/2024 - 10:00:00', 'Admin')
+    assert first == ban_id('STEAM_0:1:100', '01/02/2024 - 10:00:00', 'Admin')
+    assert first.startswith('STEAM_0:1:100_') and len(first.split('_')[-1]) == 16
+    assert first != ban_id('STEAM_0:1:100', '01/02/2024 - 10:00:01', 'Admin')
+    assert ban_id('STEAM_0:1:100', '01/02/2024 - 10:00:00', None) == \
+        ban_id('STEAM_0:1:100', '01/02/2024 - 10:00:00', '')
@@ -0,0 +1,184 @@
+"""Tests for the BAN_HISTORY log tailer (shadowzm_sync.ban_tail)"""
+
+import os
+from concurrent.futures import Future
+
+from shadowzm_sync import BAN, UNBAN, BanLogTailer, ban_tail, read_ban_events
+
+
+def ban_line(clock, steamid, reason="cheat"):
+    return (f'L 01/02/2024 - {clock}: Admin <STEAM_0:0:1> banned Player <{steamid}>'
+            f' || Reason: "{reason}" || Ban Length: 60\n')
+
+
+def unban_line(clock, steamid):
+    return f'L 01/02/2024 - {clock}: Admin <STEAM_0:0:1> unbanned Player <{steamid}>\n'
+
+
+def make_tailer(tmp_path):
+    return BanLogTailer(str(tmp_path / "BAN_HISTORY_*.log"), str(tmp_path / "checkpoint.json"))
+
+
+def steamids(events):
+    return [event[2] for event in events]
+
+
+def test_reads_only_appended_lines(tmp_path):
+    log = tmp_path / "BAN_HISTORY_01.log"
+    log.write_text(ban_line("10:00:00", "STEAM_0:1:100"))
+    tailer = make_tailer(tmp_path)
+    assert tailer.is_fresh
+
+    assert steamids(tailer.read_new_events()) == ["STEAM_0:1:100"]
+    tailer.commit()
+    assert not tailer.is_fresh
+    assert tailer.read_new_events() == []
+
+    with open(log, "a") as f:
+        f.write(unban_line("10:05:00", "STEAM_0:1:100"))
+    events = tailer.read_new_events()
+    assert [(event[0], event[2]) for event in events] == [(UNBAN, "STEAM_0:1:100")]
+
+
+def test_uncommitted_read_is_repeated(tmp_path):
+    (tmp_path / "BAN_HISTORY_01.log").write_text(ban_line("10:00:00", "STEAM_0:1:100"))
+    tailer = make_tailer(tmp_path)
+
+    assert steamids(tailer.read_new_events()) == ["STEAM_0:1:100"]
+    # No commit(): the write failed, the same events come back
+    assert steamids(tailer.read_new_events()) == ["STEAM_0:1:100"]
+
+
+def test_partial_last_line_waits_for_newline(tmp_path):
+    log = tmp_path / "BAN_HISTORY_01.log"
+    full = ban_line("10:01:00", "STEAM_0:1:200")
+    log.write_text(ban_line("10:00:00", "STEAM_0:1:100") + full[:30])
+    tailer = make_tailer(tmp_path)
+
+    assert steamids(tailer.read_new_events()) == ["STEAM_0:1:100"]
+    tailer.commit()
+
+    with open(log, "a") as f:
+        f.write(full[30:])
+    events = tailer.read_new_events()
+    assert [(event[0], event[2], event[5]) for event in events] == [(BAN, "STEAM_0:1:200", "cheat")]
+
+
+def test_truncated_file_is_read_from_start(tmp_path):
+    log = tmp_path / "BAN_HISTORY_01.log"
+    log.write_text(ban_line("10:00:00", "STEAM_0:1:100") + ban_line("10:01:00", "STEAM_0:1:200"))
+    tailer = make_tailer(tmp_path)
+    tailer.read_new_events()
+    tailer.commit()
+
+    log.write_text(ban_line("11:00:00", "STEAM_0:1:300"))
+    assert steamids(tailer.read_new_events()) == ["STEAM_0:1:300"]
+
+
+def test_rewritten_file_is_read_from_start(tmp_path):
+    log = tmp_path / "BAN_HISTORY_01.log"
+    log.write_text(ban_line("10:00:00", "STEAM_0:1:100"))
+    tailer = make_tailer(tmp_path)
+    tailer.read_new_events()
+    tailer.commit()
+
+    # Same inode, longer than the checkpoint, but different first bytes
+    log.write_text(ban_line("11:00:00", "STEAM_0:1:300") + ban_line("11:01:00", "STEAM_0:1:400"))
+    assert steamids(tailer.read_new_events()) == ["STEAM_0:1:300", "STEAM_0:1:400"]
+
+
+def test_rotated_file_is_read_from_start(tmp_path):
+    log = tmp_path / "BAN_HISTORY_01.log"
+    log.write_text(ban_line("10:00:00", "STEAM_0:1:100"))
+    tailer = make_tailer(tmp_path)
+    tailer.read_new_events()
+    tailer.commit()
+
+    rotated = tmp_path / "rotated.tmp"
+    rotated.write_text(ban_line("10:00:00", "STEAM_0:1:100") + ban_line("12:00:00", "STEAM_0:1:500"))
+    os.replace(rotated, log)
+    assert steamids(tailer.read_new_events()) == ["STEAM_0:1:100", "STEAM_0:1:500"]
+
+
+def test_checkpoint_survives_restart(tmp_path):
+    log = tmp_path / "BAN_HISTORY_01.log"
+    log.write_text(ban_line("10:00:00", "STEAM_0:1:100"))
+    tailer = make_tailer(tmp_path)
+    tailer.read_new_events()
+    tailer.commit()
+
+    with open(log, "a") as f:
+        f.write(ban_line("10:01:00", "STEAM_0:1:200"))
+    restarted = make_tailer(tmp_path)
+    assert not restarted.is_fresh
+    assert steamids(restarted.read_new_events()) == ["STEAM_0:1:200"]
+
+
+def test_events_from_several_files_are_in_time_order(tmp_path):
+    (tmp_path / "BAN_HISTORY_01.log").write_text(
+        ban_line("10:00:00", "STEAM_0:1:100") + ban_line("12:00:00", "STEAM_0:1:300"))
+    (tmp_path / "BAN_HISTORY_02.log").write_text(ban_line("11:00:00", "STEAM_0:1:200"))
+    tailer = make_tailer(tmp_path)
+
+    assert steamids(tailer.read_new_events()) == ["STEAM_0:1:100", "STEAM_0:1:200", "STEAM_0:1:300"]
+
+
+def test_reset_reads_everything_again(tmp_path):
+    (tmp_path / "BAN_HISTORY_01.log").write_text(ban_line("10:00:00", "STEAM_0:1:100"))
+    tailer = make_tailer(tmp_path)
+    tailer.read_new_events()
+    tailer.commit()
+
+    tailer.reset()
+    assert tailer.is_fresh
+    assert steamids(tailer.read_new_events()) == ["STEAM_0:1:100"]
+
+
+def test_parallel_read_matches_serial_read(tmp_path):
+    for day in range(1, 4):
+        (tmp_path / f"BAN_HISTORY_0{day}.log").write_text(
+            ban_line(f"1{day}:00:00", f"STEAM_0:1:{day}00") + unban_line(f"1{day}:30:00", f"STEAM_0:1:{day}00"))
+    os.utime(tmp_path / "BAN_HISTORY_03.log")
+    pattern = str(tmp_path / "BAN_HISTORY_*.log")
+
+    assert read_ban_events(pattern, workers=2) == read_ban_events(pattern)
+
+
+class RecordingPool:
+    """Runs each job when its result is asked for, and records the order"""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def submit(self, func, *args):
+        future = Future()
+        original = future.result
+
+        def result(timeout=None):
+            self.calls.append(("pool", os.path.basename(args[0])))
+            future.set_result(func(*args))
+            return original()
+        future.result = result
+        return future
+
+    def shutdown(self):
+        pass
+
+
+def test_live_file_is_read_before_waiting_for_the_pool(tmp_path, monkeypatch):
+    for day in range(1, 4):
+        (tmp_path / f"BAN_HISTORY_0{day}.log").write_text(ban_line(f"1{day}:00:00", f"STEAM_0:1:{day}00"))
+    os.utime(tmp_path / "BAN_HISTORY_03.log")
+
+    calls = []
+    monkeypatch.setattr(ban_tail, "ProcessPoolExecutor", lambda *args, **kwargs: RecordingPool(calls))
+    tail = ban_tail.tail_log_file
+    monkeypatch.setattr(ban_tail, "tail_log_file",
+                        lambda path, checkpoint: calls.append(("live", os.path.basename(path))) or tail(path, checkpoint))
+
+    paths = sorted(str(path) for path in tmp_path.glob("BAN_HISTORY_*.log"))
+    _, events = ban_tail.tail_log_files(paths, {}, workers=2)
+    # (the pool jobs read their files through tail_log_file() too)
+    assert calls[0] == ("live", "BAN_HISTORY_03.log")
+    assert [call for call in calls if call[0] == "pool"] == [("pool", "BAN_HISTORY_01.log"), ("pool", "BAN_HISTORY_02.log")]
+    assert steamids(events) == ["STEAM_0:1:100", "STEAM_0:1:200", "STEAM_0:1:300"]
@@ -0,0 +1,106 @@
+"""Tests for the csstats.dat decoder (shadowzm_sync.csstats)"""
+
+import struct
+
+from shadowzm_sync import decode_csstats, read_csstats, scan_records
+from shadowzm_sync.csstats import STATS_SIZE
+
+
+def record(name, steamid, tks=0, damage=0, deaths=0, kills=0, shots=0, hits=0, headshots=0):
+    data = b''
+    for text in (name, steamid):
+        raw = text.encode('utf-8') + b'\x00'
+        data += struct.pack('<H', len(raw)) + raw
+    return data + struct.pack('<7i', tks, damage, deaths, kills, shots, hits, headshots)
+
+
+def stats_file(*records, version=11):
+    return struct.pack('<H', version) + b''.join(records)
+
+
+def test_decodes_every_record():
+    data = stats_file(
+        record("Player", "STEAM_0:1:100", deaths=3, kills=10, headshots=4),
+        record("Ünïcode", "STEAM_0:0:200", tks=1, damage=500, deaths=7, kills=2, shots=90, hits=40),
+    )
+    stats = decode_csstats(data)
+
+    assert stats.version == 11
+    assert stats.nickname == ["Player", "Ünïcode"]
+    assert stats.steamid == ["STEAM_0:1:100", "STEAM_0:0:200"]
+    assert list(stats.kills) == [10, 2]
+    assert list(stats.deaths) == [3, 7]
+    assert list(stats.headshots) == [4, 0]
+    assert list(stats.tks) == [0, 1]
+    assert list(stats.damage) == [0, 500]
+    assert list(stats.shots) == [0, 90]
+    assert list(stats.hits) == [0, 40]
+
+
+def test_negative_stats_are_signed():
+    stats = decode_csstats(stats_file(record("Player", "STEAM_0:1:100", kills=-5)))
+    assert list(stats.kills) == [-5]
+
+
+def test_truncated_record_is_dropped():
+    data = stats_file(record("First", "STEAM_0:1:100", kills=1), record("Second", "STEAM_0:1:200", kills=2))
+    stats = decode_csstats(data[:-10])
+
+    assert stats.steamid == ["STEAM_0:1:100"]
+    assert list(stats.kills) == [1]
+
+
+def test_allow_partial_keeps_a_cut_short_stats_block():
+    data = stats_file(record("First", "STEAM_0:1:100", kills=1),
+                      record("Second", "STEAM_0:1:200", tks=9, damage=8, deaths=7, kills=6, shots=5))
+    # Keep tks, damage, deaths, kills and half of shots
+    cut = data[:-STATS_SIZE + 18]
+
+    table = scan_records(cut, allow_partial=True)
+    assert len(table.stats_off) == 2
+    assert table.partial_len == 4
+
+    stats = decode_csstats(cut, allow_partial=True)
+    assert stats.steamid == ["STEAM_0:1:100", "STEAM_0:1:200"]
+    assert list(stats.kills) == [1, 6]
+    assert list(stats.deaths) == [0, 7]
+    # Missing ints stay 0
+    assert list(stats.shots) == [0, 0]
+    assert list(stats.headshots) == [0, 0]
+
+
+def test_bad_string_length_stops_the_scan():
+    data = stats_file(record("First", "STEAM_0:1:100", kills=1)) + struct.pack('<H', 0) + b'\x00' * 40
+    stats = decode_csstats(data)
+    assert stats.steamid == ["STEAM_0:1:100"]
+
+
+def test_short_buffer_is_empty():
+    stats = decode_csstats(b'\x0b\x00')
+    assert stats.version is None
+    assert stats.nickname == () and stats.kills == ()
+
+
+def test_read_csstats(tmp_path):
+    path = tmp_path / "csstats.dat"
+    assert read_csstats(str(path)) is None
+
+    path.write_bytes(stats_file(record("Player", "STEAM_0:1:100", kills=10)))
+    stats = read_csstats(str(path))
+    assert stats.steamid == ["STEAM_0:1:100"]
+    assert list(stats.kills) == [10]
+
+
+def test_mmap_read_matches_plain_read(tmp_path):
+    path = tmp_path / "csstats.dat"
+    path.write_bytes(stats_file(record("Player", "STEAM_0:1:100", kills=10),
+                                record("Ünïcode", "STEAM_0:0:200", deaths=3)))
+
+    assert read_csstats(str(path), use_mmap=True) == read_csstats(str(path))
+
+
+def test_mmap_of_a_tiny_file_reads_it(tmp_path):
+    path = tmp_path / "csstats.dat"
+    path.write_bytes(b'\x0b\x00')
+    # mmap needs a non-empty mapping, short files take the plain read
+    assert read_csstats(str(path), use_mmap=True).version is None
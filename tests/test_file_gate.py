@@ -0,0 +1,123 @@
+"""Tests for the skip-if-unchanged gate (shadowzm_sync.file_gate)"""
+
+import os
+
+from shadowzm_sync import FileGate
+
+
+def test_unchanged_file_is_skipped(tmp_path):
+    path = tmp_path / "csstats.dat"
+    path.write_bytes(b"a" * 100)
+    gate = FileGate(str(path))
+
+    assert gate.changed()
+    gate.accept()
+    assert not gate.changed()
+
+    path.write_bytes(b"b" * 200)
+    assert gate.changed()
+
+
+def test_not_accepted_change_is_reported_again(tmp_path):
+    path = tmp_path / "csstats.dat"
+    path.write_bytes(b"a" * 100)
+    gate = FileGate(str(path))
+    gate.changed()
+    gate.accept()
+
+    path.write_bytes(b"b" * 200)
+    assert gate.changed()
+    # The sync failed, no accept()
+    assert gate.changed()
+
+
+def test_same_stat_rewrite_is_caught_by_checksum(tmp_path):
+    path = tmp_path / "csstats.dat"
+    path.write_bytes(b"a" * 100)
+    gate = FileGate(str(path))
+    gate.changed()
+    gate.accept()
+
+    # Written again within the same mtime tick: size, mtime and inode match
+    st = os.stat(path)
+    with open(path, 'r+b') as f:
+        f.write(b"b" * 100)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert gate.changed()
+
+
+def test_pattern_notices_new_and_removed_files(tmp_path):
+    first = tmp_path / "BAN_HISTORY_01.log"
+    first.write_text("line\n")
+    gate = FileGate(str(tmp_path / "BAN_HISTORY_*.log"), pattern=True)
+    gate.changed()
+    gate.accept()
+
+    second = tmp_path / "BAN_HISTORY_02.log"
+    second.write_text("line\n")
+    assert gate.changed()
+    gate.accept()
+    assert not gate.changed()
+
+    first.unlink()
+    assert gate.changed()
+
+
+def test_reset_forces_a_read(tmp_path):
+    path = tmp_path / "csstats.dat"
+    path.write_bytes(b"a")
+    gate = FileGate(str(path))
+    gate.changed()
+    gate.accept()
+
+    gate.reset()
+    assert gate.changed()
+
+
+def test_state_file_survives_a_restart(tmp_path):
+    path = tmp_path / "csstats.dat"
+    path.write_bytes(b"a" * 100)
+    state_file = str(tmp_path / "csstats_gate.json")
+    gate = FileGate(str(path), state_file=state_file)
+    gate.changed()
+    gate.accept()
+
+    # A new process (e.g. the next cron run) loads the accepted state
+    assert not FileGate(str(path), state_file=state_file).changed()
+
+    path.write_bytes(b"b" * 200)
+    assert FileGate(str(path), state_file=state_file).changed()
+
+
+def test_state_file_of_another_path_is_ignored(tmp_path):
+    first = tmp_path / "first.dat"
+    second = tmp_path / "second.dat"
+    first.write_bytes(b"a")
+    second.write_bytes(b"a")
+    state_file = str(tmp_path / "gate.json")
+    gate = FileGate(str(first), state_file=state_file)
+    gate.changed()
+    gate.accept()
+
+    assert FileGate(str(second), state_file=state_file).changed()
+
+
+def test_reset_is_saved(tmp_path):
+    path = tmp_path / "csstats.dat"
+    path.write_bytes(b"a")
+    state_file = str(tmp_path / "csstats_gate.json")
+    gate = FileGate(str(path), state_file=state_file)
+    gate.changed()
+    gate.accept()
+
+    gate.reset()
+    assert FileGate(str(path), state_file=state_file).changed()
+
+
+def test_corrupt_state_file_reads_again(tmp_path):
+    path = tmp_path / "csstats.dat"
+    path.write_bytes(b"a")
+    state_file = tmp_path / "csstats_gate.json"
+    state_file.write_text("{not json")
+
+    assert FileGate(str(path), state_file=str(state_file)).changed()
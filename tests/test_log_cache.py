@@ -0,0 +1,84 @@
+"""Tests for the parsed ban log cache (shadowzm_sync.log_cache)"""
+
+import os
+
+from shadowzm_sync import log_cache
+from shadowzm_sync.ban_tail import read_ban_events
+
+BAN_LINE = ('L 01/02/2024 - 10:00:00: Admin <STEAM_0:0:1> banned Player <STEAM_0:1:100>'
+            ' || Reason: "cheat" || Ban Length: 60\n')
+EVENTS = [('ban', '01/02/2024 - 10:00:00', 'STEAM_0:1:100', 'Player', 'Admin', 'cheat', '60')]
+
+
+def cached_log(tmp_path):
+    path = tmp_path / "BAN_HISTORY_01.log"
+    path.write_text(BAN_LINE)
+    cache_dir = str(tmp_path / "cache")
+    log_cache.store_events(cache_dir, str(path), log_cache.file_identity(str(path)), EVENTS, [1, 2, 3])
+    return path, cache_dir
+
+
+def test_store_and_load(tmp_path):
+    path, cache_dir = cached_log(tmp_path)
+    assert log_cache.load_events(cache_dir, str(path)) == (EVENTS, [1, 2, 3])
+
+
+def test_changed_file_misses(tmp_path):
+    path, cache_dir = cached_log(tmp_path)
+    with open(path, "a") as f:
+        f.write(BAN_LINE)
+    assert log_cache.load_events(cache_dir, str(path)) is None
+
+
+def test_missing_file_or_entry_misses(tmp_path):
+    path = tmp_path / "BAN_HISTORY_01.log"
+    cache_dir = str(tmp_path / "cache")
+    assert log_cache.load_events(cache_dir, str(path)) is None
+    path.write_text(BAN_LINE)
+    assert log_cache.load_events(cache_dir, str(path)) is None
+
+
+def test_corrupt_entry_misses(tmp_path):
+    path, cache_dir = cached_log(tmp_path)
+    for name in os.listdir(cache_dir):
+        with open(os.path.join(cache_dir, name), "wb") as f:
+            f.write(b"not marshal")
+    assert log_cache.load_events(cache_dir, str(path)) is None
+
+
+def test_file_written_while_parsing_is_not_stored(tmp_path):
+    path = tmp_path / "BAN_HISTORY_01.log"
+    path.write_text(BAN_LINE)
+    cache_dir = str(tmp_path / "cache")
+    identity = log_cache.file_identity(str(path))
+    with open(path, "a") as f:
+        f.write(BAN_LINE)
+
+    log_cache.store_events(cache_dir, str(path), identity, EVENTS, [1, 2, 3])
+    assert log_cache.load_events(cache_dir, str(path)) is None
+
+
+def test_prune_removes_entries_of_gone_files(tmp_path):
+    path, cache_dir = cached_log(tmp_path)
+    log_cache.prune(cache_dir, [str(path)])
+    assert log_cache.load_events(cache_dir, str(path)) is not None
+
+    log_cache.prune(cache_dir, [])
+    assert os.listdir(cache_dir) == []
+
+
+def test_sealed_logs_are_served_from_the_cache(tmp_path):
+    sealed = tmp_path / "BAN_HISTORY_01.log"
+    sealed.write_text(BAN_LINE)
+    live = tmp_path / "BAN_HISTORY_02.log"
+    live.write_text(BAN_LINE.replace("10:00:00", "11:00:00").replace("STEAM_0:1:100", "STEAM_0:1:200"))
+    os.utime(sealed, ns=(0, 0))
+    pattern = str(tmp_path / "BAN_HISTORY_*.log")
+    cache_dir = str(tmp_path / "cache")
+
+    events = read_ban_events(pattern, cache_dir=cache_dir)
+    assert [event[2] for event in events] == ["STEAM_0:1:100", "STEAM_0:1:200"]
+    # Only the sealed file was cached, the live one keeps growing
+    assert len(os.listdir(cache_dir)) == 1
+    assert log_cache.load_events(cache_dir, str(sealed))[0] == [events[0]]
+    assert read_ban_events(pattern, cache_dir=cache_dir) == events
@@ -0,0 +1,60 @@
+"""Tests for the incremental player diff (shadowzm_sync.player_diff)"""
+
+from shadowzm_sync import PlayerDiff
+
+
+def player(steamid, kills, last_seen='2024-01-02T10:00:00'):
+    return {'steamid': steamid, 'kills': kills, 'last_seen': last_seen}
+
+
+def test_first_diff_inserts_everything():
+    diff = PlayerDiff()
+    assert diff.is_empty
+
+    changes = diff.diff([player("A", 1), player("B", 2)])
+    assert [p['steamid'] for p in changes.inserted] == ["A", "B"]
+    assert changes.changed == [] and changes.removed == []
+
+
+def test_diff_after_commit():
+    diff = PlayerDiff()
+    diff.commit(diff.diff([player("A", 1), player("B", 2), player("C", 3)]))
+    assert not diff.is_empty
+
+    changes = diff.diff([player("A", 1, last_seen='2024-01-03T10:00:00'), player("B", 5), player("D", 1)])
+    assert [p['steamid'] for p in changes.inserted] == ["D"]
+    # last_seen alone does not count as a change
+    assert [p['steamid'] for p in changes.changed] == ["B"]
+    assert changes.removed == ["C"]
+
+
+def test_uncommitted_diff_is_repeated():
+    diff = PlayerDiff()
+    diff.commit(diff.diff([player("A", 1)]))
+
+    first = diff.diff([player("A", 2)])
+    # The write failed, no commit(): the next sync sends the change again
+    second = diff.diff([player("A", 2)])
+    assert first.changed == second.changed == [player("A", 2)]
+
+
+def test_reset_writes_everything_again():
+    diff = PlayerDiff()
+    diff.commit(diff.diff([player("A", 1)]))
+
+    diff.reset()
+    assert diff.is_empty
+    assert diff.diff([player("A", 1)]).inserted == [player("A", 1)]
+
+
+def test_climbing_player_only_reranks_the_others():
+    diff = PlayerDiff()
+    table = [dict(player(steamid, kills), rank=rank)
+             for rank, (steamid, kills) in enumerate([("A", 30), ("B", 20), ("C", 10)], 1)]
+    diff.commit(diff.diff(table))
+
+    # C gets 25 kills and passes B
+    changes = diff.diff([dict(player("A", 30), rank=1), dict(player("C", 35), rank=2), dict(player("B", 20), rank=3)])
+    assert [p['steamid'] for p in changes.changed] == ["C"]
+    assert changes.reranked == [("B", 3)]
+    assert changes.inserted == [] and changes.removed == []
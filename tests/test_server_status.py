@@ -0,0 +1,131 @@
+"""Tests for the game server status polling (backend/server.py)"""
+
+import asyncio
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+
+for module in ("fastapi", "httpx", "motor", "a2s", "jwt", "passlib", "dotenv", "email_validator"):
+    pytest.importorskip(module)
+
+SERVER_FILE = Path(__file__).resolve().parents[1] / "backend" / "server.py"
+
+
+def load_server():
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "shadowzm_test")
+    spec = importlib.util.spec_from_file_location("backend_server", SERVER_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+server = load_server()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(server.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = server.CircuitBreaker("test", failure_threshold=3, probe_interval=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = server.CircuitBreaker("test", failure_threshold=2, probe_interval=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_one_probe_after_the_interval(clock):
+    breaker = server.CircuitBreaker("test", failure_threshold=1, probe_interval=60)
+    breaker.record_failure()
+
+    clock.now += 59
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == "half-open"
+    # Only the probe goes through while it runs
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_opens_again(clock):
+    breaker = server.CircuitBreaker("test", failure_threshold=3, probe_interval=60)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 30
+    assert not breaker.allow()
+
+
+def test_open_breaker_skips_the_query(clock, monkeypatch):
+    server_config = server.CS_SERVERS[0]
+    breaker = server.CircuitBreaker("test", failure_threshold=1, probe_interval=60)
+    breaker.record_failure()
+    monkeypatch.setitem(server.server_breakers, server_config["id"], breaker)
+
+    async def no_query(*args, **kwargs):
+        raise AssertionError("queried a server whose circuit is open")
+    monkeypatch.setattr(server.a2s, "ainfo", no_query)
+    monkeypatch.setattr(server.a2s, "aplayers", no_query)
+
+    status = asyncio.run(server.query_cs_server(server_config))
+    assert status == server.offline_status(server_config)
+
+
+def test_cs_servers_default():
+    servers = server.load_cs_servers(None)
+    assert [s["id"] for s in servers] == ["zr"]
+    assert server.load_cs_servers("[]") == servers
+
+
+def test_cs_servers_from_json():
+    servers = server.load_cs_servers('[{"id": "zr", "name": "ZR", "ip": "127.0.0.1", "port": 27015, "timeout": 2},'
+                                     ' {"id": "dm", "name": "DM", "ip": "127.0.0.1", "port": 27016}]')
+    assert [s["id"] for s in servers] == ["zr", "dm"]
+
+
+@pytest.mark.parametrize("value, message", [
+    ('{"id": "zr"}', "must be a JSON list"),
+    ('[{"id": "zr", "name": "ZR", "ip": "127.0.0.1"', "not valid JSON"),
+    ('["zr"]', "entry 0 must be an object"),
+    ('[{"name": "ZR", "ip": "127.0.0.1", "port": 27015}]', "entry 0 is missing id"),
+    ('[{"id": "zr", "name": "ZR", "ip": "127.0.0.1", "port": "27015"}]', "port must be a number"),
+    ('[{"id": "zr", "name": "ZR", "ip": "127.0.0.1", "port": 27015},'
+     ' {"id": "zr", "name": "ZR 2", "ip": "127.0.0.1", "port": 27016}]', "more than one server with id 'zr'"),
+])
+def test_bad_cs_servers_are_rejected(value, message):
+    with pytest.raises(ValueError, match=message):
+        server.load_cs_servers(value)
@@ -0,0 +1,98 @@
+"""Tests for the webhook outbox (shadowzm_sync.spool)"""
+
+import pytest
+
+from shadowzm_sync.spool import WebhookSpool
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = WebhookSpool(str(tmp_path / "webhook_spool.db"))
+    yield spool
+    spool.close()
+
+
+def deliver_all(rows):
+    return [True] * len(rows)
+
+
+def test_same_key_is_replaced(spool):
+    spool.put_many('bans', [("STEAM_0:1:100|cheat", {'steamid': "STEAM_0:1:100", 'v': 1})])
+    spool.put_many('bans', [("STEAM_0:1:100|cheat", {'steamid': "STEAM_0:1:100", 'v': 2})])
+    assert spool.count('bans') == 1
+
+    sent = []
+    assert spool.drain('bans', lambda rows: sent.extend(rows) or deliver_all(rows)) == (1, 0)
+    assert sent == [{'steamid': "STEAM_0:1:100", 'v': 2}]
+
+
+def test_kinds_are_separate(spool):
+    spool.put_many('bans', [("1", {'kind': 'ban'})])
+    spool.put_many('players', [("1", {'kind': 'player'})])
+    assert spool.count('bans') == 1
+    assert spool.count('players') == 1
+
+    assert spool.drain('players', deliver_all) == (1, 0)
+    assert spool.count('bans') == 1
+
+
+def test_drain_sends_oldest_first_in_batches(spool):
+    spool.put_many('players', [(str(n), {'n': n}) for n in range(5)])
+    # Queued again: moves behind the others
+    spool.put_many('players', [("0", {'n': 0})])
+
+    batches = []
+
+    def send(rows):
+        batches.append([row['n'] for row in rows])
+        return deliver_all(rows)
+
+    assert spool.drain('players', send, batch_size=2) == (5, 0)
+    assert batches == [[1, 2], [3, 4], [0]]
+
+
+def test_drain_stops_at_undelivered_batch(spool):
+    spool.put_many('players', [(str(n), {'n': n}) for n in range(4)])
+    rejected = {1}
+    batches = []
+
+    def send(rows):
+        batches.append([row['n'] for row in rows])
+        return [row['n'] not in rejected for row in rows]
+
+    assert spool.drain('players', send, batch_size=2) == (1, 3)
+    assert batches == [[0, 1]]
+
+    # The website is back: the undelivered row is sent first
+    rejected.clear()
+    batches.clear()
+    assert spool.drain('players', send) == (3, 0)
+    assert batches == [[1, 2, 3]]
+
+
+def test_queue_survives_reopen(tmp_path):
+    path = str(tmp_path / "webhook_spool.db")
+    spool = WebhookSpool(path)
+    spool.put_many('bans', [("a", {'id': 'a'})])
+    spool.close()
+
+    spool = WebhookSpool(path)
+    try:
+        assert spool.keys('bans') == {"a"}
+    finally:
+        spool.close()
+
+
+def test_keys_and_discard(spool):
+    spool.put_many('bans', [("a", {'id': 'a'}), ("b", {'id': 'b'}), ("c", {'id': 'c'})])
+    spool.put_many('players', [("a", {'id': 'a'})])
+    assert spool.keys('bans') == {"a", "b", "c"}
+
+    # A ban lifted while it was queued must not be sent
+    spool.discard('bans', spool.keys('bans') - {"a", "c"})
+    assert spool.keys('bans') == {"a", "c"}
+    assert spool.keys('players') == {"a"}
+
+    sent = []
+    spool.drain('bans', lambda rows: sent.extend(rows) or deliver_all(rows))
+    assert sorted(row['id'] for row in sent) == ["a", "c"]
@@ -0,0 +1,115 @@
+"""Tests for the staging collection swap (shadowzm_sync.staging)"""
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+from pymongo.errors import BulkWriteError, OperationFailure  # noqa: E402
+
+from shadowzm_sync.staging import swap_in_collection  # noqa: E402
+
+
+class FakeCollection:
+    """The bits of a pymongo collection swap_in_collection() uses"""
+
+    def __init__(self, db, name, docs=(), indexes=None):
+        self.db = db
+        self.name = name
+        self.docs = list(docs)
+        self.indexes = indexes or {'_id_': {'key': [('_id', 1)], 'v': 2}}
+        self.fail_inserts = False
+        self.fail_indexes = False
+
+    def drop(self):
+        self.docs = []
+        self.indexes = {'_id_': {'key': [('_id', 1)], 'v': 2}}
+        self.db.collections.pop(self.name, None)
+
+    def delete_many(self, query):
+        self.docs = []
+
+    def bulk_write(self, operations, ordered=True):
+        if self.fail_inserts:
+            raise BulkWriteError({'writeErrors': [{'errmsg': 'E11000'}] * len(operations)})
+        # Writing to a dropped collection creates it again
+        self.db.collections[self.name] = self
+        self.docs.extend(operation._doc for operation in operations)
+
+    def index_information(self):
+        return self.indexes
+
+    def create_indexes(self, models):
+        if self.fail_indexes:
+            raise OperationFailure("E11000 duplicate key error")
+        for model in models:
+            self.indexes[model.document['name']] = model.document
+
+    def rename(self, name, dropTarget=False):
+        assert dropTarget
+        del self.db.collections[self.name]
+        self.name = name
+        self.db.collections[name] = self
+
+
+class FakeDb:
+    def __init__(self):
+        self.collections = {}
+        self.fail_staging_inserts = False
+        self.fail_staging_indexes = False
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            collection = FakeCollection(self, name)
+            collection.fail_inserts = name.endswith('_staging') and self.fail_staging_inserts
+            collection.fail_indexes = name.endswith('_staging') and self.fail_staging_indexes
+            self.collections[name] = collection
+        return self.collections[name]
+
+
+@pytest.fixture
+def db():
+    db = FakeDb()
+    live = db['bans']
+    live.docs = [{'id': 'old'}]
+    live.indexes['webhook_key'] = {'key': [('webhook_key', 1)], 'v': 2, 'unique': True}
+    return db
+
+
+def test_swap_replaces_the_live_collection(db):
+    result = swap_in_collection(db, 'bans', [{'id': 'a'}, {'id': 'b'}], chunk_size=1)
+
+    assert (result.written, result.failed) == (2, 0)
+    assert db['bans'].docs == [{'id': 'a'}, {'id': 'b'}]
+    assert 'bans_staging' not in db.collections
+
+
+def test_swap_keeps_the_live_indexes(db):
+    swap_in_collection(db, 'bans', [{'id': 'a'}])
+
+    indexes = db['bans'].indexes
+    assert indexes['webhook_key']['unique'] is True
+    # Plus the ones the website queries, named by MongoDB's default
+    assert {'id_1', 'steamid_1', 'ban_date_-1'} <= set(indexes)
+
+
+def test_failed_load_keeps_the_old_collection(db):
+    db.fail_staging_inserts = True
+    result = swap_in_collection(db, 'bans', [{'id': 'a'}])
+
+    assert result.failed == 1
+    assert db['bans'].docs == [{'id': 'old'}]
+    assert 'bans_staging' not in db.collections
+
+
+def test_failed_index_build_keeps_the_old_collection(db):
+    db.fail_staging_indexes = True
+    result = swap_in_collection(db, 'bans', [{'id': 'a'}])
+
+    assert (result.written, result.failed) == (0, 1)
+    assert db['bans'].docs == [{'id': 'old'}]
+    assert 'bans_staging' not in db.collections
+
+
+def test_empty_refresh_clears_the_collection(db):
+    swap_in_collection(db, 'bans', [])
+    assert db['bans'].docs == []
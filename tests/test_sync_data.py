@@ -0,0 +1,65 @@
+"""Tests for the one-shot sync (sync_data.py)"""
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+import sync_data  # noqa: E402
+from shadowzm_sync.bulk import BulkResult  # noqa: E402
+from tests.test_csstats import record, stats_file  # noqa: E402
+
+
+class FakeBans:
+    def find(self, query, fields):
+        return []
+
+
+class FakeDb:
+    bans = FakeBans()
+
+
+@pytest.fixture
+def sync(tmp_path, monkeypatch):
+    csstats = tmp_path / "csstats.dat"
+    csstats.write_bytes(stats_file(record("Player", "STEAM_0:1:100", kills=10)))
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    sync_data.configure(CSSTATS_FILE=str(csstats), BAN_LOGS_DIR=str(logs),
+                        BAN_CHECKPOINT_FILE=str(tmp_path / "ban_log_checkpoint.json"), BAN_CACHE_DIR=None)
+    # Every MongoConnection init_state() builds hands out the fake
+    monkeypatch.setattr(sync_data.MongoConnection, "get_db", lambda self: FakeDb())
+    return sync_data
+
+
+def swap_result(result):
+    return lambda db, name, documents, chunk_size=1000: result
+
+
+def test_failed_player_write_is_retried_next_run(sync, monkeypatch, capsys):
+    monkeypatch.setattr(sync_data, "swap_in_collection", swap_result(BulkResult(0, 1, [0.0])))
+    assert sync.run_sync_once()
+    assert "1 writes failed" in capsys.readouterr().out
+
+    # The next run (a new process: fresh diff, gate loaded from its state file)
+    sync.init_state()
+    monkeypatch.setattr(sync_data, "swap_in_collection", swap_result(BulkResult(1, 0, [0.0])))
+    assert sync.run_sync_once()
+    assert "✓ Synced 1 players" in capsys.readouterr().out
+
+    # Written now, so the run after that skips the stats file
+    sync.init_state()
+    assert not sync.csstats_gate.changed()
+
+
+def test_reset_state_syncs_everything_again(sync, monkeypatch):
+    monkeypatch.setattr(sync_data, "swap_in_collection", swap_result(BulkResult(1, 0, [0.0])))
+    assert sync.run_sync_once()
+    sync.init_state()
+    assert not sync.csstats_gate.changed()
+
+    # After the database was cleared
+    sync.reset_state()
+    sync.init_state()
+    assert sync.csstats_gate.changed()
+    assert sync.ban_logs_changed()
+    assert sync.ban_tailer.is_fresh
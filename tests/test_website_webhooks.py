@@ -0,0 +1,249 @@
+"""Tests for the website's batch webhooks (website1-main/backend/server.py)"""
+
+import asyncio
+import gzip
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+for module in ("fastapi", "httpx", "motor", "a2s", "jwt", "passlib", "dotenv", "email_validator"):
+    pytest.importorskip(module)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from pymongo.errors import BulkWriteError, DuplicateKeyError  # noqa: E402
+
+SERVER_FILE = Path(__file__).resolve().parents[1] / "website1-main" / "backend" / "server.py"
+
+
+def load_server():
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "shadowzm_test")
+    spec = importlib.util.spec_from_file_location("website_server", SERVER_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+server = load_server()
+
+
+class FakeResult:
+    def __init__(self, upserted_count=0, modified_count=0):
+        self.upserted_count = upserted_count
+        self.modified_count = modified_count
+
+
+class FakeCollection:
+    """Records the bulk writes a webhook sends; error is raised instead when set"""
+
+    def __init__(self):
+        self.operations = []
+        self.error = None
+
+    async def bulk_write(self, operations, ordered=True):
+        assert not ordered
+        self.operations.extend(operations)
+        if self.error is not None:
+            raise self.error
+        return FakeResult(upserted_count=len(operations))
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.operations.append((query, update))
+        if self.error is not None:
+            raise self.error
+        return None
+
+    async def find_one(self, query):
+        self.operations.append(query)
+        return {"id": "existing-ban", **query}
+
+    async def drop_index(self, name):
+        self.operations.append(("drop_index", name))
+
+    async def create_index(self, keys, **options):
+        self.operations.append(("create_index", keys, options))
+
+
+class FakeDb:
+    def __init__(self):
+        self.players = FakeCollection()
+        self.bans = FakeCollection()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+@pytest.fixture
+def client():
+    return TestClient(server.app)
+
+
+def player_row(steamid, kills=10, deaths=5):
+    return {"nickname": f"Player {steamid}", "steamid": steamid, "kills": kills, "deaths": deaths}
+
+
+def post(client, path, payload, headers=None):
+    return client.post(path, content=json.dumps(payload), headers=headers or {"Content-Type": "application/json"})
+
+
+def test_player_batch_upserts_every_player(client, db):
+    rows = [player_row("STEAM_0:1:100"), player_row("STEAM_0:1:200"), player_row("STEAM_0:1:100", kills=20)]
+    response = post(client, "/api/players/webhook/batch", {"secret": server.BAN_WEBHOOK_SECRET, "players": rows})
+
+    assert response.status_code == 200
+    assert response.json()["upserted"] == 2
+    # The last row of a repeated steamid wins
+    filters = [(op._filter["steamid"], op._doc["$set"]["kills"]) for op in db.players.operations]
+    assert filters == [("STEAM_0:1:100", 20), ("STEAM_0:1:200", 10)]
+    assert all(op._upsert for op in db.players.operations)
+
+
+def test_player_batch_accepts_columns(client, db):
+    columns = {"nickname": ["A", "B"], "steamid": ["STEAM_0:1:1", "STEAM_0:1:2"],
+               "kills": [1, 2], "deaths": [3, 4], "headshots": [0, 1]}
+    response = post(client, "/api/players/webhook/batch", {"secret": server.BAN_WEBHOOK_SECRET, "players": columns})
+
+    assert response.status_code == 200
+    assert [op._filter["steamid"] for op in db.players.operations] == ["STEAM_0:1:1", "STEAM_0:1:2"]
+
+
+def test_player_batch_rejects_ragged_columns(client, db):
+    columns = {"nickname": ["A", "B"], "steamid": ["STEAM_0:1:1"], "kills": [1, 2], "deaths": [3, 4]}
+    response = post(client, "/api/players/webhook/batch", {"secret": server.BAN_WEBHOOK_SECRET, "players": columns})
+    assert response.status_code == 422
+
+
+def test_player_batch_checks_secret_and_limit(client, db, monkeypatch):
+    response = post(client, "/api/players/webhook/batch", {"secret": "wrong", "players": []})
+    assert response.status_code == 403
+
+    monkeypatch.setattr(server, "WEBHOOK_BATCH_LIMIT", 1)
+    rows = [player_row("STEAM_0:1:100"), player_row("STEAM_0:1:200")]
+    response = post(client, "/api/players/webhook/batch", {"secret": server.BAN_WEBHOOK_SECRET, "players": rows})
+    assert response.status_code == 413
+    assert db.players.operations == []
+
+
+def test_player_batch_reports_failed_writes(client, db):
+    db.players.error = BulkWriteError({"nUpserted": 1, "nModified": 0, "writeErrors": [{"code": 2}]})
+    rows = [player_row("STEAM_0:1:100"), player_row("STEAM_0:1:200")]
+    response = post(client, "/api/players/webhook/batch", {"secret": server.BAN_WEBHOOK_SECRET, "players": rows})
+
+    assert response.status_code == 200
+    assert (response.json()["upserted"], response.json()["failed"]) == (1, 1)
+
+
+def ban_row(steamid, reason="cheat"):
+    return {"player_nickname": "Player", "steamid": steamid, "reason": reason,
+            "admin_name": "Admin", "duration": "60"}
+
+
+def test_ban_docs_carry_the_webhook_key():
+    doc = server.webhook_ban_doc(server.BanWebhookRow(**ban_row("STEAM_0:1:100", "wall hack")))
+    assert doc["webhook_key"] == "STEAM_0:1:100|wall hack"
+
+
+def test_ban_batch_dedupes_on_steamid_and_reason(client, db):
+    rows = [ban_row("STEAM_0:1:100"), ban_row("STEAM_0:1:100"), ban_row("STEAM_0:1:100", "aim")]
+    response = post(client, "/api/bans/webhook/batch", {"secret": server.BAN_WEBHOOK_SECRET, "bans": rows})
+
+    assert response.status_code == 200
+    assert response.json()["added"] == 2
+    assert [op._filter for op in db.bans.operations] == [
+        {"steamid": "STEAM_0:1:100", "reason": "cheat"},
+        {"steamid": "STEAM_0:1:100", "reason": "aim"},
+    ]
+    # Existing bans are matched and left untouched
+    assert all(list(op._doc) == ["$setOnInsert"] for op in db.bans.operations)
+
+
+def test_ban_batch_counts_lost_insert_races_as_existing(client, db):
+    db.bans.error = BulkWriteError({"nUpserted": 1, "writeErrors": [{"code": 11000}, {"code": 2}]})
+    rows = [ban_row("STEAM_0:1:100"), ban_row("STEAM_0:1:200"), ban_row("STEAM_0:1:300")]
+    response = post(client, "/api/bans/webhook/batch", {"secret": server.BAN_WEBHOOK_SECRET, "bans": rows})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["added"], body["existing"], body["failed"]) == (1, 1, 1)
+
+
+def test_single_ban_webhook_lost_insert_race(client, db):
+    db.bans.error = DuplicateKeyError("E11000 duplicate key error")
+    response = client.post("/api/bans/webhook", json={"secret": server.BAN_WEBHOOK_SECRET, **ban_row("STEAM_0:1:100")})
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "Ban already exists", "id": "existing-ban"}
+    assert db.bans.operations[-1] == {"webhook_key": "STEAM_0:1:100|cheat"}
+
+
+def test_webhook_key_index_is_unique_and_partial(db):
+    asyncio.run(server.ensure_ban_webhook_index())
+
+    webhook_index = [op for op in db.bans.operations if op[0] == "create_index" and op[1] == "webhook_key"]
+    assert webhook_index == [("create_index", "webhook_key", {
+        "name": "webhook_key", "unique": True,
+        "partialFilterExpression": {"webhook_key": {"$exists": True}},
+    })]
+    # The (steamid, reason) lookup index stays non-unique, admin bans are not limited by it
+    lookup = [op for op in db.bans.operations if op[0] == "create_index" and op[1] != "webhook_key"]
+    assert lookup == [("create_index", [("steamid", 1), ("reason", 1)], {"name": "steamid_reason_lookup"})]
+
+
+def player_batch(count=2):
+    return {"secret": server.BAN_WEBHOOK_SECRET, "players": [player_row(f"STEAM_0:1:{n}") for n in range(count)]}
+
+
+def post_body(client, body, **headers):
+    headers = {"Content-Type": "application/json", **{k.replace("_", "-"): v for k, v in headers.items()}}
+    return client.post("/api/players/webhook/batch", content=body, headers=headers)
+
+
+def test_gzip_body(client, db):
+    response = post_body(client, gzip.compress(json.dumps(player_batch()).encode()), Content_Encoding="gzip")
+    assert response.status_code == 200
+    assert len(db.players.operations) == 2
+
+
+def test_corrupt_gzip_body_is_rejected(client, db):
+    body = bytearray(gzip.compress(json.dumps(player_batch()).encode()))
+    body[12:20] = b"\xff" * 8
+    response = post_body(client, bytes(body), Content_Encoding="gzip")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid gzip body"
+
+    response = post_body(client, b"not gzip at all", Content_Encoding="gzip")
+    assert response.status_code == 400
+
+
+def test_gzip_bomb_is_rejected(client, db, monkeypatch):
+    monkeypatch.setattr(server, "WEBHOOK_MAX_BODY", 1024)
+    response = post_body(client, gzip.compress(b" " * 100_000), Content_Encoding="gzip")
+    assert response.status_code == 413
+
+
+def test_zstd_body(client, db):
+    zstandard = pytest.importorskip("zstandard")
+    body = zstandard.ZstdCompressor().compress(json.dumps(player_batch()).encode())
+    assert post_body(client, body, Content_Encoding="zstd").status_code == 200
+
+    response = post_body(client, b"not zstd at all", Content_Encoding="zstd")
+    assert response.status_code == 400
+
+
+def test_msgpack_body(client, db):
+    msgpack = pytest.importorskip("msgpack")
+    response = post_body(client, msgpack.packb(player_batch()), Content_Type="application/msgpack")
+    assert response.status_code == 200
+    assert len(db.players.operations) == 2
+
+
+def test_unsupported_encoding_and_bad_json(client, db):
+    assert post_body(client, b"{}", Content_Encoding="br").status_code == 415
+    assert post_body(client, b"{not json").status_code == 400
@@ -9,6 +9,11 @@ WEBSITE_URL="http://82.22.174.126:8085"
 SECRET="shadowzm-ban-secret-2024"
 LOG_DIR="/var/lib/pterodactyl/volumes/d968fb39-3234-47f5-9341-d3149d0c8739/cstrike/addons/amxmodx/logs"
 
+# Bans are sent in one batch once no new log line arrived for BATCH_WAIT
+# seconds, or when BATCH_MAX bans are queued
+BATCH_WAIT=2
+BATCH_MAX=100
+
 # Colors
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -21,8 +26,13 @@ echo "Website: $WEBSITE_URL"
 echo "Log dir: $LOG_DIR"
 echo ""
 
-# Function to send ban to website
-send_ban() {
+# Bans are queued and sent together to the batch webhook, so a burst of
+# bans (or a restart replaying the logs) costs one request.
+# Websites without the batch webhook get one request per ban instead.
+pending_bans=()
+batch_endpoint=1
+
+queue_ban() {
     local player="$1"
     local steamid="$2"
     local reason="$3"
@@ -35,22 +45,77 @@ send_ban() {
     echo "  Reason: $reason"
     echo "  Admin: $admin"
     echo "  Duration: $duration"
+    echo ""
     
-    response=$(curl -s -X POST "$WEBSITE_URL/api/bans/webhook" \
-        -H "Content-Type: application/json" \
-        -d "{
-            \"secret\": \"$SECRET\",
+    # Only the fields, the senders wrap them in {} (with the secret for single bans)
+    pending_bans+=("
             \"player_nickname\": \"$player\",
             \"steamid\": \"$steamid\",
             \"reason\": \"$reason\",
             \"admin_name\": \"$admin\",
             \"duration\": \"$duration\"
-        }")
+        ")
     
-    if echo "$response" | grep -q "message"; then
-        echo -e "${GREEN}  ✓ Synced to website${NC}"
+    if [ ${#pending_bans[@]} -ge $BATCH_MAX ]; then
+        flush_bans
+    fi
+}
+
+# Send one ban to the single ban webhook (websites without the batch one)
+send_ban() {
+    local fields="$1"
+    
+    response=$(curl -s -X POST "$WEBSITE_URL/api/bans/webhook" \
+        -H "Content-Type: application/json" \
+        -d "{
+            \"secret\": \"$SECRET\",$fields}")
+    
+    echo "$response" | grep -q "message"
+}
+
+# Function to send the queued bans to website
+flush_bans() {
+    [ ${#pending_bans[@]} -eq 0 ] && return
+    
+    local count=${#pending_bans[@]}
+    local bans=("${pending_bans[@]}")
+    pending_bans=()
+    
+    if [ $batch_endpoint -eq 1 ]; then
+        local batch
+        batch=$(printf '{%s},' "${bans[@]}")
+        response=$(curl -s -w "\n%{http_code}" -X POST "$WEBSITE_URL/api/bans/webhook/batch" \
+            -H "Content-Type: application/json" \
+            -d "{
+                \"secret\": \"$SECRET\",
+                \"bans\": [${batch%,}]
+            }")
+        local code="${response##*$'\n'}"
+        response="${response%$'\n'*}"
+        
+        if [ "$code" = "404" ] || [ "$code" = "405" ]; then
+            # Older website without the batch webhook
+            echo -e "${YELLOW}  Batch webhook not available, sending bans one by one${NC}"
+            batch_endpoint=0
+        elif echo "$response" | grep -q "message"; then
+            echo -e "${GREEN}  ✓ Synced $count ban(s) to website${NC}"
+            echo ""
+            return
+        else
+            echo -e "${RED}  ✗ Failed to sync $count ban(s): $response${NC}"
+            echo ""
+            return
+        fi
+    fi
+    
+    local synced=0
+    for fields in "${bans[@]}"; do
+        send_ban "$fields" && synced=$((synced + 1))
+    done
+    if [ $synced -eq $count ]; then
+        echo -e "${GREEN}  ✓ Synced $count ban(s) to website${NC}"
     else
-        echo -e "${RED}  ✗ Failed: $response${NC}"
+        echo -e "${RED}  ✗ Failed to sync $((count - synced)) of $count ban(s): $response${NC}"
     fi
     echo ""
 }
@@ -85,7 +150,21 @@ echo "(Press Ctrl+C to stop)"
 echo ""
 
 # Watch BAN_HISTORY log files
-tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while read line; do
+tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while true; do
+    read -t "$BATCH_WAIT" line
+    status=$?
+    
+    # No new line for BATCH_WAIT seconds - send what is queued
+    if [ $status -gt 128 ]; then
+        flush_bans
+        continue
+    fi
+    
+    # tail stopped
+    if [ $status -ne 0 ]; then
+        flush_bans
+        break
+    fi
     
     # Check for new ban
     # Format: L 12/29/2025 - 19:11:07: AdminName <ADMIN_STEAM> banned PlayerName <PLAYER_STEAM> || Reason: "reason" || Ban Length: duration
@@ -113,7 +192,7 @@ tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while read line; do
             [ -z "$admin" ] && admin="Server"
             [ -z "$duration" ] && duration="Permanent"
             
-            send_ban "$player" "$steamid" "$reason" "$admin" "$duration"
+            queue_ban "$player" "$steamid" "$reason" "$admin" "$duration"
         fi
     fi
     
@@ -124,6 +203,8 @@ tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while read line; do
         steamid=$(echo "$line" | sed -n 's/.*unbanned [^<]* <\([^>]*\)>.*/\1/p')
         
         if [ -n "$steamid" ]; then
+            # Send queued bans first so an unban is never applied before its ban
+            flush_bans
             remove_ban "$steamid" "$player"
         fi
     fi
@@ -135,6 +216,7 @@ tail -F "$LOG_DIR"/BAN_HISTORY_*.log 2>/dev/null | while read line; do
         steamid=$(echo "$line" | sed -n 's/.*\[\([^\]]*\)\].*/\1/p')
         
         if [ -n "$steamid" ]; then
+            flush_bans
             remove_ban "$steamid" "$player"
         fi
     fi
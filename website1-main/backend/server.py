@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, status
+from fastapi.exceptions import RequestValidationError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -6,7 +7,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, ValidationError
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
@@ -14,6 +15,21 @@ import jwt
 from passlib.context import CryptContext
 import a2s
 import asyncio
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+import io
+import json
+import zlib
+
+# Optional webhook payload codecs (pip install msgpack zstandard)
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -38,6 +54,11 @@ CS_SERVER_NAME = "ShadowZM : Zombie Reverse"
 # Webhook secret for ban sync
 BAN_WEBHOOK_SECRET = os.environ.get('BAN_WEBHOOK_SECRET', 'shadowzm-ban-secret-2024')
 
+# Max rows accepted by one batch webhook request
+WEBHOOK_BATCH_LIMIT = 1000
+# Max size of a batch webhook body after decompression
+WEBHOOK_MAX_BODY = 8 * 1024 * 1024
+
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
@@ -376,39 +397,200 @@ async def update_ban(ban_id: str, data: BanUpdate, user = Depends(require_admin)
     result.pop("_id", None)
     return result
 
+# ==================== WEBHOOK PAYLOADS ====================
+
+# Batch webhooks take JSON or MessagePack bodies, optionally gzip or zstd
+# compressed (Content-Encoding). The rows may also be sent as columns:
+# {"nickname": [...], "steamid": [...], ...} instead of a list of objects.
+
+async def read_webhook_payload(request: Request):
+    encoding = request.headers.get("content-encoding", "identity").lower()
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == "zstd" and zstandard is not None:
+        # The window limit also caps the decoder's memory
+        decompressor = zstandard.ZstdDecompressor(max_window_size=WEBHOOK_MAX_BODY)
+    elif encoding == "identity":
+        decompressor = None
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+    
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type in ("application/msgpack", "application/x-msgpack"):
+        if msgpack is None:
+            raise HTTPException(status_code=415, detail="MessagePack is not supported by this server")
+        unpacker = msgpack.Unpacker(raw=False, max_buffer_size=WEBHOOK_MAX_BODY)
+    else:
+        unpacker = None
+    
+    # Decompress and decode chunk by chunk as the body arrives
+    chunks = []
+    size = 0
+    compressed = []
+    compressed_size = 0
+    
+    def add(data):
+        nonlocal size
+        size += len(data)
+        if size > WEBHOOK_MAX_BODY:
+            raise HTTPException(status_code=413, detail="Payload too large")
+        if unpacker is not None:
+            unpacker.feed(data)
+        else:
+            chunks.append(data)
+    
+    try:
+        async for chunk in request.stream():
+            if decompressor is None:
+                add(chunk)
+            elif encoding == "gzip":
+                # Never inflate more than the size limit (gzip bombs)
+                add(decompressor.decompress(chunk, WEBHOOK_MAX_BODY - size + 1))
+                if decompressor.unconsumed_tail:
+                    raise HTTPException(status_code=413, detail="Payload too large")
+            else:
+                # zstd cannot cap the output of one decompress() call, so the
+                # compressed body is collected (within the limit) and read below
+                compressed_size += len(chunk)
+                if compressed_size > WEBHOOK_MAX_BODY:
+                    raise HTTPException(status_code=413, detail="Payload too large")
+                compressed.append(chunk)
+        if encoding == "gzip":
+            add(decompressor.flush())
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Invalid gzip body")
+    if encoding == "zstd":
+        try:
+            with decompressor.stream_reader(io.BytesIO(b"".join(compressed))) as reader:
+                # Never inflate more than the size limit (zstd bombs)
+                while True:
+                    data = reader.read(min(64 * 1024, WEBHOOK_MAX_BODY - size + 1))
+                    if not data:
+                        break
+                    add(data)
+        except zstandard.ZstdError:
+            raise HTTPException(status_code=400, detail="Invalid zstd body")
+    
+    try:
+        if unpacker is not None:
+            return next(unpacker)
+        return json.loads(b"".join(chunks))
+    except (StopIteration, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+def parse_webhook_batch(model, payload, field):
+    """Validate a batch webhook payload, turning column-oriented rows into a list first"""
+    columns = payload.get(field) if isinstance(payload, dict) else None
+    if isinstance(columns, dict):
+        values = list(columns.values())
+        if not all(isinstance(column, list) and len(column) == len(values[0]) for column in values):
+            raise HTTPException(status_code=422, detail=f"{field} columns must be lists of the same length")
+        payload = {**payload, field: [dict(zip(columns, row)) for row in zip(*values)]}
+    try:
+        return model.model_validate(payload)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
 # ==================== BAN WEBHOOK ====================
 
-class BanWebhookData(BaseModel):
-    secret: str
+class BanWebhookRow(BaseModel):
     player_nickname: str
     steamid: str
     reason: str
     admin_name: str
     duration: str
 
+class BanWebhookData(BanWebhookRow):
+    secret: str
+
+class BanBatchWebhookData(BaseModel):
+    secret: str
+    bans: List[BanWebhookRow]
+
+def webhook_key(row: BanWebhookRow):
+    return f"{row.steamid}|{row.reason}"
+
+def webhook_ban_doc(row: BanWebhookRow):
+    return {
+        "id": str(uuid.uuid4()),
+        "webhook_key": webhook_key(row),
+        "player_nickname": row.player_nickname,
+        "steamid": row.steamid,
+        "ip": "Hidden",
+        "reason": row.reason,
+        "admin_name": row.admin_name,
+        "duration": row.duration,
+        "ban_date": datetime.now(timezone.utc).isoformat(),
+        "source": "server"
+    }
+
+async def ensure_ban_webhook_index():
+    # The webhooks dedupe on (steamid, reason) in their upsert filter. Only the
+    # bans they insert carry webhook_key, so its unique index makes two concurrent
+    # upserts of the same ban insert it once, while admins can still ban a player
+    # again for a reason an older (expired) ban already has.
+    try:
+        await db.bans.drop_index("steamid_reason")  # unique on every ban, built by older versions
+    except OperationFailure:
+        pass
+    await db.bans.create_index([("steamid", 1), ("reason", 1)], name="steamid_reason_lookup")
+    await db.bans.create_index(
+        "webhook_key", name="webhook_key", unique=True,
+        partialFilterExpression={"webhook_key": {"$exists": True}}
+    )
+
 @api_router.post("/bans/webhook")
 async def receive_ban_webhook(data: BanWebhookData):
     if data.secret != BAN_WEBHOOK_SECRET:
         raise HTTPException(status_code=403, detail="Invalid secret")
     
-    existing = await db.bans.find_one({"steamid": data.steamid, "reason": data.reason})
+    ban = webhook_ban_doc(data)
+    key = {"steamid": data.steamid, "reason": data.reason}
+    try:
+        existing = await db.bans.find_one_and_update(
+            key, {"$setOnInsert": ban}, upsert=True, return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # Lost an insert race with the same ban
+        existing = await db.bans.find_one({"webhook_key": ban["webhook_key"]})
     if existing:
         return {"message": "Ban already exists", "id": existing["id"]}
-    
-    ban = {
-        "id": str(uuid.uuid4()),
-        "player_nickname": data.player_nickname,
-        "steamid": data.steamid,
-        "ip": "Hidden",
-        "reason": data.reason,
-        "admin_name": data.admin_name,
-        "duration": data.duration,
-        "ban_date": datetime.now(timezone.utc).isoformat(),
-        "source": "server"
-    }
-    await db.bans.insert_one(ban)
     return {"message": "Ban added", "id": ban["id"]}
 
+@api_router.post("/bans/webhook/batch")
+async def receive_ban_batch_webhook(request: Request):
+    data = parse_webhook_batch(BanBatchWebhookData, await read_webhook_payload(request), "bans")
+    if data.secret != BAN_WEBHOOK_SECRET:
+        raise HTTPException(status_code=403, detail="Invalid secret")
+    if len(data.bans) > WEBHOOK_BATCH_LIMIT:
+        raise HTTPException(status_code=413, detail=f"At most {WEBHOOK_BATCH_LIMIT} bans per batch")
+    
+    # Same key as the single webhook, the first row of a repeated ban wins
+    rows = {}
+    for row in data.bans:
+        rows.setdefault((row.steamid, row.reason), row)
+    if not rows:
+        return {"message": "No bans", "added": 0, "existing": 0, "failed": 0}
+    
+    # Bans that already exist are matched and left untouched
+    operations = [
+        UpdateOne({"steamid": steamid, "reason": reason}, {"$setOnInsert": webhook_ban_doc(row)}, upsert=True)
+        for (steamid, reason), row in rows.items()
+    ]
+    try:
+        result = await db.bans.bulk_write(operations, ordered=False)
+        added, failed = result.upserted_count, 0
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        added = e.details.get("nUpserted", 0)
+        # A duplicate key means the ban was inserted concurrently, so it exists
+        failed = len([error for error in errors if error.get("code") != 11000])
+        if failed:
+            logging.error(f"Ban batch webhook: {failed} writes failed")
+    
+    return {"message": f"Added {added} ban(s)", "added": added,
+            "existing": len(rows) - added - failed, "failed": failed}
+
 @api_router.delete("/bans/webhook/{steamid}")
 async def remove_ban_webhook(steamid: str, secret: str):
     if secret != BAN_WEBHOOK_SECRET:
@@ -451,34 +633,40 @@ async def get_player(steamid: str):
 
 # ==================== PLAYER STATS WEBHOOK ====================
 
-class PlayerStatsWebhookData(BaseModel):
-    secret: str
+class PlayerStatsRow(BaseModel):
     nickname: str
     steamid: str
     kills: int
     deaths: int
     headshots: int = 0
 
+class PlayerStatsWebhookData(PlayerStatsRow):
+    secret: str
+
+class PlayerStatsBatchWebhookData(BaseModel):
+    secret: str
+    players: List[PlayerStatsRow]
+
+def player_stats_doc(row: PlayerStatsRow):
+    return {
+        "nickname": row.nickname,
+        "steamid": row.steamid,
+        "kills": row.kills,
+        "deaths": row.deaths,
+        "headshots": row.headshots,
+        "kd_ratio": round(row.kills / max(row.deaths, 1), 2),
+        "level": min(50, row.kills // 500),
+        "last_seen": datetime.now(timezone.utc).isoformat()
+    }
+
 @api_router.post("/players/webhook")
 async def receive_player_stats_webhook(data: PlayerStatsWebhookData):
     if data.secret != BAN_WEBHOOK_SECRET:
         raise HTTPException(status_code=403, detail="Invalid secret")
     
-    kd_ratio = round(data.kills / max(data.deaths, 1), 2)
-    level = min(50, data.kills // 500)
-    
     existing = await db.players.find_one({"steamid": data.steamid})
     
-    player_data = {
-        "nickname": data.nickname,
-        "steamid": data.steamid,
-        "kills": data.kills,
-        "deaths": data.deaths,
-        "headshots": data.headshots,
-        "kd_ratio": kd_ratio,
-        "level": level,
-        "last_seen": datetime.now(timezone.utc).isoformat()
-    }
+    player_data = player_stats_doc(data)
     
     if existing:
         await db.players.update_one({"steamid": data.steamid}, {"$set": player_data})
@@ -489,6 +677,40 @@ async def receive_player_stats_webhook(data: PlayerStatsWebhookData):
         await db.players.insert_one(player_data)
         return {"message": "Player added", "steamid": data.steamid}
 
+@api_router.post("/players/webhook/batch")
+async def receive_player_stats_batch_webhook(request: Request):
+    data = parse_webhook_batch(PlayerStatsBatchWebhookData, await read_webhook_payload(request), "players")
+    if data.secret != BAN_WEBHOOK_SECRET:
+        raise HTTPException(status_code=403, detail="Invalid secret")
+    if len(data.players) > WEBHOOK_BATCH_LIMIT:
+        raise HTTPException(status_code=413, detail=f"At most {WEBHOOK_BATCH_LIMIT} players per batch")
+    if not data.players:
+        return {"message": "No players", "upserted": 0, "modified": 0, "failed": 0}
+    
+    # The last row wins if a steamid is sent twice
+    rows = {row.steamid: row for row in data.players}
+    
+    # One unordered bulk upsert instead of a find_one + write per player
+    operations = [
+        UpdateOne(
+            {"steamid": row.steamid},
+            {"$set": player_stats_doc(row), "$setOnInsert": {"id": str(uuid.uuid4()), "rank": 0}},
+            upsert=True
+        )
+        for row in rows.values()
+    ]
+    try:
+        result = await db.players.bulk_write(operations, ordered=False)
+        upserted, modified, failed = result.upserted_count, result.modified_count, 0
+    except BulkWriteError as e:
+        upserted = e.details.get("nUpserted", 0)
+        modified = e.details.get("nModified", 0)
+        failed = len(e.details.get("writeErrors", []))
+        logging.error(f"Player batch webhook: {failed} writes failed")
+    
+    return {"message": f"Synced {len(rows) - failed} players",
+            "upserted": upserted, "modified": modified, "failed": failed}
+
 # ==================== ADMIN APPLICATIONS ROUTES ====================
 
 @api_router.get("/admin-applications", response_model=List[AdminApplicationResponse])
@@ -654,6 +876,7 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup():
     await init_default_admin()
+    await ensure_ban_webhook_index()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():